@@ -317,10 +317,17 @@ async def teaching_health_check():
         # Test AI providers
         test_result = await ai_teaching_engine._generate_with_google("Test", None)
         
+        provider_stats = ai_teaching_engine.get_provider_stats()
+        open_circuits = [
+            provider for provider, circuit in provider_stats["circuits"].items()
+            if circuit["state"] != "closed"
+        ]
+        
         return {
-            "status": "healthy",
-            "ai_providers": "operational",
+            "status": "healthy" if not open_circuits else "degraded",
+            "ai_providers": "operational" if not open_circuits else f"circuit not closed: {', '.join(open_circuits)}",
             "active_sessions": len(active_sessions),
+            "providers": provider_stats,
             "timestamp": datetime.now().isoformat()
         }
         
@@ -328,5 +335,6 @@ async def teaching_health_check():
         return {
             "status": "degraded",
             "error": str(e),
+            "providers": ai_teaching_engine.get_provider_stats(),
             "timestamp": datetime.now().isoformat()
         }
@@ -26,6 +26,18 @@ class Settings(BaseSettings):
     DEFAULT_LANGUAGE: str = "en"
     SUPPORTED_LANGUAGES: str = "en,es,fr,de,zh,ja,ar,hi,pt,ru"
     
+    # Lesson generation hedging (seconds before firing the secondary provider)
+    LESSON_HEDGE_DELAY_SECONDS: float = 8.0
+    LESSON_HEDGE_MIN_DELAY_SECONDS: float = 2.0
+    LESSON_HEDGE_MAX_DELAY_SECONDS: float = 20.0
+    LESSON_HEDGE_MIN_SAMPLES: int = 20
+    
+    # Per-provider circuit breakers
+    CIRCUIT_BREAKER_WINDOW: int = 20
+    CIRCUIT_BREAKER_MIN_CALLS: int = 5
+    CIRCUIT_BREAKER_ERROR_RATE: float = 0.5
+    CIRCUIT_BREAKER_OPEN_SECONDS: float = 30.0
+    
     # 3D Visualization
     THREE_JS_VERSION: str = "0.160.0"
     WEBGL_RENDERER: str = "webgl2"
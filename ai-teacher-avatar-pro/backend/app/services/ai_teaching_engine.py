@@ -1,25 +1,47 @@
-from typing import Dict, List, Optional, Any
+from typing import Dict, List, Optional, Any, Tuple
 import json
+import re
+import time
 import asyncio
 from datetime import datetime
 import openai
 import google.generativeai as genai
-from anthropic import Anthropic
+from anthropic import AsyncAnthropic
 
 from ..models.teaching_models import (
     TeachingRequest, TeachingLesson, TeachingStep, AvatarResponse,
     TeachingMode, AvatarStyle, Language, DifficultyLevel
 )
 from ..core.config import settings
+from .provider_health import CircuitBreaker, LatencyHistogram
+
+PROVIDERS = ("openai", "anthropic", "google")
 
 class AITeachingEngine:
     """Advanced AI Teaching Engine with multiple AI providers"""
     
     def __init__(self):
-        self.openai_client = openai.OpenAI(api_key=settings.OPENAI_API_KEY)
+        self.openai_client = openai.AsyncOpenAI(api_key=settings.OPENAI_API_KEY)
         genai.configure(api_key=settings.GOOGLE_API_KEY)
         self.google_model = genai.GenerativeModel(settings.GOOGLE_MODEL)
-        self.anthropic_client = Anthropic(api_key=settings.ANTHROPIC_API_KEY)
+        self.anthropic_client = AsyncAnthropic(api_key=settings.ANTHROPIC_API_KEY)
+        
+        # Per-provider latency histograms drive the adaptive hedge delay
+        self.provider_latency = {provider: LatencyHistogram() for provider in PROVIDERS}
+        self.hedge_stats = {
+            "hedges_fired": 0, "primary_wins": 0, "secondary_wins": 0, "fallbacks": 0, "circuit_reroutes": 0
+        }
+        
+        # Per-provider circuit breakers so failing providers are routed around
+        self.circuit_breakers = {
+            provider: CircuitBreaker(
+                window=settings.CIRCUIT_BREAKER_WINDOW,
+                min_calls=settings.CIRCUIT_BREAKER_MIN_CALLS,
+                error_rate_threshold=settings.CIRCUIT_BREAKER_ERROR_RATE,
+                open_seconds=settings.CIRCUIT_BREAKER_OPEN_SECONDS
+            )
+            for provider in PROVIDERS
+        }
         
         # Teaching prompts for different modes
         self.teaching_prompts = self._load_teaching_prompts()
@@ -90,20 +112,158 @@ class AITeachingEngine:
             raise Exception(f"Failed to generate teaching lesson: {str(e)}")
     
     async def _generate_lesson_content(self, request: TeachingRequest) -> Dict[str, Any]:
-        """Generate lesson content using the best AI provider"""
+        """Generate lesson content using the best healthy AI provider, hedged with a fallback"""
         
         prompt = self._build_teaching_prompt(request)
+        providers = self._route_providers(request.teaching_mode)
+        if not providers:
+            raise Exception("All AI providers are unavailable (circuit breakers open)")
+        return await self._hedged_generate(providers, prompt, request)
+    
+    def _select_providers(self, teaching_mode: TeachingMode) -> Tuple[str, ...]:
+        """Provider preference order for a teaching mode"""
         
-        # Try different AI providers based on the mode and requirements
-        if request.teaching_mode == TeachingMode.HARDWARE_LAB:
+        if teaching_mode == TeachingMode.HARDWARE_LAB:
             # Use GPT-4 Vision for hardware projects
-            return await self._generate_with_openai(prompt, request)
-        elif request.teaching_mode == TeachingMode.MATH_WHITEBOARD:
+            return "openai", "google", "anthropic"
+        elif teaching_mode == TeachingMode.MATH_WHITEBOARD:
             # Use Claude for mathematical reasoning
-            return await self._generate_with_anthropic(prompt, request)
+            return "anthropic", "google", "openai"
         else:
             # Use Google Gemini for general teaching
-            return await self._generate_with_google(prompt, request)
+            return "google", "openai", "anthropic"
+    
+    def _route_providers(self, teaching_mode: TeachingMode) -> List[str]:
+        """
+        Order the providers to try for a teaching mode.
+        
+        Providers with an open circuit are skipped. The preferred provider
+        keeps the first slot while its circuit allows calls; the fallbacks
+        are ordered by their recent error rate.
+        """
+        
+        preferred = self._select_providers(teaching_mode)
+        available = [provider for provider in preferred if self.circuit_breakers[provider].is_available()]
+        if available and available[0] != preferred[0]:
+            self.hedge_stats["circuit_reroutes"] += 1
+        
+        if not available:
+            return []
+        return available[:1] + sorted(available[1:], key=lambda p: self.circuit_breakers[p].error_rate())
+    
+    def _hedge_delay(self, provider: str) -> float:
+        """How long to wait for a provider before firing the secondary"""
+        
+        histogram = self.provider_latency[provider]
+        if histogram.count < settings.LESSON_HEDGE_MIN_SAMPLES:
+            return settings.LESSON_HEDGE_DELAY_SECONDS
+        
+        # Adapt to the provider's observed p95 latency
+        return min(
+            settings.LESSON_HEDGE_MAX_DELAY_SECONDS,
+            max(settings.LESSON_HEDGE_MIN_DELAY_SECONDS, histogram.percentile(95))
+        )
+    
+    async def _call_provider(self, provider: str, prompt: str, request: TeachingRequest) -> Dict[str, Any]:
+        """Generate a lesson with one provider, recording its latency and circuit outcome"""
+        
+        generators = {
+            "openai": self._generate_with_openai,
+            "anthropic": self._generate_with_anthropic,
+            "google": self._generate_with_google,
+        }
+        breaker = self.circuit_breakers[provider]
+        
+        start = time.monotonic()
+        try:
+            lesson_content = await generators[provider](prompt, request)
+            if not self._is_valid_lesson(lesson_content):
+                raise ValueError(f"{provider} returned an invalid lesson")
+        except asyncio.CancelledError:
+            # Cancelled hedge losers are not a measure of provider health
+            breaker.record_cancelled()
+            raise
+        except Exception:
+            self.provider_latency[provider].observe(time.monotonic() - start)
+            breaker.record_failure()
+            raise
+        
+        self.provider_latency[provider].observe(time.monotonic() - start)
+        breaker.record_success()
+        return lesson_content
+    
+    def _is_valid_lesson(self, lesson_content: Any) -> bool:
+        """Check that a provider returned a usable JSON lesson"""
+        
+        return (
+            isinstance(lesson_content, dict)
+            and isinstance(lesson_content.get("steps"), list)
+            and len(lesson_content["steps"]) > 0
+        )
+    
+    async def _hedged_generate(self, providers: List[str], prompt: str, request: TeachingRequest) -> Dict[str, Any]:
+        """
+        Run the first provider and hedge with the next one if it is slow.
+        
+        If the first provider has not answered within the hedge delay, the
+        next provider is fired alongside it; the first valid lesson wins and
+        the other call is cancelled. When a call fails, the next provider is
+        tried straight away.
+        """
+        
+        primary = providers[0]
+        remaining = list(providers)
+        tasks: Dict[asyncio.Task, str] = {}
+        errors = []
+        hedged = False
+        
+        def launch_next() -> bool:
+            while remaining:
+                provider = remaining.pop(0)
+                # Claims the probe slot when the circuit is half-open
+                if self.circuit_breakers[provider].allow_request():
+                    tasks[asyncio.create_task(self._call_provider(provider, prompt, request))] = provider
+                    return True
+            return False
+        
+        try:
+            launch_next()
+            while tasks:
+                timeout = None if hedged or not remaining else self._hedge_delay(primary)
+                done, _ = await asyncio.wait(tasks, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                
+                if not done:
+                    hedged = True
+                    if launch_next():
+                        self.hedge_stats["hedges_fired"] += 1
+                    continue
+                
+                for task in done:
+                    provider = tasks.pop(task)
+                    if task.exception() is None:
+                        self.hedge_stats["primary_wins" if provider == primary else "secondary_wins"] += 1
+                        return task.result()
+                    errors.append(f"{provider}: {task.exception()}")
+                    print(f"{provider} generation error: {task.exception()}")
+                
+                if not tasks and launch_next():
+                    self.hedge_stats["fallbacks"] += 1
+            
+            raise Exception(f"All AI providers failed to generate content ({'; '.join(errors)})")
+        
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+    
+    def get_provider_stats(self) -> Dict[str, Any]:
+        """Provider circuit states, latency histograms and hedging statistics"""
+        
+        return {
+            "circuits": {provider: breaker.to_dict() for provider, breaker in self.circuit_breakers.items()},
+            "latency": {provider: histogram.to_dict() for provider, histogram in self.provider_latency.items()},
+            "hedging": dict(self.hedge_stats),
+        }
     
     def _build_teaching_prompt(self, request: TeachingRequest) -> str:
         """Build comprehensive teaching prompt"""
@@ -166,8 +326,7 @@ class AITeachingEngine:
             return json.loads(content)
             
         except Exception as e:
-            print(f"OpenAI generation error: {e}")
-            return await self._generate_with_google(prompt, request)
+            raise Exception(f"OpenAI generation error: {e}")
     
     async def _generate_with_anthropic(self, prompt: str, request: TeachingRequest) -> Dict[str, Any]:
         """Generate content using Anthropic Claude"""
@@ -185,8 +344,7 @@ class AITeachingEngine:
             return json.loads(content)
             
         except Exception as e:
-            print(f"Anthropic generation error: {e}")
-            return await self._generate_with_google(prompt, request)
+            raise Exception(f"Anthropic generation error: {e}")
     
     async def _generate_with_google(self, prompt: str, request: TeachingRequest) -> Dict[str, Any]:
         """Generate content using Google Gemini"""
@@ -196,8 +354,7 @@ class AITeachingEngine:
             content = response.text
             
             # Try to extract JSON from the response
-            import re
-            json_match = re.search(r'\\{.*\\}', content, re.DOTALL)
+            json_match = re.search(r'\{.*\}', content, re.DOTALL)
             if json_match:
                 return json.loads(json_match.group())
             else:
@@ -223,8 +380,7 @@ class AITeachingEngine:
                 }
                 
         except Exception as e:
-            print(f"Google generation error: {e}")
-            raise Exception("All AI providers failed to generate content")
+            raise Exception(f"Google generation error: {e}")
     
     def _parse_teaching_steps(self, steps_data: List[Dict]) -> List[TeachingStep]:
         """Parse teaching steps from AI response"""
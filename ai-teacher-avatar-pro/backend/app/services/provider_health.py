@@ -0,0 +1,149 @@
+from typing import Any, Dict, Optional
+from collections import deque
+import time
+
+class LatencyHistogram:
+    """Per-provider latency histogram with a window of recent samples for percentiles"""
+
+    # Bucket upper bounds in seconds; the last bucket counts everything slower
+    BUCKETS = (0.5, 1.0, 2.0, 3.0, 5.0, 8.0, 13.0, 20.0, 30.0, 60.0)
+
+    def __init__(self, window: int = 200):
+        self.counts = [0] * (len(self.BUCKETS) + 1)
+        self.recent = deque(maxlen=window)
+        self.count = 0
+        self.total_seconds = 0.0
+
+    def observe(self, seconds: float):
+        """Record one call latency"""
+        for i, bound in enumerate(self.BUCKETS):
+            if seconds <= bound:
+                self.counts[i] += 1
+                break
+        else:
+            self.counts[-1] += 1
+
+        self.recent.append(seconds)
+        self.count += 1
+        self.total_seconds += seconds
+
+    def percentile(self, q: float) -> Optional[float]:
+        """Latency percentile (0-100) over the recent window, or None without samples"""
+        if not self.recent:
+            return None
+        samples = sorted(self.recent)
+        index = min(len(samples) - 1, int(len(samples) * q / 100))
+        return samples[index]
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Serialize histogram for health and metrics endpoints"""
+        buckets = {f"le_{bound:g}s": count for bound, count in zip(self.BUCKETS, self.counts)}
+        buckets[f"gt_{self.BUCKETS[-1]:g}s"] = self.counts[-1]
+        p50 = self.percentile(50)
+        p95 = self.percentile(95)
+        return {
+            "count": self.count,
+            "avg_seconds": round(self.total_seconds / self.count, 3) if self.count else None,
+            "p50_seconds": round(p50, 3) if p50 is not None else None,
+            "p95_seconds": round(p95, 3) if p95 is not None else None,
+            "buckets": buckets
+        }
+
+class CircuitBreaker:
+    """
+    Per-provider circuit breaker over a rolling window of call outcomes.
+    
+    closed: calls flow normally; the circuit opens once the error rate over
+        the window reaches the threshold (after a minimum number of calls).
+    open: calls are refused until the cool-down has elapsed.
+    half_open: a single probe call is let through; success closes the
+        circuit, failure opens it again.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, window: int = 20, min_calls: int = 5, error_rate_threshold: float = 0.5,
+                 open_seconds: float = 30.0):
+        self.window = window
+        self.min_calls = min_calls
+        self.error_rate_threshold = error_rate_threshold
+        self.open_seconds = open_seconds
+
+        self.state = self.CLOSED
+        self.outcomes = deque(maxlen=window)  # True for success, False for failure
+        self.opened_at = 0.0
+        self.probe_in_flight = False
+        self.times_opened = 0
+        self.rejected = 0
+
+    def error_rate(self) -> float:
+        """Failure rate over the rolling window"""
+        if not self.outcomes:
+            return 0.0
+        return self.outcomes.count(False) / len(self.outcomes)
+
+    def _refresh_state(self):
+        if self.state == self.OPEN and time.monotonic() - self.opened_at >= self.open_seconds:
+            self.state = self.HALF_OPEN
+            self.probe_in_flight = False
+
+    def is_available(self) -> bool:
+        """Whether a call could be made right now, without claiming the probe"""
+        self._refresh_state()
+        if self.state == self.OPEN:
+            return False
+        if self.state == self.HALF_OPEN:
+            return not self.probe_in_flight
+        return True
+
+    def allow_request(self) -> bool:
+        """Claim permission to make a call; in half-open this claims the single probe"""
+        if not self.is_available():
+            self.rejected += 1
+            return False
+        if self.state == self.HALF_OPEN:
+            self.probe_in_flight = True
+        return True
+
+    def record_success(self):
+        """Record a successful call"""
+        if self.state == self.HALF_OPEN:
+            self.state = self.CLOSED
+            self.outcomes.clear()
+            self.probe_in_flight = False
+        self.outcomes.append(True)
+
+    def record_failure(self):
+        """Record a failed call, opening the circuit if the error rate is too high"""
+        self.outcomes.append(False)
+        if self.state == self.HALF_OPEN:
+            self._open()
+        elif (self.state == self.CLOSED and len(self.outcomes) >= self.min_calls
+              and self.error_rate() >= self.error_rate_threshold):
+            self._open()
+
+    def record_cancelled(self):
+        """Release a half-open probe whose call was cancelled before finishing"""
+        if self.state == self.HALF_OPEN:
+            self.probe_in_flight = False
+
+    def _open(self):
+        self.state = self.OPEN
+        self.opened_at = time.monotonic()
+        self.probe_in_flight = False
+        self.times_opened += 1
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Serialize breaker state for health and metrics endpoints"""
+        self._refresh_state()
+        return {
+            "state": self.state,
+            "error_rate": round(self.error_rate(), 3),
+            "window_calls": len(self.outcomes),
+            "times_opened": self.times_opened,
+            "rejected": self.rejected,
+            "retry_in_seconds": round(max(0.0, self.open_seconds - (time.monotonic() - self.opened_at)), 1)
+            if self.state == self.OPEN else None
+        }
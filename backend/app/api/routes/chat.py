@@ -1,7 +1,13 @@
+import json
+import time
 from fastapi import APIRouter, HTTPException
+from fastapi.responses import StreamingResponse
+from ...core.admission import LLMOverloadedError
+from ...core.config import settings
 from ...models.request_models import ChatRequest
 from ...models.response_models import ChatResponse
-from ...services.chat_service import chat_respond
+from ...services.chat_service import chat_respond, chat_respond_stream, chat_response_cache
+from ...services.conversation_service import conversation_store
 
 router = APIRouter(prefix="/chat", tags=["Chat"])
 
@@ -14,22 +20,131 @@ async def chat_endpoint(request: ChatRequest):
     - **message**: User's question or message
     - **language**: Language for the AI response
     - **context**: Optional context from previous analysis
+    - **use_cache**: Set to false to always generate a fresh answer
+    - **conversation_id**: Optional ID of a server-held conversation to continue
     """
     try:
         response_text = await chat_respond(
             message=request.message,
             language=request.language,
             context=request.context,
+            use_cache=request.use_cache,
+            conversation_id=request.conversation_id,
         )
         
         return ChatResponse(
             success=True,
             response=response_text,
             language=request.language,
+            conversation_id=request.conversation_id,
         )
         
+    except LLMOverloadedError as e:
+        raise HTTPException(
+            status_code=503,
+            detail=f"AI service is busy, please retry shortly: {str(e)}",
+        )
     except Exception as e:
         raise HTTPException(
             status_code=500,
             detail=f"Error generating response: {str(e)}",
         )
+
+
+def _sse_event(event: str, data: dict) -> str:
+    """Format a Server-Sent Events message."""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+@router.post("/stream")
+async def chat_stream_endpoint(request: ChatRequest):
+    """
+    Stream the AI tutor's answer as Server-Sent Events.
+    
+    Takes the same body as `/chat/respond`. Emits `chunk` events with
+    `{"text": ...}` as Gemini produces them, then one `done` event with
+    `ttft_ms` (time to first token) and `total_ms`, or an `error` event.
+    """
+    async def event_stream():
+        start = time.perf_counter()
+        ttft_ms = None
+        
+        try:
+            async for text in chat_respond_stream(
+                message=request.message,
+                language=request.language,
+                context=request.context,
+                use_cache=request.use_cache,
+                conversation_id=request.conversation_id,
+            ):
+                if ttft_ms is None:
+                    ttft_ms = round((time.perf_counter() - start) * 1000, 1)
+                yield _sse_event("chunk", {"text": text})
+            
+            yield _sse_event("done", {
+                "success": True,
+                "language": request.language,
+                "conversation_id": request.conversation_id,
+                "ttft_ms": ttft_ms,
+                "total_ms": round((time.perf_counter() - start) * 1000, 1),
+            })
+            
+        except Exception as e:
+            yield _sse_event("error", {
+                "success": False,
+                "detail": f"Error generating response: {str(e)}",
+            })
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no",
+        },
+    )
+
+
+@router.get("/cache/stats")
+async def chat_cache_stats():
+    """Get hit/miss counters and size of the chat response cache."""
+    return {
+        "success": True,
+        "enabled": settings.chat_cache_enabled,
+        "data": chat_response_cache.get_stats(),
+    }
+
+
+@router.delete("/cache")
+async def clear_chat_cache():
+    """Clear the chat response cache."""
+    await chat_response_cache.clear()
+    return {
+        "success": True,
+        "message": "Chat response cache cleared",
+    }
+
+
+@router.get("/conversations/{conversation_id}")
+async def get_conversation(conversation_id: str):
+    """Get the stored summary and size of a server-held conversation."""
+    conversation = conversation_store.get(conversation_id)
+    if conversation is None:
+        raise HTTPException(status_code=404, detail="Conversation not found")
+    
+    return {
+        "success": True,
+        "data": conversation_store.get_info(conversation),
+    }
+
+
+@router.delete("/conversations/{conversation_id}")
+async def delete_conversation(conversation_id: str):
+    """Delete a server-held conversation."""
+    if not conversation_store.delete(conversation_id):
+        raise HTTPException(status_code=404, detail="Conversation not found")
+    
+    return {
+        "success": True,
+        "message": "Conversation deleted",
+    }
@@ -3,6 +3,9 @@ from pydantic import BaseModel
 from typing import Dict, Any
 from ...services.heygen_live_service import heygen_live_service
 from ...core.config import settings
+from ...core.gemini_runner import gemini_runner
+from ...core.model_registry import model_registry
+from ...core.single_flight import single_flight
 import httpx
 import json
 
@@ -218,3 +221,17 @@ async def test_session_creation():
         "detailed_message": result[2],
         "timestamp": "2024-01-01T00:00:00Z"  # Add real timestamp if needed
     }
+
+
+@router.get("/gemini")
+async def gemini_diagnostics():
+    """
+    Gemini execution statistics (concurrency limit, in-flight and completed
+    calls), cached model instances and coalesced requests.
+    """
+    return {
+        "success": True,
+        "runner": gemini_runner.get_stats(),
+        "models": model_registry.get_stats(),
+        "single_flight": single_flight.get_stats(),
+    }
@@ -1,55 +1,328 @@
-from fastapi import APIRouter, HTTPException, UploadFile, File
-from ...models.request_models import FileAnalysisRequest
-from ...models.response_models import FileAnalysisResponse
-from ...services.file_service import analyze_file
+import json
+import mimetypes
+import time
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
+from ...core.admission import LLMOverloadedError
+from ...core.config import settings
+from ...core.media import MediaBlob
+from ...models.request_models import FileAnalysisRequest, FileQuestionRequest
+from ...models.response_models import FileAnalysisResponse, FileQuestionResponse
+from ...services.document_extractor import document_extractor
+from ...services.document_index import document_index
+from ...services.document_summarizer import document_summarizer
+from ...services.extraction_cache import extraction_cache
+from ...services.file_service import analyze_file, analyze_file_stream, answer_file_question, document_id
+from ...services.upload_service import (
+    StreamedUpload,
+    UploadError,
+    receive_base64_json_upload,
+    receive_file_upload,
+)
 
 router = APIRouter(prefix="/chat", tags=["File Analysis"])
 
-@router.post("/respond/file", response_model=FileAnalysisResponse)
-async def analyze_file_endpoint(request: FileAnalysisRequest):
+
+@router.post(
+    "/respond/file",
+    response_model=FileAnalysisResponse,
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {"application/json": {"schema": FileAnalysisRequest.model_json_schema()}},
+        }
+    },
+)
+async def analyze_file_endpoint(request: Request):
     """
     Analyze an uploaded file (PDF, Word, Excel, etc.).
-    
+
     - **file**: Base64 encoded file content
     - **fileName**: Original filename
     - **fileType**: MIME type of the file
     - **language**: Language for the AI response
+
+    The body is streamed: the base64 field is decoded chunk by chunk to a
+    temp file and the size limit is enforced on decoded bytes. Prefer
+    /respond/file/upload for new clients.
+    """
+    try:
+        upload, fields = await receive_base64_json_upload(
+            request,
+            max_bytes=settings.file_max_upload_bytes,
+        )
+    except UploadError as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e))
+
+    try:
+        # Validate the other fields as before; the file itself is already decoded
+        params = FileAnalysisRequest.model_validate({**fields, "file": ""})
+    except ValidationError as e:
+        upload.close()
+        raise RequestValidationError([{**error, "loc": ("body", *error["loc"])} for error in e.errors()])
+
+    return await _analyze_upload(
+        upload,
+        file_name=params.fileName,
+        file_type=params.fileType or upload.declared_type,
+        language=params.language,
+    )
+
+
+@router.post(
+    "/respond/file/upload",
+    response_model=FileAnalysisResponse,
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {
+                "multipart/form-data": {
+                    "schema": {
+                        "type": "object",
+                        "required": ["file"],
+                        "properties": {
+                            "file": {"type": "string", "format": "binary", "description": "File to analyze"},
+                            "language": {"type": "string", "default": "English", "description": "Response language"},
+                        },
+                    }
+                }
+            },
+        }
+    },
+)
+async def analyze_file_upload_endpoint(request: Request):
+    """
+    Analyze a file sent as multipart/form-data (no base64 overhead).
+
+    - **file**: The file; its name and Content-Type are taken from the part
+    - **language**: Language for the AI response
+    """
+    try:
+        upload, fields = await receive_file_upload(
+            request,
+            max_bytes=settings.file_max_upload_bytes,
+        )
+    except UploadError as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e))
+
+    file_name, file_type = _upload_name_and_type(upload)
+    return await _analyze_upload(
+        upload,
+        file_name=file_name,
+        file_type=file_type,
+        language=fields.get("language") or "English",
+    )
+
+
+def _upload_name_and_type(upload: StreamedUpload):
+    """Filename and MIME type of a multipart file, guessing the type from the name if generic."""
+    file_name = upload.filename or "file"
+    file_type = upload.declared_type
+    if not file_type or file_type == "application/octet-stream":
+        file_type = mimetypes.guess_type(file_name)[0] or file_type
+    return file_name, file_type or "application/octet-stream"
+
+
+def _ndjson_line(data: dict) -> str:
+    """Format one newline-delimited JSON record."""
+    return json.dumps(data, ensure_ascii=False) + "\n"
+
+
+@router.post(
+    "/respond/file/stream",
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {
+                "multipart/form-data": {
+                    "schema": {
+                        "type": "object",
+                        "required": ["file"],
+                        "properties": {
+                            "file": {"type": "string", "format": "binary", "description": "File to analyze"},
+                            "language": {"type": "string", "default": "English", "description": "Response language"},
+                        },
+                    }
+                }
+            },
+        }
+    },
+    responses={200: {"content": {"application/x-ndjson": {}}, "description": "One JSON record per line"}},
+)
+async def analyze_file_stream_endpoint(request: Request):
+    """
+    Analyze a file sent as multipart/form-data, streaming progress as NDJSON.
+    
+    - **file**: The file; its name and Content-Type are taken from the part
+    - **language**: Language for the AI response
+    
+    Documents longer than one prompt are summarized part by part (split at
+    pages, slides, sheets and headings) and analyzed from the summaries.
+    Lines are `{"type": "progress", "stage": "extract" | "map" | "combine" |
+    "reduce", "completed", "total"}` events, a `{"type": "document",
+    "doc_id", "passages"}` line once a document is indexed for follow-up
+    questions, `{"type": "delta", "text"}` pieces of the answer, then one
+    `{"type": "result", ...}` line with the full answer, or an
+    `{"type": "error", "error"}` line.
     """
     try:
-        # Validate file data
-        if len(request.file) < 100:
+        upload, fields = await receive_file_upload(
+            request,
+            max_bytes=settings.file_max_upload_bytes,
+        )
+    except UploadError as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e))
+    
+    file_name, file_type = _upload_name_and_type(upload)
+    language = fields.get("language") or "English"
+    if upload.size == 0:
+        upload.close()
+        raise HTTPException(status_code=400, detail="Invalid file data. The file is empty.")
+    file = MediaBlob(upload.read(), file_type, sha256=upload.sha256)
+    upload.close()
+    
+    async def event_stream():
+        start = time.perf_counter()
+        try:
+            async for event in analyze_file_stream(file, file_name, language):
+                if event["type"] == "result":
+                    event = {
+                        **event,
+                        "language": language,
+                        "fileName": file_name,
+                        "fileType": file_type,
+                        "total_ms": round((time.perf_counter() - start) * 1000, 1),
+                    }
+                yield _ndjson_line(event)
+        except LLMOverloadedError as e:
+            yield _ndjson_line({"type": "error", "error": f"AI service is busy, please retry shortly: {str(e)}"})
+        except Exception as e:
+            print(f"Error analyzing file {file_name}: {str(e)}")
+            yield _ndjson_line({"type": "error", "error": f"Error analyzing file: {str(e)}"})
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="application/x-ndjson",
+        headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no",
+        },
+    )
+
+
+async def _analyze_upload(upload: StreamedUpload, file_name: str, file_type: str, language: str) -> FileAnalysisResponse:
+    """Analyze a received upload and close it."""
+    try:
+        if upload.size == 0:
             raise HTTPException(
                 status_code=400,
-                detail="Invalid file data. Must be base64 encoded.",
+                detail="Invalid file data. The file is empty.",
             )
-        
-        # Check file size (10MB limit)
-        file_size = len(request.file) * 3 / 4  # Approximate base64 to bytes conversion
-        if file_size > 10 * 1024 * 1024:  # 10MB
-            raise HTTPException(
-                status_code=413,
-                detail="File too large. Maximum size is 10MB.",
-            )
-        
+
+        file_type = file_type or "application/octet-stream"
+        file = MediaBlob(upload.read(), file_type, sha256=upload.sha256)
         response_text = await analyze_file(
-            file_base64=request.file,
-            file_name=request.fileName,
-            file_type=request.fileType,
-            language=request.language,
+            file=file,
+            file_name=file_name,
+            language=language,
         )
-        
+        doc_id = document_id(file, file_name)
+
         return FileAnalysisResponse(
             success=True,
             response=response_text,
-            language=request.language,
-            fileName=request.fileName,
-            fileType=request.fileType,
+            language=language,
+            fileName=file_name,
+            fileType=file_type,
+            docId=doc_id if doc_id and document_index.contains(doc_id) else None,
         )
-        
+
     except HTTPException:
         raise
+    except LLMOverloadedError as e:
+        raise HTTPException(
+            status_code=503,
+            detail=f"AI service is busy, please retry shortly: {str(e)}",
+        )
     except Exception as e:
         raise HTTPException(
             status_code=500,
             detail=f"Error analyzing file: {str(e)}",
         )
+    finally:
+        upload.close()
+
+
+@router.post("/respond/file/{doc_id}/ask", response_model=FileQuestionResponse)
+async def ask_file_question(doc_id: str, request: FileQuestionRequest):
+    """
+    Answer a follow-up question about a previously analyzed document.
+
+    - **doc_id**: `docId` from the file analysis response
+    - **question**: The question
+    - **language**: Language for the AI response
+    - **top_k**: Number of passages to answer from
+
+    The document's passages (split at pages, slides, sheets and headings)
+    are ranked by BM25 against the question and only the best ones are
+    sent to the model, not the whole document.
+    """
+    try:
+        result = await answer_file_question(
+            doc_id,
+            request.question,
+            request.language,
+            top_k=request.top_k or settings.document_index_top_k,
+        )
+    except LLMOverloadedError as e:
+        raise HTTPException(
+            status_code=503,
+            detail=f"AI service is busy, please retry shortly: {str(e)}",
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error answering question: {str(e)}",
+        )
+
+    if result is None:
+        raise HTTPException(
+            status_code=404,
+            detail="Document not found. Upload it again to ask questions about it.",
+        )
+
+    return FileQuestionResponse(
+        success=True,
+        response=result["response"],
+        language=request.language,
+        docId=doc_id,
+        passages=result["passages"],
+    )
+
+
+@router.get("/respond/file/stats")
+async def file_analysis_stats():
+    """
+    Document extraction statistics (jobs, failures, timeouts and throughput
+    per format), extracted-text cache, long-document map-reduce and
+    follow-up question index counters.
+    """
+    return {
+        "success": True,
+        "extraction": document_extractor.get_stats(),
+        "cache": extraction_cache.get_stats(),
+        "summaries": document_summarizer.get_stats(),
+        "index": document_index.get_stats(),
+    }
+
+
+@router.delete("/respond/file/cache")
+async def clear_extraction_cache():
+    """Clear the extracted-text cache."""
+    extraction_cache.clear()
+    return {
+        "success": True,
+        "message": "Extraction cache cleared",
+    }
@@ -1,7 +1,11 @@
 from fastapi import APIRouter, HTTPException
+from ...core.admission import LLMOverloadedError
 from ...models.request_models import ScreenFrameRequest
 from ...models.response_models import ScreenFrameResponse
-from ...services.screen_service import analyze_screen_frame
+from ...services.capture_rate import capture_rate_advisor
+from ...services.frame_dedupe import frame_deduplicator
+from ...services.screen_service import analyze_screen_image, decode_screen_frame
+from ...services.screen_stream_service import screen_stream_manager
 
 router = APIRouter(prefix="/screen", tags=["Screen Share"])
 
@@ -13,6 +17,12 @@ async def analyze_frame_endpoint(request: ScreenFrameRequest):
     
     - **frame**: Base64 encoded image of the screen
     - **language**: Language for the AI response
+    - **session_id**: Optional screen-share session; unchanged frames reuse the last analysis
+    - **capture_interval_ms**: Optional client capture interval
+    
+    The response's `next_capture_ms` recommends when to capture next: later
+    when the screen is static or the AI service is saturated, sooner when
+    the content keeps changing.
     """
     try:
         # Validate base64 (basic check)
@@ -22,21 +32,64 @@ async def analyze_frame_endpoint(request: ScreenFrameRequest):
                 detail="Invalid frame data. Must be base64 encoded image.",
             )
         
-        response_text = await analyze_screen_frame(
-            frame_base64=request.frame,
-            language=request.language,
-        )
+        frame = decode_screen_frame(request.frame)
+        capture_rate_advisor.begin(request.session_id)
+        try:
+            response_text, skipped = await analyze_screen_image(
+                frame=frame,
+                language=request.language,
+                session_id=request.session_id,
+            )
+        finally:
+            capture_rate_advisor.end(request.session_id)
+        
+        if frame_deduplicator.enabled:
+            capture_rate_advisor.record(request.session_id, changed=not skipped)
         
         return ScreenFrameResponse(
             success=True,
             response=response_text,
             language=request.language,
+            skipped=skipped,
+            next_capture_ms=capture_rate_advisor.recommend(request.session_id, request.capture_interval_ms),
         )
         
     except HTTPException:
         raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except LLMOverloadedError as e:
+        raise HTTPException(
+            status_code=503,
+            detail=f"AI service is busy, please retry shortly: {str(e)}",
+        )
     except Exception as e:
         raise HTTPException(
             status_code=500,
             detail=f"Error analyzing screen: {str(e)}",
         )
+
+
+@router.get("/stats")
+async def screen_stats():
+    """
+    Screen frame statistics: deduplication (frames skipped against frames
+    analyzed), WebSocket stream scheduling (frames received and dropped)
+    and recommended capture intervals.
+    """
+    return {
+        "success": True,
+        "dedupe": frame_deduplicator.get_stats(),
+        "stream": screen_stream_manager.get_stats(),
+        "capture_rate": capture_rate_advisor.get_stats(),
+    }
+
+
+@router.delete("/sessions/{session_id}")
+async def end_screen_session(session_id: str):
+    """
+    Forget a screen-share session's last analyzed frame.
+    """
+    frame_deduplicator.forget(session_id)
+    capture_rate_advisor.forget(session_id)
+    return {"success": True, "session_id": session_id}
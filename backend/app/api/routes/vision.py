@@ -1,53 +1,211 @@
-from fastapi import APIRouter, UploadFile, File, Form, HTTPException
+import json
+import time
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import StreamingResponse
+from ...core.admission import LLMOverloadedError
+from ...core.config import settings
+from ...core.media import MediaBlob
 from ...models.response_models import VisionResponse
-from ...services.vision_service import analyze_image
+from ...services.image_normalizer import image_normalizer
+from ...services.upload_service import UploadError, receive_image_upload, receive_image_uploads
+from ...services.vision_service import analyze_image, analyze_image_batch, vision_response_cache
 
 router = APIRouter(prefix="/vision", tags=["Vision"])
 
+ALLOWED_IMAGE_TYPES = ("image/png", "image/jpeg", "image/gif", "image/webp")
 
-@router.post("/analyze", response_model=VisionResponse)
-async def analyze_image_endpoint(
-    file: UploadFile = File(..., description="Image file to analyze"),
-    language: str = Form(default="English", description="Response language"),
-):
+
+@router.post(
+    "/analyze",
+    response_model=VisionResponse,
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {
+                "multipart/form-data": {
+                    "schema": {
+                        "type": "object",
+                        "required": ["file"],
+                        "properties": {
+                            "file": {"type": "string", "format": "binary", "description": "Image file to analyze"},
+                            "language": {"type": "string", "default": "English", "description": "Response language"},
+                            "use_cache": {"type": "boolean", "default": True, "description": "Allow a cached analysis of the same image"},
+                        },
+                    }
+                }
+            },
+        }
+    },
+)
+async def analyze_image_endpoint(request: Request):
     """
     Analyze an uploaded image and provide explanation.
     
     - **file**: Image file (PNG, JPG, GIF, WebP)
     - **language**: Language for the AI response
+    - **use_cache**: Set to false to always generate a fresh analysis
+    
+    The upload is streamed: the size limit is enforced as bytes arrive and
+    the image type is checked from the file's magic bytes.
     """
-    # Validate file type
-    allowed_types = ["image/png", "image/jpeg", "image/gif", "image/webp"]
-    if file.content_type not in allowed_types:
-        raise HTTPException(
-            status_code=400,
-            detail=f"Invalid file type. Allowed: {', '.join(allowed_types)}",
+    try:
+        upload, fields = await receive_image_upload(
+            request,
+            max_bytes=settings.vision_max_upload_bytes,
+            allowed_mime_types=ALLOWED_IMAGE_TYPES,
         )
+    except UploadError as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e))
     
-    # Validate file size (max 20MB)
-    max_size = 20 * 1024 * 1024  # 20MB
-    contents = await file.read()
-    if len(contents) > max_size:
-        raise HTTPException(
-            status_code=400,
-            detail="File too large. Maximum size is 20MB.",
-        )
+    language = fields.get("language") or "English"
     
     try:
-        response_text = await analyze_image(
-            image_bytes=contents,
+        response_text, preprocessing, cached = await analyze_image(
+            image=MediaBlob(upload.read(), upload.mime_type, sha256=upload.sha256),
             language=language,
-            filename=file.filename or "image.jpg",
+            filename=upload.filename or "image.jpg",
+            use_cache=fields.get("use_cache", "true").lower() not in ("false", "0"),
         )
         
         return VisionResponse(
             success=True,
             response=response_text,
             language=language,
+            preprocessing=preprocessing,
+            cached=cached,
         )
         
+    except LLMOverloadedError as e:
+        raise HTTPException(
+            status_code=503,
+            detail=f"AI service is busy, please retry shortly: {str(e)}",
+        )
     except Exception as e:
         raise HTTPException(
             status_code=500,
             detail=f"Error analyzing image: {str(e)}",
         )
+    finally:
+        upload.close()
+
+
+def _ndjson_line(data: dict) -> str:
+    """Format one newline-delimited JSON record."""
+    return json.dumps(data, ensure_ascii=False) + "\n"
+
+
+@router.post(
+    "/analyze-batch",
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {
+                "multipart/form-data": {
+                    "schema": {
+                        "type": "object",
+                        "required": ["files"],
+                        "properties": {
+                            "files": {
+                                "type": "array",
+                                "items": {"type": "string", "format": "binary"},
+                                "description": "Image files to analyze",
+                            },
+                            "language": {"type": "string", "default": "English", "description": "Response language"},
+                            "use_cache": {"type": "boolean", "default": True, "description": "Allow cached analyses of the same images"},
+                        },
+                    }
+                }
+            },
+        }
+    },
+    responses={200: {"content": {"application/x-ndjson": {}}, "description": "One JSON record per line"}},
+)
+async def analyze_image_batch_endpoint(request: Request):
+    """
+    Analyze many uploaded images (e.g. a stack of worksheet photos).
+    
+    - **files**: Image files (PNG, JPG, GIF, WebP), repeated field
+    - **language**: Language for the AI responses
+    - **use_cache**: Set to false to always generate fresh analyses
+    
+    Images are analyzed a few at a time through the same pipeline as
+    `/vision/analyze`. Results stream back as NDJSON in completion order:
+    one `{"type": "result", "index": ...}` line per image (`index` is its
+    position in the upload), then a `{"type": "done", ...}` line. A file
+    that is too large or not an image gets a failed result; it does not
+    fail the batch.
+    """
+    try:
+        uploads, fields = await receive_image_uploads(
+            request,
+            max_bytes=settings.vision_max_upload_bytes,
+            max_total_bytes=settings.vision_batch_max_total_bytes,
+            allowed_mime_types=ALLOWED_IMAGE_TYPES,
+            max_files=settings.vision_batch_max_files,
+        )
+    except UploadError as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e))
+    
+    language = fields.get("language") or "English"
+    use_cache = fields.get("use_cache", "true").lower() not in ("false", "0")
+    
+    async def result_stream():
+        start = time.perf_counter()
+        succeeded = failed = 0
+        first_result_ms = None
+        
+        async for result in analyze_image_batch(
+            uploads,
+            language,
+            use_cache=use_cache,
+            concurrency=settings.vision_batch_concurrency,
+        ):
+            if first_result_ms is None:
+                first_result_ms = round((time.perf_counter() - start) * 1000, 1)
+            if result["success"]:
+                succeeded += 1
+            else:
+                failed += 1
+            yield _ndjson_line({"type": "result", **result})
+        
+        yield _ndjson_line({
+            "type": "done",
+            "success": failed == 0,
+            "language": language,
+            "total": len(uploads),
+            "succeeded": succeeded,
+            "failed": failed,
+            "first_result_ms": first_result_ms,
+            "total_ms": round((time.perf_counter() - start) * 1000, 1),
+        })
+    
+    return StreamingResponse(
+        result_stream(),
+        media_type="application/x-ndjson",
+        headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no",
+        },
+    )
+
+
+@router.get("/stats")
+async def vision_stats():
+    """
+    Vision analysis cache and image normalization statistics (bytes saved, CPU time).
+    """
+    return {
+        "success": True,
+        "cache": vision_response_cache.get_stats(),
+        "normalization": image_normalizer.get_stats(),
+    }
+
+
+@router.delete("/cache")
+async def clear_vision_cache():
+    """Clear the vision analysis cache."""
+    await vision_response_cache.clear()
+    return {
+        "success": True,
+        "message": "Vision analysis cache cleared",
+    }
@@ -1,17 +1,46 @@
 import asyncio
 import json
+from typing import Optional
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect, HTTPException
 from ...services.websocket_service import websocket_service
 from ...services.heygen_live_service import heygen_live_service
+from ...core.config import settings
+from ...core.media import MediaBlob
+from ...services.speech_pipeline_service import speak_chat_response
+from ...services.upload_service import sniff_image_mime_type
+from ...services.screen_stream_service import screen_stream_manager
 
 
 router = APIRouter(prefix="/ws", tags=["WebSocket"])
 
+SCREEN_FRAME_TYPES = ("image/jpeg", "image/webp", "image/png")
+
 
 @router.websocket("/live-avatar/{session_id}")
 async def websocket_endpoint(websocket: WebSocket, session_id: str):
     """WebSocket endpoint for LiveAvatar streaming."""
     await websocket.accept()
+    ask_task = None
+    
+    async def run_ask(message: dict):
+        """Stream a tutor answer to the avatar, sentence by sentence."""
+        try:
+            result = await speak_chat_response(
+                session_id=session_id,
+                message=message["message"],
+                language=message.get("language", "English"),
+                context=message.get("context"),
+                notify=websocket.send_json,
+                conversation_id=message.get("conversation_id"),
+            )
+            await websocket.send_json({"type": "ask_complete", "success": True, **result})
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            await websocket.send_json({
+                "type": "error",
+                "message": f"Error generating answer: {str(e)}"
+            })
     
     try:
         # Connect client WebSocket
@@ -71,6 +100,14 @@ async def websocket_endpoint(websocket: WebSocket, session_id: str):
                             "message": response_message
                         })
                 
+                elif message.get("type") == "ask":
+                    # Generate the answer and speak it while it streams;
+                    # a new question interrupts the one in progress
+                    if message.get("message"):
+                        if ask_task and not ask_task.done():
+                            ask_task.cancel()
+                        ask_task = asyncio.create_task(run_ask(message))
+                
                 elif message.get("type") == "ping":
                     await websocket.send_json({
                         "type": "pong",
@@ -78,6 +115,8 @@ async def websocket_endpoint(websocket: WebSocket, session_id: str):
                     })
                 
                 elif message.get("type") == "stop":
+                    if ask_task and not ask_task.done():
+                        ask_task.cancel()
                     # Stop the session
                     await heygen_live_service.stop_session(session_id)
                     await websocket.send_json({
@@ -104,5 +143,122 @@ async def websocket_endpoint(websocket: WebSocket, session_id: str):
     except Exception as e:
         print(f"WebSocket error: {e}")
     finally:
+        if ask_task and not ask_task.done():
+            ask_task.cancel()
         # Cleanup connections
         await websocket_service.cleanup_session(session_id)
+
+
+@router.websocket("/screen/{session_id}")
+async def screen_stream_endpoint(
+    websocket: WebSocket,
+    session_id: str,
+    language: str = "English",
+    mode: str = "latest",
+    window_seconds: Optional[float] = None,
+    capture_interval_ms: Optional[int] = None,
+):
+    """
+    WebSocket endpoint for streaming screen frames.
+    
+    The client sends raw JPEG/WebP/PNG frames as binary messages and JSON
+    control messages as text ({"type": "config", "language": ...,
+    "capture_interval_ms": ...}, "ping", "stop"). Results carry
+    `next_capture_ms`, the recommended delay before the next frame.
+    
+    - **mode=latest** (default): only the newest waiting frame is analyzed;
+      results are pushed back as {"type": "analysis", ...} messages.
+    - **mode=window**: the distinct frames of each `window_seconds` window
+      are summarized in one call, streamed back as "summary_start",
+      "summary_chunk" and "summary" messages.
+    """
+    await websocket.accept()
+    if mode not in ("latest", "window"):
+        await websocket.send_json({
+            "type": "error",
+            "message": "Invalid mode. Use 'latest' or 'window'."
+        })
+        await websocket.close()
+        return
+    if capture_interval_ms is not None and capture_interval_ms <= 0:
+        await websocket.send_json({
+            "type": "error",
+            "message": "Invalid capture_interval_ms. Use a positive number of milliseconds."
+        })
+        await websocket.close()
+        return
+    
+    stream = screen_stream_manager.open(session_id, language, websocket.send_json, mode, window_seconds)
+    stream.capture_interval_ms = capture_interval_ms
+    
+    try:
+        await websocket.send_json({
+            "type": "connected",
+            "message": "Connected to screen stream",
+            "language": language,
+            "mode": mode,
+            **({"window_seconds": stream.window_seconds} if mode == "window" else {})
+        })
+        
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                break
+            
+            frame = message.get("bytes")
+            if frame is not None:
+                if len(frame) > settings.screen_stream_max_frame_bytes:
+                    await websocket.send_json({
+                        "type": "error",
+                        "message": f"Frame too large ({len(frame)} bytes, max {settings.screen_stream_max_frame_bytes})"
+                    })
+                    continue
+                
+                mime_type = sniff_image_mime_type(frame)
+                if mime_type not in SCREEN_FRAME_TYPES:
+                    await websocket.send_json({
+                        "type": "error",
+                        "message": "Unsupported frame format. Send JPEG, WebP or PNG."
+                    })
+                    continue
+                
+                stream.submit(MediaBlob(frame, mime_type))
+                continue
+            
+            try:
+                control = json.loads(message.get("text") or "")
+            except json.JSONDecodeError:
+                control = None
+            if not isinstance(control, dict):
+                await websocket.send_json({
+                    "type": "error",
+                    "message": "Invalid JSON format"
+                })
+                continue
+            
+            if control.get("type") == "config":
+                if control.get("language"):
+                    stream.language = control["language"]
+                if isinstance(control.get("capture_interval_ms"), int) and control["capture_interval_ms"] > 0:
+                    stream.capture_interval_ms = control["capture_interval_ms"]
+            
+            elif control.get("type") == "ping":
+                await websocket.send_json({
+                    "type": "pong",
+                    "timestamp": asyncio.get_event_loop().time()
+                })
+            
+            elif control.get("type") == "stop":
+                await websocket.send_json({
+                    "type": "stopped",
+                    "message": "Screen stream stopped",
+                    **stream.get_stats()
+                })
+                break
+    
+    except WebSocketDisconnect:
+        pass
+    except Exception as e:
+        print(f"Screen stream WebSocket error: {e}")
+    finally:
+        await screen_stream_manager.close(stream)
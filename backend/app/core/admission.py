@@ -0,0 +1,223 @@
+import asyncio
+import random
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Deque, Dict, Optional
+
+try:
+    from google.api_core import exceptions as google_exceptions
+except ImportError:  # pragma: no cover - google-api-core ships with google-generativeai
+    google_exceptions = None
+
+
+# Priority classes, highest first
+PRIORITIES = ("interactive", "screen", "batch")
+
+
+class LLMOverloadedError(Exception):
+    """Raised when a priority queue is full and a request cannot be admitted."""
+
+
+def is_rate_limit_error(error: Exception) -> bool:
+    """Check whether an exception is a provider rate-limit (HTTP 429) error."""
+    if google_exceptions and isinstance(
+        error, (google_exceptions.ResourceExhausted, google_exceptions.TooManyRequests)
+    ):
+        return True
+    if getattr(error, "code", None) == 429 or getattr(error, "status_code", None) == 429:
+        return True
+    message = str(error).lower()
+    return "resource exhausted" in message or "rate limit" in message or message.startswith("429")
+
+
+class AdmissionController:
+    """
+    Schedules LLM calls by priority under a concurrency limit and a token
+    bucket rate limit.
+
+    Waiting requests sit in bounded per-priority queues and are admitted
+    highest priority first (interactive > screen > batch). When the
+    provider returns a rate-limit error, admission pauses with
+    exponential backoff. A successful call resets the backoff.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int,
+        requests_per_minute: float = 0,
+        burst: int = 10,
+        max_queue_size: int = 100,
+        backoff_base_seconds: float = 1.0,
+        backoff_max_seconds: float = 60.0,
+    ):
+        self.max_concurrency = max_concurrency
+        self.rate = requests_per_minute / 60.0
+        self.burst = burst
+        self.max_queue_size = max_queue_size
+        self.backoff_base_seconds = backoff_base_seconds
+        self.backoff_max_seconds = backoff_max_seconds
+
+        self._tokens = float(burst)
+        self._last_refill = time.monotonic()
+        self._paused_until = 0.0
+        self._backoff_level = 0
+        self._timer: Optional[asyncio.TimerHandle] = None
+
+        self.in_flight = 0
+        self.rate_limited = 0
+        self._queues: Dict[str, Deque[asyncio.Future]] = {p: deque() for p in PRIORITIES}
+        self._stats: Dict[str, Dict[str, Any]] = {
+            p: {"admitted": 0, "rejected": 0, "total_wait": 0.0, "max_wait": 0.0, "recent_waits": deque(maxlen=200)}
+            for p in PRIORITIES
+        }
+
+    @asynccontextmanager
+    async def slot(self, priority: str = "interactive") -> AsyncIterator[None]:
+        """
+        Wait for admission at the given priority and hold a slot.
+
+        Raises:
+            LLMOverloadedError: If the priority's queue is full
+        """
+        await self.acquire(priority)
+        try:
+            yield
+        finally:
+            self.release()
+
+    async def acquire(self, priority: str = "interactive"):
+        """Wait until a request at this priority is admitted."""
+        if priority not in self._queues:
+            raise ValueError(f"Unknown priority: {priority}")
+
+        queue = self._queues[priority]
+        stats = self._stats[priority]
+        if len(queue) >= self.max_queue_size:
+            stats["rejected"] += 1
+            raise LLMOverloadedError(f"LLM {priority} queue is full ({self.max_queue_size} waiting)")
+
+        waiter = asyncio.get_running_loop().create_future()
+        queue.append(waiter)
+        enqueued_at = time.monotonic()
+        self._dispatch()
+
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # Admitted just before the caller went away
+                self.release()
+            elif waiter in queue:
+                queue.remove(waiter)
+            raise
+
+        wait = time.monotonic() - enqueued_at
+        stats["admitted"] += 1
+        stats["total_wait"] += wait
+        stats["max_wait"] = max(stats["max_wait"], wait)
+        stats["recent_waits"].append(wait)
+
+    def release(self):
+        """Release an admitted slot."""
+        self.in_flight -= 1
+        self._dispatch()
+
+    def report_rate_limited(self):
+        """Pause admission with exponential backoff after a rate-limit error."""
+        self.rate_limited += 1
+        delay = min(self.backoff_max_seconds, self.backoff_base_seconds * (2 ** self._backoff_level))
+        delay *= 0.5 + random.random() / 2  # jitter
+        self._paused_until = max(self._paused_until, time.monotonic() + delay)
+        self._backoff_level += 1
+
+    def report_success(self):
+        """Reset backoff after a successful call."""
+        self._backoff_level = 0
+
+    def queue_depth(self) -> int:
+        """Total number of requests waiting across all priorities."""
+        return sum(len(queue) for queue in self._queues.values())
+
+    def pressure(self) -> float:
+        """
+        Load relative to capacity: (in-flight + waiting) / max_concurrency.
+
+        Below 1 there is spare capacity; above 1 requests are queueing. While
+        admission is paused after a rate-limit error, at least 2 is reported.
+        """
+        load = (self.in_flight + self.queue_depth()) / max(1, self.max_concurrency)
+        if time.monotonic() < self._paused_until:
+            load = max(load, 2.0)
+        return load
+
+    def _refill(self, now: float):
+        if self.rate <= 0:
+            return
+        self._tokens = min(self.burst, self._tokens + (now - self._last_refill) * self.rate)
+        self._last_refill = now
+
+    def _next_waiter(self) -> Optional[asyncio.Future]:
+        for priority in PRIORITIES:
+            queue = self._queues[priority]
+            while queue and queue[0].done():
+                queue.popleft()
+            if queue:
+                return queue.popleft()
+        return None
+
+    def _dispatch(self):
+        """Admit as many waiters as the current limits allow."""
+        now = time.monotonic()
+        self._refill(now)
+
+        while self.in_flight < self.max_concurrency and self.queue_depth():
+            if now < self._paused_until:
+                self._schedule(self._paused_until - now)
+                return
+            if self.rate > 0 and self._tokens < 1:
+                self._schedule((1 - self._tokens) / self.rate)
+                return
+
+            waiter = self._next_waiter()
+            if waiter is None:
+                return
+            if self.rate > 0:
+                self._tokens -= 1
+            self.in_flight += 1
+            waiter.set_result(None)
+
+    def _schedule(self, delay: float):
+        """Run dispatch again once tokens refill or a backoff pause ends."""
+        if self._timer is not None and not self._timer.cancelled():
+            self._timer.cancel()
+        self._timer = asyncio.get_running_loop().call_later(delay, self._dispatch)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get admission statistics, including queue-time metrics per priority."""
+        now = time.monotonic()
+        self._refill(now)
+        priorities = {}
+        for priority in PRIORITIES:
+            stats = self._stats[priority]
+            waits = sorted(stats["recent_waits"])
+            priorities[priority] = {
+                "queued": len(self._queues[priority]),
+                "admitted": stats["admitted"],
+                "rejected": stats["rejected"],
+                "avg_wait_ms": round(stats["total_wait"] / stats["admitted"] * 1000, 1) if stats["admitted"] else 0.0,
+                "p95_wait_ms": round(waits[min(len(waits) - 1, int(len(waits) * 0.95))] * 1000, 1) if waits else 0.0,
+                "max_wait_ms": round(stats["max_wait"] * 1000, 1),
+            }
+
+        return {
+            "max_concurrency": self.max_concurrency,
+            "requests_per_minute": self.rate * 60,
+            "tokens": round(self._tokens, 2) if self.rate > 0 else None,
+            "in_flight": self.in_flight,
+            "pressure": round(self.pressure(), 2),
+            "rate_limited": self.rate_limited,
+            "backoff_level": self._backoff_level,
+            "paused_for_seconds": round(max(0.0, self._paused_until - now), 2),
+            "priorities": priorities,
+        }
@@ -10,6 +10,111 @@ class Settings(BaseSettings):
     google_api_key: str = ""
     gemini_model: str = "gemini-2.5-flash"
     gemini_vision_model: str = "gemini-2.5-flash"
+    gemini_text_model: str = "gemini-2.5-flash"
+    
+    # Gemini Execution Configuration
+    gemini_max_concurrency: int = 16
+    gemini_use_async_api: bool = True
+    gemini_requests_per_minute: int = 0  # 0 disables the token bucket
+    gemini_rate_limit_burst: int = 10
+    gemini_max_queue_size: int = 100
+    gemini_rate_limit_retries: int = 2
+    gemini_model_cache_max_entries: int = 256  # configured models per (model, language, persona)
+    
+    # Services whose identical in-flight requests share one Gemini call
+    single_flight_services: str = "chat,screen"
+    
+    # Chat Response Cache Configuration
+    chat_cache_enabled: bool = True
+    chat_cache_ttl_seconds: int = 3600
+    chat_cache_max_entries: int = 1000
+    chat_cache_max_bytes: int = 32 * 1024 * 1024
+    chat_cache_disk_enabled: bool = False
+    chat_cache_dir: str = "data/cache/chat"
+    chat_cache_disk_max_bytes: int = 256 * 1024 * 1024
+    
+    # Conversation Store Configuration
+    conversation_recent_turns: int = 8
+    conversation_token_budget: int = 3000
+    conversation_ttl_seconds: int = 6 * 60 * 60
+    conversation_max_count: int = 1000
+    
+    # Screen Frame Deduplication (perceptual hash)
+    screen_dedupe_enabled: bool = True
+    screen_dedupe_hash_size: int = 16  # hash_size^2 bits; larger catches smaller text changes
+    screen_dedupe_max_distance: int = 8  # max differing bits to treat a frame as unchanged
+    screen_dedupe_max_reuse_seconds: int = 120  # re-analyze an unchanged screen after this long (0 = never)
+    screen_session_ttl_seconds: int = 30 * 60
+    screen_max_sessions: int = 1000
+    screen_stream_max_frame_bytes: int = 8 * 1024 * 1024
+    
+    # Screen Changed-Region Cropping (frame differencing against the last analyzed frame)
+    screen_crop_enabled: bool = True
+    screen_crop_max_area: float = 0.5  # send the full frame when more than this fraction changed
+    screen_crop_margin: float = 0.03  # context padding around the changed box, as a fraction of the frame
+    screen_crop_context_chars: int = 2000  # previous analysis passed along with a crop
+    screen_diff_width: int = 320  # thumbnail width used for hashing and differencing
+    screen_diff_threshold: int = 24  # grayscale difference counted as a changed pixel
+    
+    # Screen Capture Rate (recommended next-capture interval returned to clients)
+    screen_capture_interval_ms: int = 5000  # base interval when the client does not send its own
+    screen_capture_min_interval_ms: int = 1000
+    screen_capture_max_interval_ms: int = 30000
+    screen_capture_history: int = 10  # recent frames used for the change rate
+    
+    # Screen Window Summaries (WebSocket mode=window: distinct frames batched into one call)
+    screen_window_seconds: float = 10.0
+    screen_window_max_seconds: float = 60.0
+    screen_window_max_frames: int = 8  # images per summary request
+    screen_window_context_chars: int = 2000  # previous summary passed along for continuity
+    
+    # Vision Uploads
+    vision_max_upload_bytes: int = 20 * 1024 * 1024
+    vision_batch_max_files: int = 50
+    vision_batch_max_total_bytes: int = 200 * 1024 * 1024
+    vision_batch_concurrency: int = 4  # analyses running at once per batch request
+    
+    # File Analysis Uploads (/api/chat/respond/file, JSON base64 or multipart)
+    file_max_upload_bytes: int = 10 * 1024 * 1024  # decoded size
+    
+    # Document Text Extraction (PDF, DOCX, XLSX, CSV, PPTX in worker processes)
+    document_extract_workers: int = 2
+    document_extract_timeout_seconds: float = 20.0  # per document; the worker is killed after this
+    document_extract_memory_limit_mb: int = 1024  # address-space limit of each worker
+    document_extract_max_chars: int = 2_000_000  # text extracted per document
+    
+    # Extracted Text Cache (keyed by file SHA-256; memory-mapped files on disk)
+    extraction_cache_enabled: bool = True
+    extraction_cache_dir: str = "data/cache/extraction"
+    extraction_cache_max_bytes: int = 1024 * 1024 * 1024
+    
+    # Long Documents (map-reduce: summarized part by part, then analyzed from the summaries)
+    document_single_prompt_chars: int = 100000  # longer documents use map-reduce
+    document_summary_chunk_chars: int = 12000
+    document_summary_concurrency: int = 4  # part summaries running at once per document
+    
+    # Document Questions (BM25 over passages; only the top-k go into the prompt)
+    document_index_passage_chars: int = 1500
+    document_index_top_k: int = 5
+    document_index_max_documents: int = 200  # indexes kept in memory, least recently used evicted
+    document_index_max_chars: int = 50_000_000  # total indexed text kept in memory
+    
+    # Vision Analysis Cache (keyed by image SHA-256, language, model and prompt version)
+    vision_cache_enabled: bool = True
+    vision_cache_ttl_seconds: int = 7 * 24 * 60 * 60
+    vision_cache_max_entries: int = 2000
+    vision_cache_max_bytes: int = 16 * 1024 * 1024
+    vision_cache_disk_enabled: bool = True
+    vision_cache_dir: str = "data/cache/vision"
+    vision_cache_disk_max_bytes: int = 512 * 1024 * 1024
+    
+    # Image Normalization (before vision calls)
+    image_normalize_enabled: bool = True
+    image_max_dimension: int = 1536  # longest side sent to the vision model
+    image_output_format: str = "JPEG"  # JPEG or WEBP
+    image_output_quality: int = 85
+    image_normalize_workers: int = 2
+    image_normalize_cache_max_bytes: int = 64 * 1024 * 1024
     
     # HeyGen Configuration
     heygen_api_key: str = ""
@@ -27,6 +132,11 @@ class Settings(BaseSettings):
         """Parse CORS origins string into list."""
         return [origin.strip() for origin in self.cors_origins.split(",")]
     
+    @property
+    def single_flight_services_list(self) -> List[str]:
+        """Parse single-flight services string into list."""
+        return [service.strip() for service in self.single_flight_services.split(",") if service.strip()]
+    
     class Config:
         env_file = ".env"
         env_file_encoding = "utf-8"
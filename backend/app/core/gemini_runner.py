@@ -0,0 +1,221 @@
+import asyncio
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, AsyncIterator, Dict, Optional
+from .admission import AdmissionController, is_rate_limit_error
+from .config import settings
+
+
+class GeminiRunner:
+    """
+    Runs Gemini generation calls without blocking the event loop.
+
+    Calls go through the SDK's async API when the model provides it and
+    otherwise through a bounded thread pool. Every call is admitted by the
+    shared AdmissionController, which enforces the concurrency and rate
+    limits, orders waiting calls by priority, and backs off when the
+    provider returns rate-limit errors. A rate-limited call is retried
+    after the backoff.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int,
+        use_async_api: bool = True,
+        admission: Optional[AdmissionController] = None,
+        rate_limit_retries: int = 2,
+    ):
+        self.max_concurrency = max_concurrency
+        self.use_async_api = use_async_api
+        self.admission = admission or AdmissionController(max_concurrency=max_concurrency)
+        self.rate_limit_retries = rate_limit_retries
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_concurrency,
+            thread_name_prefix="gemini",
+        )
+        self.in_flight = 0
+        self.completed = 0
+        self.failed = 0
+
+    async def generate(
+        self,
+        model: Any,
+        contents: Any,
+        generation_config: Optional[Dict[str, Any]] = None,
+        priority: str = "interactive",
+        **kwargs: Any,
+    ) -> Any:
+        """
+        Generate content with the given model without blocking the event loop.
+
+        Args:
+            model: A configured GenerativeModel (or any object with the same API)
+            contents: Prompt contents passed through to the model
+            generation_config: Optional generation config
+            priority: Admission priority ("interactive", "screen" or "batch")
+
+        Returns:
+            The model response object
+
+        Raises:
+            LLMOverloadedError: If the priority's admission queue is full
+        """
+        for attempt in range(self.rate_limit_retries + 1):
+            async with self.admission.slot(priority):
+                self.in_flight += 1
+                try:
+                    if self.use_async_api and hasattr(model, "generate_content_async"):
+                        response = await model.generate_content_async(
+                            contents,
+                            generation_config=generation_config,
+                            **kwargs,
+                        )
+                    else:
+                        loop = asyncio.get_running_loop()
+                        response = await loop.run_in_executor(
+                            self._executor,
+                            functools.partial(
+                                model.generate_content,
+                                contents,
+                                generation_config=generation_config,
+                                **kwargs,
+                            ),
+                        )
+                except Exception as e:
+                    if is_rate_limit_error(e):
+                        self.admission.report_rate_limited()
+                        if attempt < self.rate_limit_retries:
+                            continue
+                    self.failed += 1
+                    raise
+                finally:
+                    self.in_flight -= 1
+
+            self.admission.report_success()
+            self.completed += 1
+            return response
+
+    async def stream(
+        self,
+        model: Any,
+        contents: Any,
+        generation_config: Optional[Dict[str, Any]] = None,
+        priority: str = "interactive",
+        **kwargs: Any,
+    ) -> AsyncIterator[Any]:
+        """
+        Stream response chunks from the model as they are generated.
+
+        The admission slot is held until the stream is exhausted or closed.
+        A rate-limit error is retried only if no chunk has been yielded yet.
+
+        Args:
+            model: A configured GenerativeModel (or any object with the same API)
+            contents: Prompt contents passed through to the model
+            generation_config: Optional generation config
+            priority: Admission priority ("interactive", "screen" or "batch")
+
+        Yields:
+            Response chunk objects in arrival order
+        """
+        for attempt in range(self.rate_limit_retries + 1):
+            yielded = False
+            async with self.admission.slot(priority):
+                self.in_flight += 1
+                try:
+                    if self.use_async_api and hasattr(model, "generate_content_async"):
+                        response = await model.generate_content_async(
+                            contents,
+                            generation_config=generation_config,
+                            stream=True,
+                            **kwargs,
+                        )
+                        async for chunk in response:
+                            yielded = True
+                            yield chunk
+                    else:
+                        async for chunk in self._stream_in_thread(
+                            model, contents, generation_config, **kwargs
+                        ):
+                            yielded = True
+                            yield chunk
+                except Exception as e:
+                    if is_rate_limit_error(e):
+                        self.admission.report_rate_limited()
+                        if not yielded and attempt < self.rate_limit_retries:
+                            continue
+                    self.failed += 1
+                    raise
+                finally:
+                    self.in_flight -= 1
+
+            self.admission.report_success()
+            self.completed += 1
+            return
+
+    async def _stream_in_thread(
+        self,
+        model: Any,
+        contents: Any,
+        generation_config: Optional[Dict[str, Any]],
+        **kwargs: Any,
+    ) -> AsyncIterator[Any]:
+        """Iterate a blocking streamed response on the thread pool."""
+        loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue()
+        done = object()
+        cancelled = threading.Event()
+
+        def pump():
+            try:
+                response = model.generate_content(
+                    contents,
+                    generation_config=generation_config,
+                    stream=True,
+                    **kwargs,
+                )
+                for chunk in response:
+                    if cancelled.is_set():
+                        break
+                    loop.call_soon_threadsafe(queue.put_nowait, chunk)
+                loop.call_soon_threadsafe(queue.put_nowait, done)
+            except Exception as e:
+                loop.call_soon_threadsafe(queue.put_nowait, e)
+
+        loop.run_in_executor(self._executor, pump)
+        try:
+            while True:
+                item = await queue.get()
+                if item is done:
+                    break
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        finally:
+            cancelled.set()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get current runner statistics."""
+        return {
+            "max_concurrency": self.max_concurrency,
+            "use_async_api": self.use_async_api,
+            "in_flight": self.in_flight,
+            "completed": self.completed,
+            "failed": self.failed,
+            "admission": self.admission.get_stats(),
+        }
+
+
+# Singleton runner instance
+gemini_runner = GeminiRunner(
+    max_concurrency=settings.gemini_max_concurrency,
+    use_async_api=settings.gemini_use_async_api,
+    admission=AdmissionController(
+        max_concurrency=settings.gemini_max_concurrency,
+        requests_per_minute=settings.gemini_requests_per_minute,
+        burst=settings.gemini_rate_limit_burst,
+        max_queue_size=settings.gemini_max_queue_size,
+    ),
+    rate_limit_retries=settings.gemini_rate_limit_retries,
+)
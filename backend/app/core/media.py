@@ -0,0 +1,104 @@
+import base64
+import binascii
+import hashlib
+from typing import Any, Dict, Optional, Union
+
+BufferLike = Union[bytes, bytearray, memoryview]
+
+
+class MediaBlob:
+    """
+    Binary media (an image or uploaded file) decoded once at the edge.
+
+    Routes turn the request payload (raw WebSocket bytes, a streamed upload,
+    a base64 JSON field) into a MediaBlob; services pass it along unchanged
+    and hand the same bytes object to the model client. Slices are
+    memoryviews over the original buffer, and the SHA-256 is computed at
+    most once.
+    """
+
+    __slots__ = ("_data", "mime_type", "_sha256")
+
+    def __init__(self, data: BufferLike, mime_type: str, sha256: Optional[str] = None):
+        """
+        Args:
+            data: Decoded media bytes (a bytearray or memoryview is converted once)
+            mime_type: MIME type of the media
+            sha256: Hex SHA-256 of data, if already computed (e.g. while receiving)
+        """
+        self._data = data if isinstance(data, bytes) else bytes(data)
+        self.mime_type = mime_type
+        self._sha256 = sha256
+
+    @classmethod
+    def from_base64(cls, value: str, mime_type: Optional[str] = None) -> "MediaBlob":
+        """
+        Decode a base64 payload, optionally given as a data URL.
+
+        Args:
+            value: Base64 text or "data:<mime>;base64,<data>"
+            mime_type: MIME type; defaults to the data URL's type, else
+                "application/octet-stream"
+
+        Returns:
+            The decoded blob
+
+        Raises:
+            ValueError: If the payload is not valid base64
+        """
+        if value.startswith("data:"):
+            header, _, value = value.partition(",")
+            if mime_type is None and ";base64" in header:
+                mime_type = header[5:].split(";", 1)[0] or None
+
+        try:
+            data = base64.b64decode(value, validate=True)
+        except (binascii.Error, ValueError):
+            # Tolerate line-wrapped base64 from older clients
+            try:
+                data = base64.b64decode(value)
+            except (binascii.Error, ValueError):
+                raise ValueError("Invalid base64 data")
+
+        return cls(data, mime_type or "application/octet-stream")
+
+    @property
+    def data(self) -> bytes:
+        """The media bytes (not copied)."""
+        return self._data
+
+    @property
+    def size(self) -> int:
+        return len(self._data)
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    @property
+    def sha256(self) -> str:
+        """Hex SHA-256 of the content, computed on first use."""
+        if self._sha256 is None:
+            self._sha256 = hashlib.sha256(self._data).hexdigest()
+        return self._sha256
+
+    def view(self, start: int = 0, end: Optional[int] = None) -> memoryview:
+        """A zero-copy slice of the content."""
+        return memoryview(self._data)[start:end]
+
+    def with_data(self, data: BufferLike, mime_type: Optional[str] = None) -> "MediaBlob":
+        """A new blob for derived content (normalized image, crop) of the same kind."""
+        if data is self._data and (mime_type is None or mime_type == self.mime_type):
+            return self
+        return MediaBlob(data, mime_type or self.mime_type)
+
+    def to_part(self) -> Dict[str, Any]:
+        """
+        The blob as a Gemini inline-data part.
+
+        The SDK requires `bytes` (a base64 string is decoded again, a
+        memoryview is rejected), so the stored bytes object is passed as is.
+        """
+        return {"mime_type": self.mime_type, "data": self._data}
+
+    def __repr__(self) -> str:
+        return f"MediaBlob(mime_type={self.mime_type!r}, size={len(self._data)})"
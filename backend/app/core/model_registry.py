@@ -0,0 +1,83 @@
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Tuple
+from .config import settings
+from .gemini_client import gemini_client
+
+
+class ModelRegistry:
+    """
+    Caches configured GenerativeModel instances per (model_name, language, persona).
+
+    A persona is a named system prompt builder that takes the response
+    language. The built prompt is passed to the model once as its
+    system_instruction instead of being resent in every request's contents.
+
+    The language comes from clients as free text, so at most `max_models`
+    models are kept, least recently used evicted first.
+    """
+
+    def __init__(self, max_models: int):
+        self.max_models = max_models
+        self._personas: Dict[str, Callable[[str], str]] = {}
+        self._models: "OrderedDict[Tuple[str, str, str], Any]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def register_persona(self, persona: str, build_instruction: Callable[[str], str]):
+        """
+        Register a persona's system prompt builder.
+
+        Args:
+            persona: Persona name (e.g. "tutor")
+            build_instruction: Function mapping a language to the system prompt
+        """
+        self._personas[persona] = build_instruction
+
+    def get_model(self, model_name: str, language: str, persona: str) -> Any:
+        """
+        Get a configured model, building it on first use.
+
+        Args:
+            model_name: Gemini model name
+            language: Target response language
+            persona: Registered persona name
+
+        Returns:
+            A GenerativeModel with the persona's system_instruction
+        """
+        key = (model_name, language, persona)
+        model = self._models.get(key)
+        if model is not None:
+            self._models.move_to_end(key)
+            self.hits += 1
+            return model
+
+        if persona not in self._personas:
+            raise KeyError(f"Unknown persona: {persona}")
+
+        self.misses += 1
+        model = gemini_client.GenerativeModel(
+            model_name,
+            system_instruction=self._personas[persona](language),
+        )
+        self._models[key] = model
+        while len(self._models) > self.max_models:
+            self._models.popitem(last=False)
+            self.evictions += 1
+        return model
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get registry statistics."""
+        return {
+            "personas": sorted(self._personas),
+            "models": len(self._models),
+            "max_models": self.max_models,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+
+# Singleton registry instance
+model_registry = ModelRegistry(max_models=settings.gemini_model_cache_max_entries)
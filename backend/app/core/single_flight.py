@@ -0,0 +1,74 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Iterable, Tuple, TypeVar
+from .config import settings
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    """
+    Coalesces identical in-flight upstream calls.
+
+    Concurrent callers of the same service with the same key share one
+    upstream task and all receive its result or exception. Coalescing is
+    opt-in per service; other services call straight through.
+    """
+
+    def __init__(self, enabled_services: Iterable[str]):
+        self.enabled_services = set(enabled_services)
+        self._in_flight: Dict[Tuple[str, str], asyncio.Future] = {}
+        self._stats: Dict[str, Dict[str, int]] = {}
+
+    def is_enabled(self, service: str) -> bool:
+        """Check whether coalescing is enabled for a service."""
+        return service in self.enabled_services
+
+    async def run(self, service: str, key: str, call: Callable[[], Awaitable[T]]) -> T:
+        """
+        Run an upstream call, or join an identical call already in flight.
+
+        Args:
+            service: Service name (e.g. "chat", "screen")
+            key: Content hash identifying identical requests
+            call: Zero-argument coroutine function performing the upstream call
+
+        Returns:
+            The upstream call's result
+        """
+        if not self.is_enabled(service):
+            return await call()
+
+        stats = self._stats.setdefault(service, {"calls": 0, "upstream": 0, "collapsed": 0})
+        stats["calls"] += 1
+
+        flight_key = (service, key)
+        task = self._in_flight.get(flight_key)
+        if task is None:
+            stats["upstream"] += 1
+            task = asyncio.ensure_future(call())
+            self._in_flight[flight_key] = task
+            task.add_done_callback(lambda t: self._on_done(flight_key, t))
+        else:
+            stats["collapsed"] += 1
+
+        # Shield so one caller disconnecting does not cancel the shared call
+        return await asyncio.shield(task)
+
+    def _on_done(self, flight_key: Tuple[str, str], task: asyncio.Future):
+        """Forget a finished call and mark its exception as retrieved."""
+        if self._in_flight.get(flight_key) is task:
+            del self._in_flight[flight_key]
+        if not task.cancelled():
+            task.exception()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get per-service coalescing statistics."""
+        return {
+            "enabled_services": sorted(self.enabled_services),
+            "in_flight": len(self._in_flight),
+            "services": {name: dict(stats) for name, stats in self._stats.items()},
+        }
+
+
+# Singleton coalescing layer for Gemini services
+single_flight = SingleFlight(settings.single_flight_services_list)
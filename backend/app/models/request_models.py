@@ -7,6 +7,8 @@ class ChatRequest(BaseModel):
     message: str = Field(..., min_length=1, max_length=10000, description="User message")
     language: str = Field(default="English", description="Response language")
     context: Optional[str] = Field(default=None, description="Previous context for continuity")
+    use_cache: bool = Field(default=True, description="Allow a cached answer to an identical question")
+    conversation_id: Optional[str] = Field(default=None, max_length=128, description="Server-held conversation to continue")
 
 
 class AvatarRequest(BaseModel):
@@ -19,6 +21,17 @@ class ScreenFrameRequest(BaseModel):
     """Request model for screen frame analysis."""
     frame: str = Field(..., description="Base64 encoded image frame")
     language: str = Field(default="English", description="Response language")
+    session_id: Optional[str] = Field(
+        default=None,
+        max_length=128,
+        description="Screen-share session ID; unchanged frames reuse the last analysis",
+    )
+    capture_interval_ms: Optional[int] = Field(
+        default=None,
+        ge=100,
+        le=10 * 60 * 1000,
+        description="The client's configured capture interval, scaled to recommend the next capture",
+    )
 
 
 class FileAnalysisRequest(BaseModel):
@@ -27,3 +40,15 @@ class FileAnalysisRequest(BaseModel):
     fileName: str = Field(..., description="Original filename")
     fileType: str = Field(..., description="MIME type of the file")
     language: str = Field(default="English", description="Response language")
+
+
+class FileQuestionRequest(BaseModel):
+    """Request model for a follow-up question about an uploaded document."""
+    question: str = Field(..., min_length=1, max_length=2000, description="Question about the document")
+    language: str = Field(default="English", description="Response language")
+    top_k: Optional[int] = Field(
+        default=None,
+        ge=1,
+        le=20,
+        description="Number of passages to answer from (server default if omitted)",
+    )
@@ -7,6 +7,8 @@ class VisionResponse(BaseModel):
     success: bool
     response: str
     language: str
+    preprocessing: Optional[Dict[str, Any]] = None  # image normalization: bytes saved, CPU time
+    cached: bool = False  # True if the analysis came from the vision cache
 
 
 class ChatResponse(BaseModel):
@@ -14,6 +16,7 @@ class ChatResponse(BaseModel):
     success: bool
     response: str
     language: str
+    conversation_id: Optional[str] = None
 
 
 class AvatarResponse(BaseModel):
@@ -29,6 +32,8 @@ class ScreenFrameResponse(BaseModel):
     success: bool
     response: str
     language: str
+    skipped: bool = False  # True if the frame was unchanged and the last analysis was reused
+    next_capture_ms: Optional[int] = None  # recommended delay before the next capture
 
 
 class FileAnalysisResponse(BaseModel):
@@ -38,6 +43,16 @@ class FileAnalysisResponse(BaseModel):
     language: str
     fileName: str
     fileType: str
+    docId: Optional[str] = None  # for follow-up questions (/respond/file/{docId}/ask)
+
+
+class FileQuestionResponse(BaseModel):
+    """Response model for a follow-up question about an uploaded document."""
+    success: bool
+    response: str
+    language: str
+    docId: str
+    passages: List[Dict[str, Any]]  # label and BM25 score of each passage the answer was based on
 
 
 class HealthResponse(BaseModel):
@@ -0,0 +1,147 @@
+import time
+from collections import OrderedDict, deque
+from typing import Any, Deque, Dict, Optional
+
+from ..core.config import settings
+from ..core.gemini_runner import gemini_runner
+
+
+# Interval multipliers for a screen that changes on every frame / never changes
+CHANGING_FACTOR = 0.5
+STATIC_FACTOR = 4.0
+
+
+class CaptureSession:
+    """Recent frame history of one screen-share session."""
+
+    def __init__(self, history: int):
+        self.changes: Deque[bool] = deque(maxlen=history)
+        self.in_flight = 0
+        self.last_seen = time.time()
+
+
+class CaptureRateAdvisor:
+    """
+    Recommends when a screen-share client should capture its next frame.
+
+    The client's chosen interval is scaled by three signals:
+
+    - how often the session's recent frames actually changed (a static
+      screen backs off up to STATIC_FACTOR, a busy one speeds up to
+      CHANGING_FACTOR),
+    - how many of the session's frames are still queued or being analyzed,
+    - global LLM admission pressure (in-flight + waiting calls per slot).
+
+    Under pressure the interval never drops below the client's choice.
+    """
+
+    def __init__(
+        self,
+        default_interval_ms: int,
+        min_interval_ms: int,
+        max_interval_ms: int,
+        history: int,
+        session_ttl_seconds: float,
+        max_sessions: int,
+    ):
+        self.default_interval_ms = default_interval_ms
+        self.min_interval_ms = min_interval_ms
+        self.max_interval_ms = max_interval_ms
+        self.history = history
+        self.session_ttl_seconds = session_ttl_seconds
+        self.max_sessions = max_sessions
+        self._sessions: "OrderedDict[str, CaptureSession]" = OrderedDict()
+        self.recommendations = 0
+        self.total_recommended_ms = 0
+
+    def _session(self, session_id: str) -> CaptureSession:
+        session = self._sessions.get(session_id)
+        now = time.time()
+        if session is None or now - session.last_seen > self.session_ttl_seconds:
+            session = self._sessions[session_id] = CaptureSession(self.history)
+        session.last_seen = now
+        self._sessions.move_to_end(session_id)
+        while len(self._sessions) > self.max_sessions:
+            self._sessions.popitem(last=False)
+        return session
+
+    def begin(self, session_id: Optional[str]):
+        """Count a frame of the session as being analyzed."""
+        if session_id:
+            self._session(session_id).in_flight += 1
+
+    def end(self, session_id: Optional[str]):
+        """Count a frame of the session as finished."""
+        session = self._sessions.get(session_id) if session_id else None
+        if session is not None:
+            session.in_flight = max(0, session.in_flight - 1)
+
+    def record(self, session_id: Optional[str], changed: bool):
+        """Record whether a frame differed from the previous one."""
+        if session_id:
+            self._session(session_id).changes.append(changed)
+
+    def recommend(
+        self,
+        session_id: Optional[str],
+        interval_ms: Optional[int] = None,
+        queue_depth: int = 0,
+    ) -> int:
+        """
+        Recommend the delay before the session's next capture.
+
+        Args:
+            session_id: Screen-share session ID (no history without one)
+            interval_ms: The client's configured interval (default if omitted)
+            queue_depth: Frames of this session waiting outside the advisor's
+                own in-flight count (e.g. a WebSocket's pending frame)
+
+        Returns:
+            Next capture interval in milliseconds
+        """
+        base = interval_ms or self.default_interval_ms
+        session = self._sessions.get(session_id) if session_id else None
+
+        content_factor = 1.0
+        if session is not None and session.changes:
+            change_rate = sum(session.changes) / len(session.changes)
+            content_factor = CHANGING_FACTOR + (STATIC_FACTOR - CHANGING_FACTOR) * (1 - change_rate) ** 2
+
+        pressure = gemini_runner.admission.pressure()
+        if pressure >= 1:
+            # Saturated: never ask for frames faster than the client's choice
+            content_factor = max(content_factor, 1.0)
+        load_factor = 1 + max(0.0, pressure - 0.5)
+
+        depth = queue_depth + (session.in_flight if session is not None else 0)
+        interval = base * content_factor * load_factor * (1 + depth)
+        interval = int(round(min(self.max_interval_ms, max(self.min_interval_ms, interval)), -2))
+
+        self.recommendations += 1
+        self.total_recommended_ms += interval
+        return interval
+
+    def forget(self, session_id: str):
+        """Drop a session's history (e.g. when sharing stops)."""
+        self._sessions.pop(session_id, None)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get recommendation counters and the current admission pressure."""
+        return {
+            "sessions": len(self._sessions),
+            "recommendations": self.recommendations,
+            "avg_recommended_ms": round(self.total_recommended_ms / self.recommendations) if self.recommendations else 0,
+            "default_interval_ms": self.default_interval_ms,
+            "llm_pressure": round(gemini_runner.admission.pressure(), 2),
+        }
+
+
+# Singleton capture-rate advisor for screen sharing
+capture_rate_advisor = CaptureRateAdvisor(
+    default_interval_ms=settings.screen_capture_interval_ms,
+    min_interval_ms=settings.screen_capture_min_interval_ms,
+    max_interval_ms=settings.screen_capture_max_interval_ms,
+    history=settings.screen_capture_history,
+    session_ttl_seconds=settings.screen_session_ttl_seconds,
+    max_sessions=settings.screen_max_sessions,
+)
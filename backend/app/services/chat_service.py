@@ -1,6 +1,22 @@
-from typing import Optional
-from ..core.gemini_client import gemini_client
+import re
+from typing import Any, AsyncIterator, Dict, List, Optional
+from ..core.gemini_runner import gemini_runner
+from ..core.model_registry import model_registry
+from ..core.single_flight import single_flight
 from ..core.config import settings
+from .conversation_service import conversation_store, estimate_tokens
+from .response_cache import ResponseCache
+
+
+# Shared cache of complete tutor answers
+chat_response_cache = ResponseCache(
+    name="chat",
+    ttl_seconds=settings.chat_cache_ttl_seconds,
+    max_entries=settings.chat_cache_max_entries,
+    max_bytes=settings.chat_cache_max_bytes,
+    disk_dir=settings.chat_cache_dir if settings.chat_cache_disk_enabled else None,
+    disk_max_bytes=settings.chat_cache_disk_max_bytes,
+)
 
 
 def get_tutor_system_prompt(language: str) -> str:
@@ -18,56 +34,208 @@ IMPORTANT RULES:
 Remember: Your entire response must be in {language}."""
 
 
-async def chat_respond(message: str, language: str, context: Optional[str] = None) -> str:
+model_registry.register_persona("tutor", get_tutor_system_prompt)
+
+
+def build_chat_contents(
+    message: str,
+    language: str,
+    context: Optional[str] = None,
+    history: Optional[List[Dict[str, str]]] = None,
+    summary: Optional[str] = None,
+) -> List[Dict[str, Any]]:
     """
-    Generate a chat response using OpenAI API.
+    Build the Gemini contents for a tutor chat turn.
+    
+    The tutor persona is the model's system_instruction, so only the
+    conversation itself is sent here.
     
     Args:
         message: User's message
         language: Target response language
         context: Optional previous context (e.g., from image analysis)
+        history: Optional earlier turns ({"role", "text"}), oldest first
+        summary: Optional summary of turns older than the history
         
     Returns:
-        AI-generated response in specified language
+        List of role-tagged contents for generate_content
     """
-    messages = [
-        {
-            "role": "system",
-            "content": get_tutor_system_prompt(language),
-        }
+    contents = [
+        {"role": turn["role"], "parts": [turn["text"]]}
+        for turn in history or []
     ]
     
+    parts = []
+    
+    # Add summary of the earlier conversation if available
+    if summary:
+        parts.append(f"[Summary of our earlier conversation: {summary}]")
+    
     # Add context if available
     if context:
-        messages.append({
-            "role": "assistant",
-            "content": f"[Previous analysis context: {context}]",
-        })
-    
-    # Add user message
-    messages.append({
-        "role": "user",
-        "content": f"{message}\n\n(Please respond in {language})",
-    })
-    
-    # Combine messages into a single prompt for Gemini
-    conversation_parts = []
-    for msg in messages:
-        if msg["role"] == "system":
-            conversation_parts.append(f"System: {msg['content']}")
-        elif msg["role"] == "user":
-            conversation_parts.append(f"User: {msg['content']}")
-        elif msg["role"] == "assistant":
-            conversation_parts.append(f"Assistant: {msg['content']}")
-    
-    full_prompt = "\n\n".join(conversation_parts)
-    
-    response = gemini_client.GenerativeModel(settings.gemini_model).generate_content(
-        full_prompt,
-        generation_config={
-            "max_output_tokens": 2000,
-            "temperature": 0.7,
-        }
+        parts.append(f"[Previous analysis context: {context}]")
+    
+    parts.append(f"{message}\n\n(Please respond in {language})")
+    
+    contents.append({"role": "user", "parts": parts})
+    return contents
+
+
+def _build_conversation_contents(
+    conversation_id: str,
+    message: str,
+    language: str,
+    context: Optional[str],
+) -> List[Dict[str, Any]]:
+    """Build contents for a turn in a server-held conversation."""
+    conversation = conversation_store.get_or_create(conversation_id, language)
+    reserved_tokens = estimate_tokens(message) + estimate_tokens(context or "")
+    summary, history = conversation_store.get_prompt_history(conversation, reserved_tokens)
+    return build_chat_contents(message, language, context, history, summary)
+
+
+CHAT_GENERATION_CONFIG = {
+    "max_output_tokens": 2000,
+    "temperature": 0.7,
+}
+
+
+def _normalize_text(text: Optional[str]) -> str:
+    """Normalize text for cache keys (case and whitespace insensitive)."""
+    return re.sub(r"\s+", " ", text or "").strip().casefold()
+
+
+def get_chat_cache_key(message: str, language: str, context: Optional[str] = None) -> str:
+    """Build the response cache key for a chat turn."""
+    return ResponseCache.make_key(
+        _normalize_text(message),
+        _normalize_text(language),
+        _normalize_text(context),
+        settings.gemini_model,
+        CHAT_GENERATION_CONFIG,
     )
+
+
+def _use_chat_cache(use_cache: bool) -> bool:
+    return use_cache and settings.chat_cache_enabled
+
+
+async def chat_respond(
+    message: str,
+    language: str,
+    context: Optional[str] = None,
+    use_cache: bool = True,
+    conversation_id: Optional[str] = None,
+) -> str:
+    """
+    Generate a chat response using Gemini.
+    
+    Args:
+        message: User's message
+        language: Target response language
+        context: Optional previous context (e.g., from image analysis)
+        use_cache: Serve and store the answer in the response cache
+        conversation_id: Optional server-held conversation to continue
+        
+    Returns:
+        AI-generated response in specified language
+    """
+    if conversation_id:
+        # Answers depend on the conversation history, so never cache them
+        response = await gemini_runner.generate(
+            model_registry.get_model(settings.gemini_model, language, "tutor"),
+            _build_conversation_contents(conversation_id, message, language, context),
+            generation_config=CHAT_GENERATION_CONFIG,
+        )
+        if not response.text:
+            return "Unable to generate response."
+        
+        conversation = conversation_store.get_or_create(conversation_id, language)
+        conversation_store.append_exchange(conversation, message, response.text)
+        return response.text
+    
+    cache_key = get_chat_cache_key(message, language, context)
+    if _use_chat_cache(use_cache):
+        cached = await chat_response_cache.get(cache_key)
+        if cached is not None:
+            return cached
+    
+    async def generate() -> str:
+        response = await gemini_runner.generate(
+            model_registry.get_model(settings.gemini_model, language, "tutor"),
+            build_chat_contents(message, language, context),
+            generation_config=CHAT_GENERATION_CONFIG,
+        )
+        return response.text
+    
+    if use_cache:
+        # Identical questions already in flight share one Gemini call
+        text = await single_flight.run("chat", cache_key, generate)
+    else:
+        text = await generate()
+    
+    if not text:
+        return "Unable to generate response."
+    
+    if _use_chat_cache(use_cache):
+        await chat_response_cache.set(cache_key, text)
+    return text
+
+
+async def chat_respond_stream(
+    message: str,
+    language: str,
+    context: Optional[str] = None,
+    use_cache: bool = True,
+    conversation_id: Optional[str] = None,
+) -> AsyncIterator[str]:
+    """
+    Stream a chat response from Gemini as text chunks.
+    
+    A cached answer is yielded as a single chunk. A streamed answer is
+    cached once it completes. Turns in a server-held conversation are
+    never cached and are recorded once the stream completes.
+    
+    Args:
+        message: User's message
+        language: Target response language
+        context: Optional previous context (e.g., from image analysis)
+        use_cache: Serve and store the answer in the response cache
+        conversation_id: Optional server-held conversation to continue
+        
+    Yields:
+        Text chunks of the response in the order they are generated
+    """
+    if conversation_id:
+        use_cache = False
+        contents = _build_conversation_contents(conversation_id, message, language, context)
+    else:
+        contents = build_chat_contents(message, language, context)
+    
+    cache_key = get_chat_cache_key(message, language, context)
+    if _use_chat_cache(use_cache):
+        cached = await chat_response_cache.get(cache_key)
+        if cached is not None:
+            yield cached
+            return
+    
+    parts = []
+    async for chunk in gemini_runner.stream(
+        model_registry.get_model(settings.gemini_model, language, "tutor"),
+        contents,
+        generation_config=CHAT_GENERATION_CONFIG,
+    ):
+        try:
+            text = chunk.text
+        except ValueError:
+            # Chunks without text parts (e.g. finish or safety metadata)
+            continue
+        if text:
+            parts.append(text)
+            yield text
     
-    return response.text or "Unable to generate response."
+    if parts and conversation_id:
+        conversation = conversation_store.get_or_create(conversation_id, language)
+        conversation_store.append_exchange(conversation, message, "".join(parts))
+    elif parts and _use_chat_cache(use_cache):
+        await chat_response_cache.set(cache_key, "".join(parts))
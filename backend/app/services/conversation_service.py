@@ -0,0 +1,207 @@
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+from ..core.config import settings
+from ..core.gemini_runner import gemini_runner
+from ..core.model_registry import model_registry
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token estimate (about four characters per token)."""
+    return len(text) // 4 + 1
+
+
+def get_summarizer_prompt(language: str) -> str:
+    """Generate system prompt for conversation summarization."""
+    return f"""You maintain a running summary of a tutoring conversation between a student and an AI tutor.
+
+RULES:
+1. Merge the existing summary with the new turns into one updated summary.
+2. Keep the topics covered, key facts and explanations, the student's difficulties and any open questions.
+3. Be concise: at most 200 words.
+4. Write the summary in {language}."""
+
+
+model_registry.register_persona("summarizer", get_summarizer_prompt)
+
+
+class Conversation:
+    """A server-held conversation: a running summary plus recent turns."""
+
+    def __init__(self, conversation_id: str, language: str):
+        self.id = conversation_id
+        self.language = language
+        self.summary = ""
+        self.turns: List[Dict[str, str]] = []  # {"role": "user" | "model", "text": ...}
+        self.summarized_turns = 0
+        self.last_active = time.time()
+        self.summarizing: Optional[asyncio.Task] = None
+
+
+class ConversationStore:
+    """
+    In-memory conversation store with rolling summarization.
+
+    The last `recent_turns` messages are kept verbatim. Older messages are
+    folded into a running summary by a background task, so the prompt
+    stays under `token_budget` however long a conversation runs.
+    """
+
+    def __init__(
+        self,
+        recent_turns: int,
+        token_budget: int,
+        ttl_seconds: float,
+        max_conversations: int,
+    ):
+        self.recent_turns = recent_turns
+        self.token_budget = token_budget
+        self.ttl_seconds = ttl_seconds
+        self.max_conversations = max_conversations
+        self._conversations: "OrderedDict[str, Conversation]" = OrderedDict()
+        self.summaries_generated = 0
+        self.summary_failures = 0
+
+    def get(self, conversation_id: str) -> Optional[Conversation]:
+        """Get a conversation if it exists and has not expired."""
+        conversation = self._conversations.get(conversation_id)
+        if conversation and time.time() - conversation.last_active > self.ttl_seconds:
+            self.delete(conversation_id)
+            return None
+        return conversation
+
+    def get_or_create(self, conversation_id: str, language: str) -> Conversation:
+        """Get a conversation, creating it on first use."""
+        conversation = self.get(conversation_id)
+        if conversation is None:
+            conversation = Conversation(conversation_id, language)
+            self._conversations[conversation_id] = conversation
+            while len(self._conversations) > self.max_conversations:
+                oldest_id = next(iter(self._conversations))
+                self.delete(oldest_id)
+
+        self._conversations.move_to_end(conversation_id)
+        conversation.last_active = time.time()
+        return conversation
+
+    def delete(self, conversation_id: str) -> bool:
+        """Delete a conversation."""
+        conversation = self._conversations.pop(conversation_id, None)
+        if conversation is None:
+            return False
+        if conversation.summarizing and not conversation.summarizing.done():
+            conversation.summarizing.cancel()
+        return True
+
+    def get_prompt_history(
+        self,
+        conversation: Conversation,
+        reserved_tokens: int,
+    ) -> Tuple[str, List[Dict[str, str]]]:
+        """
+        Select the summary and the recent turns that fit the token budget.
+
+        Args:
+            conversation: The conversation
+            reserved_tokens: Tokens already used by the current message and context
+
+        Returns:
+            Tuple of (summary, turns), where turns start with a user turn
+        """
+        budget = self.token_budget - reserved_tokens - estimate_tokens(conversation.summary)
+        selected: List[Dict[str, str]] = []
+        for turn in reversed(conversation.turns[-self.recent_turns:]):
+            cost = estimate_tokens(turn["text"])
+            if cost > budget:
+                break
+            selected.insert(0, turn)
+            budget -= cost
+
+        # Gemini expects the history to open with a user turn
+        while selected and selected[0]["role"] != "user":
+            selected.pop(0)
+
+        return conversation.summary, selected
+
+    def append_exchange(self, conversation: Conversation, message: str, response: str):
+        """Record a user message and the tutor's answer, then compact if needed."""
+        conversation.turns.append({"role": "user", "text": message})
+        conversation.turns.append({"role": "model", "text": response})
+        conversation.last_active = time.time()
+
+        if len(conversation.turns) > self.recent_turns and not (
+            conversation.summarizing and not conversation.summarizing.done()
+        ):
+            conversation.summarizing = asyncio.create_task(self._summarize(conversation))
+
+    async def _summarize(self, conversation: Conversation):
+        """Fold turns older than the recent window into the running summary."""
+        overflow = len(conversation.turns) - self.recent_turns
+        if overflow <= 0:
+            return
+
+        older = conversation.turns[:overflow]
+        transcript = "\n".join(
+            f"{'Student' if turn['role'] == 'user' else 'Tutor'}: {turn['text']}" for turn in older
+        )
+        prompt = (
+            f"Existing summary:\n{conversation.summary or '(none)'}\n\n"
+            f"New turns:\n{transcript}\n\n"
+            "Write the updated summary."
+        )
+
+        try:
+            response = await gemini_runner.generate(
+                model_registry.get_model(settings.gemini_model, conversation.language, "summarizer"),
+                prompt,
+                generation_config={
+                    "max_output_tokens": 400,
+                    "temperature": 0.2,
+                },
+                priority="batch",
+            )
+            # Raises ValueError for a response without text (e.g. blocked by safety filters)
+            summary = (response.text or "").strip()
+        except Exception as e:
+            self.summary_failures += 1
+            print(f"Error summarizing conversation {conversation.id}: {e}")
+            return
+
+        if summary:
+            conversation.summary = summary
+            # Turns appended meanwhile stay; only the summarized prefix is dropped
+            del conversation.turns[:overflow]
+            conversation.summarized_turns += overflow
+            self.summaries_generated += 1
+
+    def get_info(self, conversation: Conversation) -> Dict[str, Any]:
+        """Get a description of a conversation's stored state."""
+        return {
+            "conversation_id": conversation.id,
+            "language": conversation.language,
+            "summary": conversation.summary,
+            "recent_turns": len(conversation.turns),
+            "summarized_turns": conversation.summarized_turns,
+            "estimated_history_tokens": estimate_tokens(conversation.summary)
+            + sum(estimate_tokens(turn["text"]) for turn in conversation.turns),
+            "token_budget": self.token_budget,
+            "last_active": conversation.last_active,
+        }
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get store statistics."""
+        return {
+            "conversations": len(self._conversations),
+            "summaries_generated": self.summaries_generated,
+            "summary_failures": self.summary_failures,
+        }
+
+
+# Singleton conversation store
+conversation_store = ConversationStore(
+    recent_turns=settings.conversation_recent_turns,
+    token_budget=settings.conversation_token_budget,
+    ttl_seconds=settings.conversation_ttl_seconds,
+    max_conversations=settings.conversation_max_count,
+)
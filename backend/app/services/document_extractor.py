@@ -0,0 +1,444 @@
+import asyncio
+import csv
+import io
+import re
+import time
+import unicodedata
+from multiprocessing import get_context
+from multiprocessing.connection import Connection
+from typing import Any, Dict, List, Optional, Tuple
+
+try:
+    import resource
+except ImportError:  # Not available on Windows; workers run without a memory limit
+    resource = None
+
+try:
+    from pypdf import PdfReader
+except ImportError:  # Optional; PDFs cannot be read without it
+    PdfReader = None
+
+try:
+    import docx
+except ImportError:  # python-docx is optional; Word documents cannot be read without it
+    docx = None
+
+try:
+    import openpyxl
+except ImportError:  # Optional; Excel workbooks cannot be read without it
+    openpyxl = None
+
+try:
+    import pptx
+except ImportError:  # python-pptx is optional; presentations cannot be read without it
+    pptx = None
+
+from ..core.config import settings
+
+
+FORMAT_MIME_TYPES = {
+    "application/pdf": "pdf",
+    "application/vnd.openxmlformats-officedocument.wordprocessingml.document": "docx",
+    "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet": "xlsx",
+    "application/vnd.openxmlformats-officedocument.presentationml.presentation": "pptx",
+    "text/csv": "csv",
+    "application/csv": "csv",
+}
+
+FORMAT_EXTENSIONS = {"pdf": "pdf", "docx": "docx", "xlsx": "xlsx", "pptx": "pptx", "csv": "csv"}
+
+FORMAT_LIBRARIES = {"pdf": "pypdf", "docx": "python-docx", "xlsx": "openpyxl", "pptx": "python-pptx"}
+
+# Bump when extraction or normalization output changes so cached text is not reused
+EXTRACTOR_VERSION = 1
+
+# Lines the extractors emit at page, slide, sheet and heading boundaries
+SECTION_START = re.compile(r"^(?:--- Page \d+ ---|## .+)$", re.MULTILINE)
+
+# Time a new worker gets to start up (imports), not counted against the job timeout
+WORKER_STARTUP_SECONDS = 60.0
+
+_TRAILING_SPACE = re.compile(r"[ \t]+$", re.MULTILINE)
+_BLANK_LINES = re.compile(r"\n{3,}")
+
+
+class DocumentExtractionError(Exception):
+    """Raised when a document cannot be extracted (corrupt, too slow, too large)."""
+
+
+def detect_document_format(file_type: str, file_name: str) -> Optional[str]:
+    """
+    Identify the extraction format of an uploaded file.
+
+    Args:
+        file_type: Declared MIME type
+        file_name: Original filename, used when the type is generic
+
+    Returns:
+        "pdf", "docx", "xlsx", "pptx", "csv", "text", or None if unsupported
+    """
+    fmt = FORMAT_MIME_TYPES.get(file_type)
+    if fmt:
+        return fmt
+    extension = file_name.lower().rsplit(".", 1)[-1] if "." in file_name else ""
+    if extension in FORMAT_EXTENSIONS:
+        return FORMAT_EXTENSIONS[extension]
+    if file_type.startswith("text/"):
+        return "text"
+    return None
+
+
+class _TextBuilder:
+    """Collects extracted text and stops once the character budget is spent."""
+
+    def __init__(self, max_chars: int):
+        self.max_chars = max_chars
+        self.parts: List[str] = []
+        self.length = 0
+        self.truncated = False
+
+    @property
+    def full(self) -> bool:
+        return self.length >= self.max_chars
+
+    def add(self, text: str):
+        text = text.strip()
+        if not text or self.full:
+            return
+        remaining = self.max_chars - self.length
+        if len(text) > remaining:
+            text = text[:remaining]
+            self.truncated = True
+        self.parts.append(text)
+        self.length += len(text) + 1
+
+    def text(self) -> str:
+        return "\n".join(self.parts)
+
+
+def normalize_text(text: str) -> str:
+    """Normalize extracted text: NFC, Unix newlines, no trailing spaces or runs of blank lines."""
+    text = unicodedata.normalize("NFC", text)
+    text = text.replace("\r\n", "\n").replace("\r", "\n").replace("\x00", "")
+    text = _TRAILING_SPACE.sub("", text)
+    return _BLANK_LINES.sub("\n\n", text).strip()
+
+
+def find_sections(text: str) -> List[Tuple[str, int]]:
+    """
+    Find the page, slide, sheet and heading markers in extracted text.
+
+    Returns:
+        (label, character offset) of each marker, in order
+    """
+    return [
+        (match.group(0).strip("-# ").strip(), match.start())
+        for match in SECTION_START.finditer(text)
+    ]
+
+
+def _row_text(values) -> str:
+    return " | ".join(str(value) for value in values if value is not None and str(value).strip())
+
+
+def extract_pdf(data: bytes, out: _TextBuilder):
+    reader = PdfReader(io.BytesIO(data))
+    if reader.is_encrypted and not reader.decrypt(""):
+        raise DocumentExtractionError("PDF is password protected")
+    for number, page in enumerate(reader.pages, start=1):
+        if out.full:
+            out.truncated = True
+            break
+        out.add(f"--- Page {number} ---")
+        out.add(page.extract_text() or "")
+
+
+def extract_docx(data: bytes, out: _TextBuilder):
+    document = docx.Document(io.BytesIO(data))
+    # Paragraph.style resolves the default style on every call; compare raw style IDs instead
+    heading_ids = {
+        style.style_id for style in document.styles
+        if style.name and (style.name.startswith("Heading") or style.name == "Title")
+    }
+    for block in document.iter_inner_content():
+        if out.full:
+            out.truncated = True
+            break
+        if isinstance(block, docx.table.Table):
+            for row in block.rows:
+                out.add(_row_text(cell.text for cell in row.cells))
+        else:
+            prefix = "## " if block._p.style in heading_ids else ""
+            if block.text.strip():
+                out.add(prefix + block.text)
+
+
+def extract_xlsx(data: bytes, out: _TextBuilder):
+    # read_only streams rows instead of building the whole sheet in memory
+    workbook = openpyxl.load_workbook(io.BytesIO(data), read_only=True, data_only=True)
+    try:
+        for sheet in workbook.worksheets:
+            if out.full:
+                out.truncated = True
+                break
+            out.add(f"## Sheet: {sheet.title}")
+            for row in sheet.iter_rows(values_only=True):
+                if out.full:
+                    out.truncated = True
+                    break
+                out.add(_row_text(row))
+    finally:
+        workbook.close()
+
+
+def extract_csv(data: bytes, out: _TextBuilder):
+    text = data.decode("utf-8-sig", errors="replace")
+    try:
+        dialect = csv.Sniffer().sniff(text[:4096])
+    except csv.Error:
+        dialect = csv.excel
+    for row in csv.reader(io.StringIO(text), dialect):
+        if out.full:
+            out.truncated = True
+            break
+        out.add(_row_text(row))
+
+
+def extract_pptx(data: bytes, out: _TextBuilder):
+    presentation = pptx.Presentation(io.BytesIO(data))
+    for number, slide in enumerate(presentation.slides, start=1):
+        if out.full:
+            out.truncated = True
+            break
+        out.add(f"## Slide {number}")
+        for shape in slide.shapes:
+            if shape.has_text_frame:
+                out.add(shape.text_frame.text)
+            elif getattr(shape, "has_table", False) and shape.has_table:
+                for row in shape.table.rows:
+                    out.add(_row_text(cell.text for cell in row.cells))
+        if slide.has_notes_slide:
+            notes = slide.notes_slide.notes_text_frame
+            if notes is not None and notes.text.strip():
+                out.add(f"Notes: {notes.text}")
+
+
+EXTRACTORS = {
+    "pdf": (extract_pdf, lambda: PdfReader),
+    "docx": (extract_docx, lambda: docx),
+    "xlsx": (extract_xlsx, lambda: openpyxl),
+    "pptx": (extract_pptx, lambda: pptx),
+    "csv": (extract_csv, lambda: csv),
+}
+
+
+def extract_document(data: bytes, fmt: str, max_chars: int) -> Tuple[str, bool]:
+    """
+    Extract the text of a document (runs inside a worker process).
+
+    Args:
+        data: File content
+        fmt: Format from detect_document_format
+        max_chars: Stop extracting once this much text is collected
+
+    Returns:
+        Tuple of (text, truncated)
+
+    Raises:
+        DocumentExtractionError: If the format's library is missing, the file
+            is unreadable or the worker's memory limit is hit
+    """
+    extractor, library = EXTRACTORS[fmt]
+    if library() is None:
+        raise DocumentExtractionError(f"{fmt.upper()} extraction requires the {FORMAT_LIBRARIES[fmt]} package")
+
+    out = _TextBuilder(max_chars)
+    try:
+        extractor(data, out)
+    except DocumentExtractionError:
+        raise
+    except MemoryError:
+        raise DocumentExtractionError("Document exceeded the extraction memory limit")
+    except Exception as e:
+        raise DocumentExtractionError(f"Could not read {fmt.upper()} file: {e}")
+    return normalize_text(out.text()), out.truncated
+
+
+def _init_worker(memory_limit_bytes: int):
+    """Cap the worker's address space so a decompression bomb fails with MemoryError."""
+    if resource is not None and memory_limit_bytes > 0:
+        resource.setrlimit(resource.RLIMIT_AS, (memory_limit_bytes, memory_limit_bytes))
+
+
+def _worker_main(conn: Connection, memory_limit_bytes: int):
+    """Worker process loop: extract each (data, fmt, max_chars) job received over the pipe."""
+    _init_worker(memory_limit_bytes)
+    conn.send("ready")
+    while True:
+        try:
+            job = conn.recv()
+        except EOFError:
+            return
+        try:
+            conn.send(("ok", extract_document(*job)))
+        except DocumentExtractionError as e:
+            conn.send(("error", str(e)))
+
+
+class _ExtractionWorker:
+    """One worker process and the pipe its jobs go through."""
+
+    def __init__(self, memory_limit_bytes: int):
+        # spawn: fresh workers, not forks of a multi-threaded server
+        context = get_context("spawn")
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(target=_worker_main, args=(child_conn, memory_limit_bytes), daemon=True)
+        self.process.start()
+        child_conn.close()
+        self.ready = False
+
+    def run(self, data: bytes, fmt: str, max_chars: int, timeout_seconds: float) -> Tuple[str, Any]:
+        """
+        Run one job (blocking; called from a thread).
+
+        The timeout starts once the worker has started up and got the job.
+
+        Raises:
+            TimeoutError: If the job is still running after timeout_seconds
+            EOFError: If the worker died
+        """
+        if not self.ready:
+            if not self.conn.poll(WORKER_STARTUP_SECONDS):
+                raise EOFError("worker did not start")
+            self.conn.recv()
+            self.ready = True
+        self.conn.send((data, fmt, max_chars))
+        if not self.conn.poll(timeout_seconds):
+            raise TimeoutError
+        return self.conn.recv()
+
+    def kill(self):
+        self.process.kill()
+        self.process.join(5)
+
+
+class DocumentExtractor:
+    """
+    Extracts document text in a pool of worker processes.
+
+    Parsing is CPU-bound and runs untrusted input, so it never runs on the
+    event loop or in the API process. Each worker has an address-space
+    limit. At most max_workers jobs run at once; the others wait for a
+    free worker, so a job's timeout only counts its own run time. A job
+    that times out or crashes gets its worker killed and replaced,
+    without disturbing jobs running in the other workers.
+    """
+
+    def __init__(self, max_workers: int, timeout_seconds: float, memory_limit_mb: int, max_chars: int):
+        self.max_workers = max_workers
+        self.timeout_seconds = timeout_seconds
+        self.memory_limit_bytes = memory_limit_mb * 1024 * 1024
+        self.max_chars = max_chars
+        self._slots = asyncio.Semaphore(max_workers)
+        self._idle: List[_ExtractionWorker] = []
+        self.workers_replaced = 0
+        self._stats: Dict[str, Dict[str, float]] = {}
+
+    async def extract(self, data: bytes, fmt: str) -> Tuple[str, bool]:
+        """
+        Extract a document's text in a worker process.
+
+        Args:
+            data: File content
+            fmt: Format from detect_document_format (not "text")
+
+        Returns:
+            Tuple of (text, truncated)
+
+        Raises:
+            DocumentExtractionError: If extraction fails, times out or the
+                worker crashes
+        """
+        stats = self._stats.setdefault(
+            fmt, {"jobs": 0, "failed": 0, "timeouts": 0, "bytes": 0, "chars": 0, "seconds": 0.0}
+        )
+        stats["jobs"] += 1
+
+        try:
+            async with self._slots:
+                start = time.perf_counter()
+                worker = await self._take_worker()
+                try:
+                    status, result = await asyncio.to_thread(
+                        worker.run, data, fmt, self.max_chars, self.timeout_seconds
+                    )
+                except TimeoutError:
+                    stats["timeouts"] += 1
+                    self._replace(worker)
+                    raise DocumentExtractionError(
+                        f"Extraction took longer than {self.timeout_seconds:g}s and was stopped"
+                    )
+                except (EOFError, OSError):
+                    self._replace(worker)
+                    raise DocumentExtractionError("Extraction worker crashed on this document")
+                except BaseException:
+                    # Cancelled while the worker is busy: it cannot be reused
+                    self._replace(worker)
+                    raise
+                self._idle.append(worker)
+                if status == "error":
+                    raise DocumentExtractionError(result)
+                text, truncated = result
+        except DocumentExtractionError:
+            stats["failed"] += 1
+            raise
+
+        stats["bytes"] += len(data)
+        stats["chars"] += len(text)
+        stats["seconds"] += time.perf_counter() - start
+        return text, truncated
+
+    async def _take_worker(self) -> _ExtractionWorker:
+        """An idle worker that is still alive, or a new one (started in a thread)."""
+        while self._idle:
+            worker = self._idle.pop()
+            if worker.process.is_alive():
+                return worker
+            self._replace(worker)
+        # Starting a spawn process blocks until the child is launched
+        return await asyncio.to_thread(_ExtractionWorker, self.memory_limit_bytes)
+
+    def _replace(self, worker: _ExtractionWorker):
+        """Kill a stuck or dead worker; the next job starts a fresh one."""
+        worker.kill()
+        self.workers_replaced += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get per-format job counts and throughput."""
+        formats = {}
+        for fmt, stats in self._stats.items():
+            succeeded = stats["jobs"] - stats["failed"]
+            formats[fmt] = {
+                "jobs": stats["jobs"],
+                "failed": stats["failed"],
+                "timeouts": stats["timeouts"],
+                "avg_ms": round(stats["seconds"] / succeeded * 1000, 1) if succeeded else 0.0,
+                "mb_per_second": round(stats["bytes"] / stats["seconds"] / (1024 * 1024), 2) if stats["seconds"] else 0.0,
+                "chars": stats["chars"],
+            }
+        return {
+            "max_workers": self.max_workers,
+            "timeout_seconds": self.timeout_seconds,
+            "memory_limit_mb": self.memory_limit_bytes // (1024 * 1024),
+            "workers_replaced": self.workers_replaced,
+            "formats": formats,
+        }
+
+
+# Singleton document extractor; worker processes start on first use
+document_extractor = DocumentExtractor(
+    max_workers=settings.document_extract_workers,
+    timeout_seconds=settings.document_extract_timeout_seconds,
+    memory_limit_mb=settings.document_extract_memory_limit_mb,
+    max_chars=settings.document_extract_max_chars,
+)
@@ -0,0 +1,213 @@
+import asyncio
+import math
+import re
+import time
+from collections import Counter, OrderedDict
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from ..core.config import settings
+from .document_summarizer import DocumentChunk, pack_sections, split_sections
+from .extraction_cache import extraction_cache
+
+
+# Chinese and Japanese are not space-separated: index each character on its own
+_CJK = "\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff"
+TOKEN_PATTERN = re.compile(rf"[{_CJK}]|[^\W_{_CJK}]+")
+
+# BM25 parameters (the usual defaults)
+K1 = 1.5
+B = 0.75
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercased word tokens (single characters for Chinese and Japanese)."""
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+class DocumentIndex:
+    """
+    BM25 index over the passages of one document.
+
+    Passages are the document's sections (pages, slides, sheets and
+    headings) packed up to passage_chars (see pack_sections). Only an
+    inverted index of term frequencies is kept besides the passages
+    themselves.
+    """
+
+    def __init__(
+        self,
+        doc_id: str,
+        sections: Iterable[Tuple[Optional[str], str]],
+        chars: int,
+        passage_chars: int,
+        file_name: Optional[str] = None,
+    ):
+        self.doc_id = doc_id
+        self.file_name = file_name
+        self.chars = chars
+        self.passages: List[DocumentChunk] = pack_sections(sections, passage_chars)
+        self.postings: Dict[str, List[Tuple[int, int]]] = {}
+        self.lengths: List[int] = []
+
+        for index, passage in enumerate(self.passages):
+            counts = Counter(tokenize(passage.text))
+            self.lengths.append(sum(counts.values()))
+            for term, frequency in counts.items():
+                self.postings.setdefault(term, []).append((index, frequency))
+
+        self.avg_length = sum(self.lengths) / len(self.lengths) if self.lengths else 0.0
+
+    def search(self, query: str, top_k: int) -> List[Tuple[DocumentChunk, float]]:
+        """
+        Rank passages by BM25 relevance to a query.
+
+        Args:
+            query: Question or keywords
+            top_k: Number of passages to return
+
+        Returns:
+            Up to top_k (passage, score) pairs, best first; passages that
+            share no term with the query are left out
+        """
+        scores: Dict[int, float] = {}
+        total = len(self.passages)
+        for term in set(tokenize(query)):
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (total - len(postings) + 0.5) / (len(postings) + 0.5))
+            for index, frequency in postings:
+                norm = K1 * (1 - B + B * self.lengths[index] / self.avg_length)
+                scores[index] = scores.get(index, 0.0) + idf * frequency * (K1 + 1) / (frequency + norm)
+
+        best = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:top_k]
+        return [(self.passages[index], score) for index, score in best]
+
+
+class DocumentIndexStore:
+    """
+    In-memory LRU of document indexes for follow-up questions.
+
+    An index is built when a document is analyzed. If it has been evicted
+    (or the server restarted) it is rebuilt from the extraction cache,
+    whose key doubles as the document ID.
+    """
+
+    def __init__(self, passage_chars: int, max_documents: int, max_chars: int):
+        self.passage_chars = passage_chars
+        self.max_documents = max_documents
+        self.max_chars = max_chars
+        self._indexes: "OrderedDict[str, DocumentIndex]" = OrderedDict()
+        self._chars = 0
+        self.builds = 0
+        self.rebuilds = 0
+        self.evictions = 0
+        self.build_seconds = 0.0
+        self.searches = 0
+        self.search_seconds = 0.0
+
+    async def build(self, doc_id: str, text: str, file_name: Optional[str] = None) -> DocumentIndex:
+        """
+        Index a document's extracted text (in a worker thread).
+
+        Args:
+            doc_id: Document ID (see file_service.document_id)
+            text: Extracted text
+            file_name: Original filename, mentioned in answers
+
+        Returns:
+            The document's index
+        """
+        index = self._indexes.get(doc_id)
+        if index is not None:
+            self._indexes.move_to_end(doc_id)
+            if file_name:
+                index.file_name = file_name
+            return index
+
+        start = time.perf_counter()
+        index = await asyncio.to_thread(
+            lambda: DocumentIndex(doc_id, split_sections(text), len(text), self.passage_chars, file_name)
+        )
+        self.builds += 1
+        self.build_seconds += time.perf_counter() - start
+        self._store(index)
+        return index
+
+    async def get(self, doc_id: str) -> Optional[DocumentIndex]:
+        """
+        Get a document's index, rebuilding it from the extraction cache if needed.
+
+        Returns:
+            The index, or None if the document is unknown
+        """
+        index = self._indexes.get(doc_id)
+        if index is not None:
+            self._indexes.move_to_end(doc_id)
+            return index
+
+        if not settings.extraction_cache_enabled:
+            return None
+        cached = extraction_cache.open(doc_id)
+        if cached is None:
+            return None
+
+        def rebuild() -> DocumentIndex:
+            # The cache stores section offsets: read the sections straight from the mapped file
+            with cached:
+                return DocumentIndex(doc_id, cached.iter_sections(), cached.chars, self.passage_chars)
+
+        start = time.perf_counter()
+        index = await asyncio.to_thread(rebuild)
+        self.rebuilds += 1
+        self.build_seconds += time.perf_counter() - start
+        self.builds += 1
+        self._store(index)
+        return index
+
+    def contains(self, doc_id: str) -> bool:
+        return doc_id in self._indexes
+
+    def search(self, index: DocumentIndex, query: str, top_k: int) -> List[Tuple[DocumentChunk, float]]:
+        """Search an index, keeping timing statistics."""
+        start = time.perf_counter()
+        results = index.search(query, top_k)
+        self.searches += 1
+        self.search_seconds += time.perf_counter() - start
+        return results
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get index store statistics."""
+        return {
+            "documents": len(self._indexes),
+            "indexed_chars": self._chars,
+            "max_documents": self.max_documents,
+            "max_chars": self.max_chars,
+            "builds": self.builds,
+            "rebuilds": self.rebuilds,
+            "evictions": self.evictions,
+            "avg_build_ms": round(self.build_seconds / self.builds * 1000, 1) if self.builds else 0.0,
+            "searches": self.searches,
+            "avg_search_ms": round(self.search_seconds / self.searches * 1000, 2) if self.searches else 0.0,
+        }
+
+    def _store(self, index: DocumentIndex):
+        """Insert an index and evict least recently used ones down to the limits."""
+        if index.doc_id in self._indexes:
+            self._chars -= self._indexes.pop(index.doc_id).chars
+        self._indexes[index.doc_id] = index
+        self._chars += index.chars
+
+        while len(self._indexes) > 1 and (
+            len(self._indexes) > self.max_documents or self._chars > self.max_chars
+        ):
+            _, oldest = self._indexes.popitem(last=False)
+            self._chars -= oldest.chars
+            self.evictions += 1
+
+
+# Singleton store of per-document passage indexes
+document_index = DocumentIndexStore(
+    passage_chars=settings.document_index_passage_chars,
+    max_documents=settings.document_index_max_documents,
+    max_chars=settings.document_index_max_chars,
+)
@@ -0,0 +1,373 @@
+import asyncio
+import time
+from typing import Any, AsyncIterator, Dict, Iterable, List, Optional, Tuple
+from ..core.admission import LLMOverloadedError
+from ..core.config import settings
+from ..core.gemini_runner import gemini_runner
+from ..core.model_registry import model_registry
+from .document_extractor import SECTION_START
+
+
+MAX_LABEL_CHARS = 80
+
+
+def get_chunk_summarizer_prompt(language: str) -> str:
+    """Generate system prompt for summarizing one part of a long document."""
+    return f"""You condense parts of a long document so the whole document can be analyzed afterwards from your notes.
+
+IMPORTANT RULES:
+1. ALWAYS respond in {language}.
+2. Keep every key point, definition, formula, name, date, number and conclusion.
+3. Keep the order and the headings of the original.
+4. Use short bullet points. No introduction, no closing remarks, no questions.
+5. Do not add information that is not in the text."""
+
+
+model_registry.register_persona("chunk_summarizer", get_chunk_summarizer_prompt)
+
+
+class DocumentChunk:
+    """A run of consecutive document sections sent to the model together."""
+
+    def __init__(self, index: int, text: str, label: str):
+        self.index = index
+        self.text = text
+        self.label = label
+
+
+def _section_label(section: str) -> Optional[str]:
+    """The page, slide, sheet or heading a section starts with."""
+    first_line = section.split("\n", 1)[0]
+    if not SECTION_START.match(first_line):
+        return None
+    return first_line.strip("-# ").strip()
+
+
+def _split_section(section: str, chunk_chars: int) -> List[str]:
+    """Split a section longer than chunk_chars at line breaks (hard-cutting overlong lines)."""
+    if len(section) <= chunk_chars:
+        return [section]
+    pieces: List[str] = []
+    current: List[str] = []
+    size = 0
+    for line in section.split("\n"):
+        if len(line) > chunk_chars and current:
+            pieces.append("\n".join(current))
+            current, size = [], 0
+        while len(line) > chunk_chars:
+            pieces.append(line[:chunk_chars])
+            line = line[chunk_chars:]
+        if current and size + len(line) + 1 > chunk_chars:
+            pieces.append("\n".join(current))
+            current, size = [], 0
+        current.append(line)
+        size += len(line) + 1
+    if current:
+        pieces.append("\n".join(current))
+    return pieces
+
+
+def split_sections(text: str) -> List[Tuple[Optional[str], str]]:
+    """
+    Cut extracted document text at its page, slide, sheet and heading markers.
+
+    Returns:
+        (label, text) of each section in order; text before the first
+        marker has no label
+    """
+    starts = [match.start() for match in SECTION_START.finditer(text)]
+    if not starts or starts[0] != 0:
+        starts.insert(0, 0)
+    sections = []
+    for start, end in zip(starts, starts[1:] + [len(text)]):
+        section = text[start:end]
+        sections.append((_section_label(section), section))
+    return sections
+
+
+def pack_sections(sections: Iterable[Tuple[Optional[str], str]], chunk_chars: int) -> List[DocumentChunk]:
+    """
+    Pack consecutive document sections into chunks of up to chunk_chars.
+
+    Only a section that alone exceeds the budget is split inside, at line
+    breaks.
+
+    Args:
+        sections: (label, text) of each section in document order, from
+            split_sections or the extraction cache's section offsets
+        chunk_chars: Maximum characters per chunk
+
+    Returns:
+        Chunks in document order, labelled with the sections they cover
+    """
+    packed: List[List[Tuple[Optional[str], str]]] = []
+    current: List[Tuple[Optional[str], str]] = []
+    size = 0
+    for label, section in sections:
+        section = section.strip()
+        if not section:
+            continue
+        label = label[:MAX_LABEL_CHARS] if label else None
+        for piece in _split_section(section, chunk_chars):
+            if current and size + len(piece) + 1 > chunk_chars:
+                packed.append(current)
+                current, size = [], 0
+            current.append((label, piece))
+            size += len(piece) + 1
+    if current:
+        packed.append(current)
+
+    chunks = []
+    for index, pieces in enumerate(packed):
+        labels = [label for label, _ in pieces if label]
+        if not labels:
+            label = f"Part {index + 1}"
+        elif labels[0] == labels[-1]:
+            label = labels[0]
+        else:
+            label = f"{labels[0]} – {labels[-1]}"
+        chunks.append(DocumentChunk(index, "\n".join(piece for _, piece in pieces), label))
+    return chunks
+
+
+def split_document(text: str, chunk_chars: int) -> List[DocumentChunk]:
+    """
+    Split extracted document text into chunks along its structure.
+
+    The text is cut into sections at page, slide, sheet and heading
+    markers; consecutive sections are packed into chunks of up to
+    chunk_chars (see pack_sections).
+
+    Args:
+        text: Text from the document extractor
+        chunk_chars: Maximum characters per chunk
+
+    Returns:
+        Chunks in document order, labelled with the sections they cover
+    """
+    return pack_sections(split_sections(text), chunk_chars)
+
+
+class DocumentSummarizer:
+    """
+    Analyzes documents too long for one prompt with map-reduce.
+
+    - map: each structural chunk is summarized on its own, a few at a
+      time, at "batch" admission priority,
+    - combine: if the partial summaries are still too long for one
+      prompt, neighbouring summaries are merged until they fit,
+    - reduce: the file tutor writes the final analysis from the
+      summaries, streamed as it is generated.
+
+    Progress is reported as events so clients can show how far along a
+    long document is.
+    """
+
+    def __init__(self, chunk_chars: int, concurrency: int, reduce_chars: int):
+        self.chunk_chars = chunk_chars
+        self.concurrency = concurrency
+        self.reduce_chars = reduce_chars
+        self.documents = 0
+        self.chunks = 0
+        self.map_calls = 0
+        self.map_failures = 0
+        self.combine_calls = 0
+        self.combine_failures = 0
+        self.total_seconds = 0.0
+
+    async def summarize(
+        self,
+        text: str,
+        file_name: str,
+        file_type: str,
+        language: str,
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Analyze a long document's text with map-reduce.
+
+        Args:
+            text: Extracted document text
+            file_name: Original filename
+            file_type: MIME type
+            language: Target response language
+
+        Yields:
+            {"type": "progress", "stage": "map" | "combine" | "reduce", ...}
+            events, {"type": "delta", "text": ...} events with the final
+            answer as it streams, and last a {"type": "result", ...} event
+
+        Raises:
+            LLMOverloadedError: If the model stays overloaded
+        """
+        start = time.perf_counter()
+        chunks = split_document(text, self.chunk_chars)
+        self.documents += 1
+        self.chunks += len(chunks)
+
+        model = model_registry.get_model(settings.gemini_text_model, language, "chunk_summarizer")
+        semaphore = asyncio.Semaphore(self.concurrency)
+        total = len(chunks)
+
+        async def summarize_chunk(chunk: DocumentChunk) -> Tuple[int, str]:
+            prompt = (
+                f"This is part {chunk.index + 1} of {total} ({chunk.label}) of the document {file_name}. "
+                f"Summarize it in {language}:\n\n{chunk.text}"
+            )
+            async with semaphore:
+                self.map_calls += 1
+                try:
+                    summary = await self._generate(model, prompt)
+                except LLMOverloadedError:
+                    raise
+                except Exception as e:
+                    print(f"Error summarizing part {chunk.index + 1} of {file_name}: {str(e)}")
+                    self.map_failures += 1
+                    summary = "(This part could not be summarized.)"
+            return chunk.index, f"### {chunk.label}\n{summary}"
+
+        summaries: List[str] = [""] * total
+        yield {"type": "progress", "stage": "map", "completed": 0, "total": total}
+        completed = 0
+        async for index, summary in self._run_all([summarize_chunk(chunk) for chunk in chunks]):
+            summaries[index] = summary
+            completed += 1
+            yield {
+                "type": "progress",
+                "stage": "map",
+                "completed": completed,
+                "total": total,
+                "label": chunks[index].label,
+            }
+
+        # Merge neighbouring summaries until they fit in one prompt
+        while len(summaries) > 1 and sum(len(summary) + 2 for summary in summaries) > self.reduce_chars:
+            groups = self._group(summaries)
+
+            async def combine(index: int, group: List[str]) -> Tuple[int, str]:
+                prompt = (
+                    f"These are summaries of consecutive parts of the document {file_name}. "
+                    f"Merge them into one summary of this stretch of the document in {language}, "
+                    f"keeping the headings and important details:\n\n" + "\n\n".join(group)
+                )
+                async with semaphore:
+                    self.combine_calls += 1
+                    try:
+                        return index, await self._generate(model, prompt)
+                    except LLMOverloadedError:
+                        raise
+                    except Exception as e:
+                        print(f"Error merging summaries of {file_name}: {str(e)}")
+                        self.combine_failures += 1
+                        # Keep the group's summaries, cut so the groups still shrink to fit
+                        budget = max(1, self.reduce_chars // (2 * len(groups)))
+                        return index, "\n\n".join(group)[:budget]
+
+            combined: List[str] = [""] * len(groups)
+            yield {"type": "progress", "stage": "combine", "completed": 0, "total": len(groups)}
+            completed = 0
+            async for index, summary in self._run_all([combine(i, group) for i, group in enumerate(groups)]):
+                combined[index] = summary
+                completed += 1
+                yield {"type": "progress", "stage": "combine", "completed": completed, "total": len(groups)}
+            summaries = combined
+
+        yield {"type": "progress", "stage": "reduce", "completed": 0, "total": 1}
+        tutor = model_registry.get_model(settings.gemini_text_model, language, "file_tutor")
+        prompt = (
+            f"The document {file_name} ({file_type}) is too long to read at once, so it was summarized "
+            f"part by part. These are the summaries of its {total} parts, in order. Using them, analyze "
+            f"the whole document and provide insights in {language}:\n\n" + "\n\n".join(summaries)
+        )
+        parts: List[str] = []
+        async for chunk in gemini_runner.stream(
+            tutor,
+            [prompt],
+            generation_config={
+                "max_output_tokens": 2000,
+                "temperature": 0.7,
+            },
+            priority="batch",
+        ):
+            try:
+                delta = chunk.text
+            except ValueError:
+                # Chunks without text parts (e.g. finish or safety metadata)
+                continue
+            if delta:
+                parts.append(delta)
+                yield {"type": "delta", "text": delta}
+
+        elapsed = time.perf_counter() - start
+        self.total_seconds += elapsed
+        yield {
+            "type": "result",
+            "success": True,
+            "mode": "map_reduce",
+            "response": "".join(parts) or f"Unable to analyze the content of {file_name}.",
+            "chunks": total,
+            "elapsed_ms": round(elapsed * 1000, 1),
+        }
+
+    async def _generate(self, model: Any, prompt: str) -> str:
+        response = await gemini_runner.generate(
+            model,
+            [prompt],
+            generation_config={
+                "max_output_tokens": 1024,
+                "temperature": 0.3,
+            },
+            priority="batch",
+        )
+        try:
+            return response.text or ""
+        except ValueError:
+            # No text parts (e.g. blocked by safety filters)
+            return ""
+
+    async def _run_all(self, coroutines: List[Any]) -> AsyncIterator[Any]:
+        """Run coroutines concurrently and yield their results in completion order."""
+        tasks = [asyncio.create_task(coroutine) for coroutine in coroutines]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                yield await next_done
+        finally:
+            # The client went away or a call failed; stop what is left
+            for task in tasks:
+                task.cancel()
+
+    def _group(self, summaries: List[str]) -> List[List[str]]:
+        """Pack consecutive summaries into groups that fit one prompt (at least two per group)."""
+        groups: List[List[str]] = []
+        current: List[str] = []
+        size = 0
+        for summary in summaries:
+            if len(current) >= 2 and size + len(summary) + 2 > self.reduce_chars:
+                groups.append(current)
+                current, size = [], 0
+            current.append(summary)
+            size += len(summary) + 2
+        if current:
+            groups.append(current)
+        return groups
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get map-reduce call counters."""
+        return {
+            "documents": self.documents,
+            "chunks": self.chunks,
+            "map_calls": self.map_calls,
+            "map_failures": self.map_failures,
+            "combine_calls": self.combine_calls,
+            "combine_failures": self.combine_failures,
+            "avg_seconds": round(self.total_seconds / self.documents, 2) if self.documents else 0.0,
+            "chunk_chars": self.chunk_chars,
+            "concurrency": self.concurrency,
+        }
+
+
+# Singleton summarizer for long documents
+document_summarizer = DocumentSummarizer(
+    chunk_chars=settings.document_summary_chunk_chars,
+    concurrency=settings.document_summary_concurrency,
+    reduce_chars=settings.document_single_prompt_chars,
+)
@@ -0,0 +1,255 @@
+import hashlib
+import json
+import mmap
+import os
+import struct
+import tempfile
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from ..core.config import settings
+from .document_extractor import EXTRACTOR_VERSION, document_extractor, find_sections
+
+
+# File layout: magic, layout version, header length, JSON header, UTF-8 text
+MAGIC = b"XTXT"
+LAYOUT_VERSION = 1
+PREFIX = struct.Struct("<4sII")
+
+FILE_SUFFIX = ".xtxt"
+
+
+class CachedExtraction:
+    """
+    A cached document's text, memory-mapped from its cache file.
+
+    The header lists the document's sections (pages, slides, sheets,
+    headings) as byte offsets into the text, so one section can be read
+    without decoding the rest. Close it (or use it as a context manager)
+    when done.
+    """
+
+    def __init__(self, path: Path):
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            magic, version, header_length = PREFIX.unpack_from(self._mm, 0)
+            if magic != MAGIC or version != LAYOUT_VERSION:
+                raise ValueError("unknown layout")
+            header = json.loads(self._mm[PREFIX.size:PREFIX.size + header_length])
+            self.format: str = header["format"]
+            self.truncated: bool = header["truncated"]
+            self.chars: int = header["chars"]
+            starts = [(label, offset) for label, offset in header["sections"]]
+        except (struct.error, ValueError, KeyError, TypeError) as e:
+            self._mm.close()
+            raise ValueError(f"Not a valid extraction cache file: {path.name} ({e})")
+        self._text_start = PREFIX.size + header_length
+        text_bytes = len(self._mm) - self._text_start
+        self.sections: List[Tuple[str, int, int]] = [
+            (label, offset, starts[i + 1][1] if i + 1 < len(starts) else text_bytes)
+            for i, (label, offset) in enumerate(starts)
+        ]
+
+    def text(self) -> str:
+        """The whole text (decoded from the mapped file)."""
+        return self._mm[self._text_start:].decode("utf-8")
+
+    def section_text(self, index: int) -> str:
+        """The text of one section."""
+        _, start, end = self.sections[index]
+        return self._mm[self._text_start + start:self._text_start + end].decode("utf-8")
+
+    def iter_sections(self) -> Iterator[Tuple[Optional[str], str]]:
+        """
+        (label, text) of each section in order, decoded one at a time.
+
+        Text before the first marker comes first, without a label.
+        """
+        first = self.sections[0][1] if self.sections else len(self._mm) - self._text_start
+        if first:
+            yield None, self._mm[self._text_start:self._text_start + first].decode("utf-8")
+        for index, (label, _, _) in enumerate(self.sections):
+            yield label, self.section_text(index)
+
+    def close(self):
+        self._mm.close()
+
+    def __enter__(self) -> "CachedExtraction":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class ExtractionCache:
+    """
+    On-disk cache of extracted document text, keyed by file content hash.
+
+    A re-uploaded document (same bytes, same format) is served from its
+    cache file instead of being parsed again in a worker process. Each
+    entry is one file: a small JSON header with the section offsets,
+    followed by the normalized text, read through mmap. Files are evicted
+    least-recently-used first once their total size exceeds max_bytes.
+    """
+
+    def __init__(self, cache_dir: str, max_bytes: int, max_chars: int):
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+        self.max_chars = max_chars
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+        # key -> file size, least recently used first
+        self._entries: "OrderedDict[str, int]" = OrderedDict()
+        for path in sorted(self.cache_dir.glob(f"*{FILE_SUFFIX}"), key=lambda p: p.stat().st_mtime):
+            self._entries[path.stem] = path.stat().st_size
+        self._bytes = sum(self._entries.values())
+
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.evictions = 0
+        self.read_seconds = 0.0
+
+    def make_key(self, content_hash: str, fmt: str) -> str:
+        """Cache key of a file's extraction (changes with the extractor version and text limit)."""
+        return hashlib.sha256(
+            f"{content_hash}\n{fmt}\n{EXTRACTOR_VERSION}\n{self.max_chars}".encode("utf-8")
+        ).hexdigest()
+
+    def get(self, content_hash: str, fmt: str) -> Optional[CachedExtraction]:
+        """
+        Open a cached extraction.
+
+        Args:
+            content_hash: SHA-256 of the file content
+            fmt: Format from detect_document_format
+
+        Returns:
+            The mapped extraction (close it when done), or None on a miss
+        """
+        return self.open(self.make_key(content_hash, fmt))
+
+    def open(self, key: str) -> Optional[CachedExtraction]:
+        """
+        Open a cached extraction by its key (see make_key).
+
+        Returns:
+            The mapped extraction (close it when done), or None on a miss
+        """
+        if key not in self._entries:
+            self.misses += 1
+            return None
+
+        start = time.perf_counter()
+        path = self._path(key)
+        try:
+            cached = CachedExtraction(path)
+        except (OSError, ValueError) as e:
+            print(f"Error reading extraction cache entry {key}: {e}")
+            self._delete(key)
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        try:
+            os.utime(path)  # keep LRU order across restarts
+        except OSError:
+            pass
+        self.hits += 1
+        self.read_seconds += time.perf_counter() - start
+        return cached
+
+    def set(self, content_hash: str, fmt: str, text: str, truncated: bool):
+        """
+        Store a document's extracted text.
+
+        Args:
+            content_hash: SHA-256 of the file content
+            fmt: Format from detect_document_format
+            text: Normalized extracted text
+            truncated: Whether extraction stopped at the text limit
+        """
+        key = self.make_key(content_hash, fmt)
+        data = text.encode("utf-8")
+
+        # Section offsets in bytes, so readers can slice the mapped file directly
+        sections = []
+        byte_offset, char_offset = 0, 0
+        for label, offset in find_sections(text):
+            byte_offset += len(text[char_offset:offset].encode("utf-8"))
+            char_offset = offset
+            sections.append([label, byte_offset])
+
+        header = json.dumps({
+            "format": fmt,
+            "truncated": truncated,
+            "chars": len(text),
+            "created_at": time.time(),
+            "sections": sections,
+        }, ensure_ascii=False).encode("utf-8")
+        size = PREFIX.size + len(header) + len(data)
+        if size > self.max_bytes:
+            return
+
+        # Write to a temp file and rename, so readers never see a partial entry
+        fd, temp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(PREFIX.pack(MAGIC, LAYOUT_VERSION, len(header)))
+                f.write(header)
+                f.write(data)
+            os.replace(temp_path, self._path(key))
+        except OSError as e:
+            print(f"Error writing extraction cache entry: {e}")
+            Path(temp_path).unlink(missing_ok=True)
+            return
+
+        self._bytes += size - self._entries.pop(key, 0)
+        self._entries[key] = size
+        self.writes += 1
+
+        while self._bytes > self.max_bytes:
+            oldest_key = next(iter(self._entries))
+            self._delete(oldest_key)
+            self.evictions += 1
+
+    def clear(self):
+        """Remove every cached extraction."""
+        for key in list(self._entries):
+            self._delete(key)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get cache statistics."""
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "writes": self.writes,
+            "evictions": self.evictions,
+            "avg_open_ms": round(self.read_seconds / self.hits * 1000, 2) if self.hits else 0.0,
+        }
+
+    def _path(self, key: str) -> Path:
+        return self.cache_dir / f"{key}{FILE_SUFFIX}"
+
+    def _delete(self, key: str):
+        """Delete an entry's file and update the size counter."""
+        self._bytes -= self._entries.pop(key, 0)
+        try:
+            self._path(key).unlink()
+        except OSError:
+            pass
+
+
+# Singleton cache of extracted document text (same lecture PDF uploaded again)
+extraction_cache = ExtractionCache(
+    cache_dir=settings.extraction_cache_dir,
+    max_bytes=settings.extraction_cache_max_bytes,
+    max_chars=document_extractor.max_chars,
+)
@@ -1,14 +1,22 @@
-import base64
+import hashlib
 import io
 import tempfile
 import os
-from typing import Optional
-from ..core.gemini_client import gemini_client
+from typing import Any, AsyncIterator, Dict, List, Optional
+from ..core.admission import LLMOverloadedError
+from ..core.gemini_runner import gemini_runner
+from ..core.media import MediaBlob
+from ..core.model_registry import model_registry
+from ..core.single_flight import single_flight
 from ..core.config import settings
+from .document_extractor import DocumentExtractionError, detect_document_format, document_extractor
+from .document_index import document_index
+from .document_summarizer import document_summarizer
+from .extraction_cache import extraction_cache
 
-def get_file_tutor_prompt(language: str, file_name: str, file_type: str) -> str:
+def get_file_tutor_prompt(language: str) -> str:
     """Generate system prompt for file tutoring in specified language."""
-    return f"""You are an expert document analysis AI. You're analyzing a {file_type} file named "{file_name}".
+    return f"""You are an expert document analysis AI. You're analyzing a file the user uploaded; its name and type are given with the content.
 
 IMPORTANT RULES:
 1. ALWAYS respond in {language}. Every word of your response must be in {language}.
@@ -23,113 +31,261 @@ IMPORTANT RULES:
 
 Remember: Your entire response must be in {language}."""
 
-async def analyze_file(file_base64: str, file_name: str, file_type: str, language: str) -> str:
+model_registry.register_persona("file_tutor", get_file_tutor_prompt)
+
+async def analyze_file(file: MediaBlob, file_name: str, language: str) -> str:
     """
     Analyze an uploaded file using Gemini Vision API.
     
+    Identical uploads already in flight share one analysis.
+    
     Args:
-        file_base64: Base64 encoded file content
+        file: Decoded file content; its MIME type is the declared file type
         file_name: Original filename
-        file_type: MIME type of the file
         language: Target response language
         
     Returns:
         AI-generated analysis in specified language
     """
+    file_key = hashlib.sha256(
+        f"{file_name}\n{file.mime_type}\n{language}\n{file.sha256}".encode("utf-8")
+    ).hexdigest()
+    
+    return await single_flight.run(
+        "file",
+        file_key,
+        lambda: _analyze_file(file, file_name, language),
+    )
+
+
+async def _analyze_file(file: MediaBlob, file_name: str, language: str) -> str:
+    """Analyze an uploaded file (see analyze_file)."""
+    response_text = f"Unable to analyze {file_name}."
     try:
-        # Decode base64 content
-        file_content = base64.b64decode(file_base64)
-        
-        # Determine if we should use vision or text model
-        is_image_file = file_type.startswith('image/')
-        
-        if is_image_file:
-            # Use vision model for images
-            model = gemini_client.GenerativeModel(settings.gemini_vision_model)
-            
-            content = [
-                get_file_tutor_prompt(language, file_name, file_type),
-                f"This is an image file named '{file_name}'. Please analyze what you see and provide insights in {language}.",
-                {
-                    "mime_type": file_type,
-                    "data": file_base64
-                }
-            ]
-            
-            response = model.generate_content(
-                content,
-                generation_config={
-                    "max_output_tokens": 2000,
-                    "temperature": 0.7,
-                }
-            )
-            
-            return response.text or f"Unable to analyze the image {file_name}."
-            
-        else:
-            # Use text model for documents
-            model = gemini_client.GenerativeModel(settings.gemini_text_model)
-            
-            # Try to extract text from the file
-            text_content = await extract_text_from_file(file_content, file_type, file_name)
-            
-            if not text_content:
-                return f"Unable to extract text from {file_name}. The file might be corrupted or in an unsupported format."
-            
-            # Truncate content if too long (Gemini has limits)
-            max_chars = 100000  # Conservative limit
-            if len(text_content) > max_chars:
-                text_content = text_content[:max_chars] + "\n\n[Content truncated due to length...]"
-            
-            content = [
-                get_file_tutor_prompt(language, file_name, file_type),
-                f"This is the content of {file_name} ({file_type}). Please analyze it and provide insights in {language}:\n\n{text_content}"
-            ]
-            
-            response = model.generate_content(
-                content,
-                generation_config={
-                    "max_output_tokens": 2000,
-                    "temperature": 0.7,
-                }
-            )
-            
-            return response.text or f"Unable to analyze the content of {file_name}."
+        async for event in analyze_file_stream(file, file_name, language):
+            if event["type"] == "result":
+                response_text = event["response"]
+        return response_text
             
+    except LLMOverloadedError:
+        raise
     except Exception as e:
         print(f"Error analyzing file {file_name}: {str(e)}")
         return f"Error analyzing {file_name}: {str(e)}"
 
-async def extract_text_from_file(file_content: bytes, file_type: str, file_name: str) -> Optional[str]:
+
+async def analyze_file_stream(file: MediaBlob, file_name: str, language: str) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Analyze an uploaded file, reporting progress as it goes.
+    
+    Images and documents that fit in one prompt get a single model call.
+    Longer documents are summarized part by part and analyzed from the
+    summaries (see DocumentSummarizer) instead of being cut off.
+    
+    Args:
+        file: Decoded file content; its MIME type is the declared file type
+        file_name: Original filename
+        language: Target response language
+        
+    Yields:
+        {"type": "progress", ...} events, for documents a {"type": "document",
+        "doc_id": ...} event once the text is indexed for follow-up
+        questions, {"type": "delta", "text": ...}
+        events with the answer as it is generated, and last a
+        {"type": "result", "success": ..., "mode": ..., "response": ...} event
+        
+    Raises:
+        LLMOverloadedError: If the model stays overloaded
+    """
+    file_type = file.mime_type
+    
+    # Determine if we should use vision or text model
+    if file_type.startswith('image/'):
+        # Use vision model for images
+        model = model_registry.get_model(settings.gemini_vision_model, language, "file_tutor")
+        content = [
+            f"This is an image file named '{file_name}'. Please analyze what you see and provide insights in {language}.",
+            file.to_part(),
+        ]
+        fallback = f"Unable to analyze the image {file_name}."
+    else:
+        # Use text model for documents
+        yield {"type": "progress", "stage": "extract"}
+        try:
+            text_content = await extract_text_from_file(file.data, file_type, file_name, content_hash=file.sha256)
+        except DocumentExtractionError as e:
+            text_content = None
+            unavailable = f"Unable to extract text from {file_name}: {str(e)}"
+        else:
+            unavailable = f"Unable to extract text from {file_name}. The file might be corrupted or in an unsupported format."
+        
+        if not text_content:
+            yield {"type": "result", "success": False, "mode": "none", "response": unavailable}
+            return
+        
+        # Index the passages for follow-up questions (see answer_file_question)
+        doc_id = document_id(file, file_name)
+        index = await document_index.build(doc_id, text_content, file_name)
+        yield {"type": "document", "doc_id": doc_id, "passages": len(index.passages)}
+        
+        if len(text_content) > settings.document_single_prompt_chars:
+            # Too long for one prompt: map-reduce over the document's parts
+            async for event in document_summarizer.summarize(text_content, file_name, file_type, language):
+                yield event
+            return
+        
+        model = model_registry.get_model(settings.gemini_text_model, language, "file_tutor")
+        content = [
+            f"This is the content of {file_name} ({file_type}). Please analyze it and provide insights in {language}:\n\n{text_content}"
+        ]
+        fallback = f"Unable to analyze the content of {file_name}."
+    
+    parts: List[str] = []
+    async for chunk in gemini_runner.stream(
+        model,
+        content,
+        generation_config={
+            "max_output_tokens": 2000,
+            "temperature": 0.7,
+        },
+        priority="batch",
+    ):
+        try:
+            delta = chunk.text
+        except ValueError:
+            # Chunks without text parts (e.g. finish or safety metadata)
+            continue
+        if delta:
+            parts.append(delta)
+            yield {"type": "delta", "text": delta}
+    
+    yield {"type": "result", "success": True, "mode": "single", "response": "".join(parts) or fallback}
+
+def document_id(file: MediaBlob, file_name: str) -> Optional[str]:
+    """
+    ID of an uploaded document for follow-up questions.
+    
+    This is the document's extraction cache key, so an index that was
+    evicted from memory can be rebuilt from the cached text.
+    
+    Returns:
+        The ID, or None for files without extractable text (e.g. images)
+    """
+    fmt = detect_document_format(file.mime_type, file_name)
+    if fmt is None:
+        return None
+    return extraction_cache.make_key(file.sha256, fmt)
+
+
+async def answer_file_question(
+    doc_id: str,
+    question: str,
+    language: str,
+    top_k: int,
+) -> Optional[Dict[str, Any]]:
+    """
+    Answer a question about an uploaded document from its relevant passages.
+    
+    Only the top_k passages ranked by BM25 against the question go into
+    the prompt, instead of the whole document.
+    
+    Args:
+        doc_id: Document ID from the analysis (see document_id)
+        question: The student's question
+        language: Target response language
+        top_k: Number of passages to include
+        
+    Returns:
+        {"response": ..., "passages": [{"label": ..., "score": ...}]}, or
+        None if the document is unknown (not uploaded or expired)
+        
+    Raises:
+        LLMOverloadedError: If the model stays overloaded
+    """
+    index = await document_index.get(doc_id)
+    if index is None:
+        return None
+    
+    hits = document_index.search(index, question, top_k)
+    if not hits:
+        # No passage shares a word with the question: give the model the start of the document
+        hits = [(passage, 0.0) for passage in index.passages[:top_k]]
+    
+    # Passages in document order read more naturally than in score order
+    passages = sorted(hits, key=lambda hit: hit[0].index)
+    excerpts = "\n\n".join(f"[{passage.label}]\n{passage.text}" for passage, _ in passages)
+    name = index.file_name or "the uploaded document"
+    prompt = (
+        f"These are excerpts from {name}, selected as relevant to the student's question. "
+        f"Answer the question in {language} using only these excerpts and mention the pages or "
+        f"sections you used. If the excerpts do not contain the answer, say so.\n\n"
+        f"{excerpts}\n\nQuestion: {question}"
+    )
+    
+    model = model_registry.get_model(settings.gemini_text_model, language, "file_tutor")
+    response = await gemini_runner.generate(
+        model,
+        [prompt],
+        generation_config={
+            "max_output_tokens": 1024,
+            "temperature": 0.5,
+        },
+        priority="interactive",
+    )
+    
+    return {
+        "response": response.text or f"Unable to answer the question about {name}.",
+        "passages": [{"label": passage.label, "score": round(score, 3)} for passage, score in hits],
+    }
+
+
+async def extract_text_from_file(
+    file_content: bytes,
+    file_type: str,
+    file_name: str,
+    content_hash: Optional[str] = None,
+) -> Optional[str]:
     """
     Extract text from various file types.
     
+    PDF, Word (.docx), Excel (.xlsx), CSV and PowerPoint (.pptx) files are
+    parsed in worker processes (see DocumentExtractor), or read from the
+    extraction cache if the same file was read before. Text longer than
+    the extraction limit is cut off with a note.
+    
     Args:
         file_content: Raw file bytes
         file_type: MIME type
         file_name: Filename
+        content_hash: SHA-256 of file_content, to use the extraction cache
         
     Returns:
-        Extracted text content or None if extraction failed
-    """
-    try:
-        # For text files, decode directly
-        if file_type.startswith('text/'):
-            return file_content.decode('utf-8', errors='ignore')
+        Extracted text content or None if the format is not supported
         
-        # For other file types, we'll need additional libraries
-        # For now, return a basic response
-        if file_type == 'application/pdf':
-            return "[PDF content extraction would require PyPDF2 or similar library]"
-        elif 'word' in file_type:
-            return "[Word document extraction would require python-docx or similar library]"
-        elif 'excel' in file_type or file_type == 'text/csv':
-            return "[Excel/CSV extraction would require openpyxl or pandas library]"
-        elif 'powerpoint' in file_type:
-            return "[PowerPoint extraction would require python-pptx or similar library]"
-        else:
-            return f"[Content extraction for {file_type} is not yet implemented]"
-            
-    except Exception as e:
-        print(f"Error extracting text from {file_name}: {str(e)}")
+    Raises:
+        DocumentExtractionError: If the document could not be read in time
+            or within the memory limit
+    """
+    fmt = detect_document_format(file_type, file_name)
+    if fmt is None:
         return None
+    
+    use_cache = settings.extraction_cache_enabled and content_hash is not None
+    cached = extraction_cache.get(content_hash, fmt) if use_cache else None
+    if cached is not None:
+        with cached:
+            text, truncated = cached.text(), cached.truncated
+    else:
+        if fmt == "text":
+            # For text files, decode directly (still cached, so the document index can be rebuilt)
+            text = file_content.decode('utf-8', errors='ignore')
+            truncated = len(text) > document_extractor.max_chars
+            text = text[:document_extractor.max_chars]
+        else:
+            text, truncated = await document_extractor.extract(file_content, fmt)
+        if use_cache:
+            extraction_cache.set(content_hash, fmt, text, truncated)
+    
+    if truncated:
+        text += "\n\n[Content truncated due to length...]"
+    return text
@@ -0,0 +1,234 @@
+import io
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+try:
+    from PIL import Image
+except ImportError:  # Pillow is optional; without it every frame is analyzed
+    Image = None
+
+from ..core.config import settings
+
+
+def compute_dhash(image_bytes: bytes, hash_size: int = 16) -> Optional[int]:
+    """
+    Compute a difference hash (dHash) of an image.
+
+    The image is reduced to a (hash_size + 1) x hash_size grayscale grid and
+    each bit records whether a pixel is brighter than its right neighbour,
+    so small compression or cursor changes flip only a few bits.
+
+    Args:
+        image_bytes: Encoded image (JPEG, PNG, ...)
+        hash_size: Grid height; the hash has hash_size * hash_size bits
+
+    Returns:
+        The hash as an integer, or None if Pillow is missing or decoding fails
+    """
+    if Image is None:
+        return None
+
+    try:
+        image = Image.open(io.BytesIO(image_bytes))
+        # Let the JPEG decoder downscale while decoding; much cheaper than a full decode
+        image.draft("L", ((hash_size + 1) * 4, hash_size * 4))
+        image.load()
+    except Exception as e:
+        print(f"Error hashing frame: {e}")
+        return None
+
+    return dhash_image(image, hash_size)
+
+
+def dhash_image(image: "Image.Image", hash_size: int = 16) -> int:
+    """Compute the dHash of an already decoded image (see compute_dhash)."""
+    image = image.convert("L").resize((hash_size + 1, hash_size), Image.BILINEAR)
+    pixels = list(image.getdata())
+    value = 0
+    for row in range(hash_size):
+        offset = row * (hash_size + 1)
+        for col in range(hash_size):
+            value = (value << 1) | (pixels[offset + col] > pixels[offset + col + 1])
+    return value
+
+
+def hamming_distance(a: int, b: int) -> int:
+    """Number of differing bits between two hashes."""
+    return bin(a ^ b).count("1")
+
+
+class ScreenSessionFrame:
+    """
+    The last analyzed frame of a screen-share session.
+
+    `analysis` always describes a whole screen and is the context for
+    changed-region crops. `last_answer` is the reply to the frame the hash
+    and thumbnail belong to (the crop answer after a crop), returned for
+    duplicates of that frame.
+    """
+
+    def __init__(self, frame_hash: int, language: str, analysis: str, thumbnail: Optional["Image.Image"] = None):
+        self.frame_hash = frame_hash
+        self.language = language
+        self.analysis = analysis
+        self.last_answer = analysis
+        self.thumbnail = thumbnail  # grayscale thumbnail for changed-region detection
+        self.analyzed_at = time.time()  # of the full-screen analysis
+        self.answered_at = self.analyzed_at
+        self.last_seen = self.analyzed_at
+
+
+class FrameDeduplicator:
+    """
+    Skips re-analysis of screen frames that have not visibly changed.
+
+    Each session remembers the perceptual hash and analysis of its last
+    analyzed frame. A new frame within `max_distance` bits of it reuses
+    that analysis instead of calling the model, for at most
+    `max_reuse_seconds` (0 = no limit), since small text edits can stay
+    under the distance threshold.
+    """
+
+    def __init__(
+        self,
+        enabled: bool,
+        hash_size: int,
+        max_distance: int,
+        max_reuse_seconds: float,
+        session_ttl_seconds: float,
+        max_sessions: int,
+    ):
+        self.enabled = enabled and Image is not None
+        self.hash_size = hash_size
+        self.max_distance = max_distance
+        self.max_reuse_seconds = max_reuse_seconds
+        self.session_ttl_seconds = session_ttl_seconds
+        self.max_sessions = max_sessions
+        self._sessions: "OrderedDict[str, ScreenSessionFrame]" = OrderedDict()
+        self.frames_analyzed = 0
+        self.frames_skipped = 0
+        self.frames_cropped = 0
+        self.crop_bytes_saved = 0
+
+        if enabled and Image is None:
+            print("Pillow is not installed; screen frame deduplication is disabled")
+
+    def find_duplicate(self, session_id: str, language: str, frame_hash: int) -> Optional[str]:
+        """
+        Return the cached analysis if the frame matches the session's last one.
+
+        Args:
+            session_id: Screen-share session ID
+            language: Response language of the request
+            frame_hash: dHash of the new frame
+
+        Returns:
+            The previous analysis, or None if the frame must be analyzed
+        """
+        previous = self._sessions.get(session_id)
+        if previous is None:
+            return None
+        now = time.time()
+        if now - previous.last_seen > self.session_ttl_seconds:
+            del self._sessions[session_id]
+            return None
+        if self.max_reuse_seconds and now - previous.answered_at > self.max_reuse_seconds:
+            return None
+        if previous.language != language or hamming_distance(previous.frame_hash, frame_hash) > self.max_distance:
+            return None
+
+        previous.last_seen = now
+        self._sessions.move_to_end(session_id)
+        self.frames_skipped += 1
+        return previous.last_answer
+
+    def get_reference(self, session_id: str, language: str) -> Optional[ScreenSessionFrame]:
+        """
+        Get the session's reference frame for a changed-region crop.
+
+        Returns None if there is none in this language, or if its
+        full-screen analysis is older than `max_reuse_seconds`, so the
+        screen is periodically analyzed in full again.
+        """
+        previous = self._sessions.get(session_id)
+        if previous is None or previous.language != language:
+            return None
+        if self.max_reuse_seconds and time.time() - previous.analyzed_at > self.max_reuse_seconds:
+            return None
+        return previous
+
+    def remember(
+        self,
+        session_id: str,
+        language: str,
+        frame_hash: int,
+        analysis: str,
+        thumbnail: Optional["Image.Image"] = None,
+    ):
+        """Store a freshly analyzed frame as the session's reference."""
+        self.frames_analyzed += 1
+        self._sessions[session_id] = ScreenSessionFrame(frame_hash, language, analysis, thumbnail)
+        self._sessions.move_to_end(session_id)
+        while len(self._sessions) > self.max_sessions:
+            self._sessions.popitem(last=False)
+
+    def advance(
+        self,
+        session_id: str,
+        frame_hash: int,
+        answer: str,
+        thumbnail: Optional["Image.Image"] = None,
+    ):
+        """
+        Move the session's reference to a frame that was analyzed as a crop.
+
+        Duplicates of that frame get the crop's answer, but the crop context
+        stays the last full-screen analysis, since the answer only covers
+        what changed.
+        """
+        previous = self._sessions.get(session_id)
+        if previous is None:
+            return
+        self.frames_analyzed += 1
+        previous.frame_hash = frame_hash
+        previous.thumbnail = thumbnail
+        previous.last_answer = answer
+        previous.answered_at = previous.last_seen = time.time()
+        self._sessions.move_to_end(session_id)
+
+    def record_crop(self, frame_bytes: int, crop_bytes: int):
+        """Count a frame sent as a changed-region crop instead of in full."""
+        self.frames_cropped += 1
+        self.crop_bytes_saved += max(0, frame_bytes - crop_bytes)
+
+    def forget(self, session_id: str):
+        """Drop a session's reference frame (e.g. when sharing stops)."""
+        self._sessions.pop(session_id, None)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get counters for frames skipped against frames analyzed."""
+        total = self.frames_analyzed + self.frames_skipped
+        return {
+            "enabled": self.enabled,
+            "hash_bits": self.hash_size * self.hash_size,
+            "max_distance": self.max_distance,
+            "max_reuse_seconds": self.max_reuse_seconds,
+            "sessions": len(self._sessions),
+            "frames_analyzed": self.frames_analyzed,
+            "frames_skipped": self.frames_skipped,
+            "skip_rate": round(self.frames_skipped / total, 3) if total else 0.0,
+            "frames_cropped": self.frames_cropped,
+            "crop_bytes_saved": self.crop_bytes_saved,
+        }
+
+
+# Singleton frame deduplicator for screen tutoring
+frame_deduplicator = FrameDeduplicator(
+    enabled=settings.screen_dedupe_enabled,
+    hash_size=settings.screen_dedupe_hash_size,
+    max_distance=settings.screen_dedupe_max_distance,
+    max_reuse_seconds=settings.screen_dedupe_max_reuse_seconds,
+    session_ttl_seconds=settings.screen_session_ttl_seconds,
+    max_sessions=settings.screen_max_sessions,
+)
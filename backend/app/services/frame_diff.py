@@ -0,0 +1,105 @@
+import io
+from typing import Optional, Tuple
+
+try:
+    from PIL import Image, ImageChops
+except ImportError:  # Pillow is optional; without it full frames are always sent
+    Image = None
+    ImageChops = None
+
+
+# Fractional (left, top, right, bottom) box within a frame
+Region = Tuple[float, float, float, float]
+
+
+def decode_thumbnail(image_bytes: bytes, width: int) -> Optional["Image.Image"]:
+    """
+    Decode an image into a small grayscale thumbnail for frame comparison.
+
+    Args:
+        image_bytes: Encoded image (JPEG, WebP, PNG)
+        width: Thumbnail width; height keeps the aspect ratio
+
+    Returns:
+        The thumbnail, or None if Pillow is missing or decoding fails
+    """
+    if Image is None:
+        return None
+
+    try:
+        image = Image.open(io.BytesIO(image_bytes))
+        height = max(1, round(image.height * width / image.width))
+        # Let the JPEG decoder downscale while decoding
+        image.draft("L", (width, height))
+        return image.convert("L").resize((width, height), Image.BILINEAR)
+    except Exception as e:
+        print(f"Error decoding frame thumbnail: {e}")
+        return None
+
+
+def changed_region(
+    previous: "Image.Image",
+    current: "Image.Image",
+    threshold: int = 24,
+) -> Optional[Region]:
+    """
+    Find the bounding box of pixels that changed between two thumbnails.
+
+    Args:
+        previous: Thumbnail of the last analyzed frame
+        current: Thumbnail of the new frame
+        threshold: Minimum grayscale difference (0-255) counted as a change;
+            filters out JPEG noise
+
+    Returns:
+        Fractional box of the changed area, or None if the thumbnails are not
+        comparable (different sizes) or nothing changed
+    """
+    if previous.size != current.size:
+        return None
+
+    mask = ImageChops.difference(previous, current).point(lambda value: 255 if value >= threshold else 0)
+    box = mask.getbbox()
+    if box is None:
+        return None
+
+    width, height = current.size
+    left, top, right, bottom = box
+    return left / width, top / height, right / width, bottom / height
+
+
+def region_area(region: Region) -> float:
+    """Fraction of the frame covered by a region."""
+    left, top, right, bottom = region
+    return (right - left) * (bottom - top)
+
+
+def crop_frame(image_bytes: bytes, region: Region, margin: float = 0.03, quality: int = 85) -> Optional[bytes]:
+    """
+    Crop a region (plus a margin for context) out of a full-resolution frame.
+
+    Args:
+        image_bytes: Encoded full frame
+        region: Fractional box to crop
+        margin: Padding around the box as a fraction of the frame size
+        quality: JPEG quality of the crop
+
+    Returns:
+        The crop encoded as JPEG, or None if decoding fails
+    """
+    try:
+        image = Image.open(io.BytesIO(image_bytes))
+        width, height = image.size
+        left, top, right, bottom = region
+        box = (
+            max(0, int((left - margin) * width)),
+            max(0, int((top - margin) * height)),
+            min(width, int((right + margin) * width) + 1),
+            min(height, int((bottom + margin) * height) + 1),
+        )
+        output = io.BytesIO()
+        image.crop(box).convert("RGB").save(output, format="JPEG", quality=quality)
+        return output.getvalue()
+    except Exception as e:
+        print(f"Error cropping frame: {e}")
+        return None
@@ -0,0 +1,233 @@
+import asyncio
+import io
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Optional, Tuple
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # Pillow is optional; without it images are sent as uploaded
+    Image = None
+    ImageOps = None
+
+from ..core.config import settings
+from ..core.media import MediaBlob
+
+
+OUTPUT_MIME_TYPES = {"JPEG": "image/jpeg", "WEBP": "image/webp"}
+
+# Bump when normalize_image_bytes output changes so analyses of old output are not reused
+NORMALIZER_VERSION = 1
+
+
+def normalize_image_bytes(
+    image_bytes: bytes,
+    max_dimension: int,
+    output_format: str = "JPEG",
+    quality: int = 85,
+) -> Tuple[bytes, str, bool]:
+    """
+    Downscale, re-orient and re-encode an image without its metadata.
+
+    Args:
+        image_bytes: Uploaded image
+        max_dimension: Longest side of the output in pixels
+        output_format: "JPEG" or "WEBP"
+        quality: Encoder quality (1-100)
+
+    Returns:
+        Tuple of (encoded bytes, MIME type, changed). When the upload needed
+        no resize, rotation or metadata stripping and re-encoding would not
+        make it smaller, the original bytes are returned with changed=False.
+    """
+    image = Image.open(io.BytesIO(image_bytes))
+    original_format = image.format
+    has_metadata = bool(image.info.get("exif") or image.info.get("icc_profile") or image.info.get("xmp"))
+
+    # Let the JPEG decoder downscale by a power of two while decoding
+    image.draft("RGB", (max_dimension, max_dimension))
+
+    # Apply the EXIF orientation so the model sees the photo upright
+    rotated = image.getexif().get(0x0112, 1) != 1
+    if rotated:
+        image = ImageOps.exif_transpose(image)
+
+    resized = max(image.size) > max_dimension
+    if resized:
+        image.thumbnail((max_dimension, max_dimension), Image.LANCZOS)
+
+    if image.mode in ("RGBA", "LA", "P"):
+        image = image.convert("RGBA")
+        if output_format == "JPEG":
+            # JPEG has no alpha; flatten onto white like a browser would
+            background = Image.new("RGB", image.size, (255, 255, 255))
+            background.paste(image, mask=image.getchannel("A"))
+            image = background
+    elif image.mode not in ("RGB", "L") or (image.mode == "L" and output_format != "JPEG"):
+        image = image.convert("RGB")
+
+    output = io.BytesIO()
+    image.save(output, format=output_format, quality=quality, optimize=output_format == "JPEG")
+    normalized = output.getvalue()
+
+    if not (resized or rotated or has_metadata) and len(normalized) >= len(image_bytes):
+        original_mime = Image.MIME.get(original_format)
+        if original_mime:
+            return image_bytes, original_mime, False
+
+    return normalized, OUTPUT_MIME_TYPES[output_format], True
+
+
+class ImageNormalizer:
+    """
+    Normalizes uploaded images before vision calls in a bounded worker pool.
+
+    Normalized bytes are cached by the hash of the upload, so the same
+    image is processed once. Per-request and cumulative bytes saved and
+    CPU time are reported.
+    """
+
+    def __init__(
+        self,
+        enabled: bool,
+        max_dimension: int,
+        output_format: str,
+        quality: int,
+        max_workers: int,
+        cache_max_bytes: int,
+    ):
+        self.enabled = enabled and Image is not None
+        self.max_dimension = max_dimension
+        self.output_format = output_format.upper()
+        self.quality = quality
+        self.cache_max_bytes = cache_max_bytes
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="image-normalize")
+        self._cache: "OrderedDict[str, Tuple[bytes, str]]" = OrderedDict()
+        self._cache_bytes = 0
+
+        self.images = 0
+        self.cache_hits = 0
+        self.failures = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.cpu_seconds = 0.0
+
+        if self.output_format not in OUTPUT_MIME_TYPES:
+            raise ValueError(f"Unsupported image output format: {output_format}")
+        if enabled and Image is None:
+            print("Pillow is not installed; images are sent to the vision model unprocessed")
+
+    @property
+    def output_settings(self) -> Optional[Tuple[Any, ...]]:
+        """Everything that determines the normalized bytes (None when disabled), for cache keys."""
+        if not self.enabled:
+            return None
+        return (NORMALIZER_VERSION, self.max_dimension, self.output_format, self.quality)
+
+    async def normalize(self, image: MediaBlob) -> Tuple[MediaBlob, Dict[str, Any]]:
+        """
+        Normalize an uploaded image.
+
+        Args:
+            image: Uploaded image
+
+        Returns:
+            Tuple of (image to send, preprocessing report). If the image
+            cannot be decoded or needs no changes, the same blob is returned.
+        """
+        report = {
+            "original_bytes": image.size,
+            "normalized_bytes": image.size,
+            "bytes_saved": 0,
+            "cpu_ms": 0.0,
+            "cached": False,
+        }
+        if not self.enabled:
+            return image, report
+
+        key = image.sha256
+        cached = self._cache.get(key)
+        if cached is not None:
+            self._cache.move_to_end(key)
+            self.cache_hits += 1
+            normalized, normalized_mime = cached
+            report.update(
+                normalized_bytes=len(normalized),
+                bytes_saved=image.size - len(normalized),
+                cached=True,
+            )
+            return image.with_data(normalized, normalized_mime), report
+
+        loop = asyncio.get_running_loop()
+        try:
+            normalized, normalized_mime, cpu_seconds = await loop.run_in_executor(
+                self._executor, self._normalize_timed, image.data
+            )
+        except Exception as e:
+            self.failures += 1
+            print(f"Error normalizing image: {e}")
+            return image, report
+
+        self.images += 1
+        self.bytes_in += image.size
+        self.bytes_out += len(normalized)
+        self.cpu_seconds += cpu_seconds
+        self._store(key, normalized, normalized_mime)
+
+        report.update(
+            normalized_bytes=len(normalized),
+            bytes_saved=image.size - len(normalized),
+            cpu_ms=round(cpu_seconds * 1000, 1),
+        )
+        return image.with_data(normalized, normalized_mime), report
+
+    def _normalize_timed(self, image_bytes: bytes) -> Tuple[bytes, str, float]:
+        """Run normalization in a worker thread, measuring that thread's CPU time."""
+        start = time.thread_time()
+        normalized, normalized_mime, _ = normalize_image_bytes(
+            image_bytes, self.max_dimension, self.output_format, self.quality
+        )
+        return normalized, normalized_mime, time.thread_time() - start
+
+    def _store(self, key: str, normalized: bytes, mime_type: str):
+        """Cache normalized bytes, evicting least recently used entries over the cap."""
+        if len(normalized) > self.cache_max_bytes:
+            return
+        # Concurrent misses for the same image both store it; count it once
+        previous = self._cache.pop(key, None)
+        if previous is not None:
+            self._cache_bytes -= len(previous[0])
+        self._cache[key] = (normalized, mime_type)
+        self._cache_bytes += len(normalized)
+        while self._cache_bytes > self.cache_max_bytes:
+            _, (evicted, _) = self._cache.popitem(last=False)
+            self._cache_bytes -= len(evicted)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get normalization statistics."""
+        return {
+            "enabled": self.enabled,
+            "max_dimension": self.max_dimension,
+            "output_format": self.output_format,
+            "images": self.images,
+            "cache_hits": self.cache_hits,
+            "failures": self.failures,
+            "bytes_in": self.bytes_in,
+            "bytes_out": self.bytes_out,
+            "bytes_saved": self.bytes_in - self.bytes_out,
+            "avg_cpu_ms": round(self.cpu_seconds / self.images * 1000, 1) if self.images else 0.0,
+            "cache_entries": len(self._cache),
+            "cache_bytes": self._cache_bytes,
+        }
+
+
+# Singleton image normalizer for vision uploads
+image_normalizer = ImageNormalizer(
+    enabled=settings.image_normalize_enabled,
+    max_dimension=settings.image_max_dimension,
+    output_format=settings.image_output_format,
+    quality=settings.image_output_quality,
+    max_workers=settings.image_normalize_workers,
+    cache_max_bytes=settings.image_normalize_cache_max_bytes,
+)
@@ -5,6 +5,7 @@ import time
 import google.generativeai as genai
 import openai
 from .multi_language_service import multi_language_service
+from ..core.gemini_runner import gemini_runner
 
 class RegionalAITeachingEngine:
     """Advanced AI teaching engine with regional language support"""
@@ -193,7 +194,7 @@ class RegionalAITeachingEngine:
             # Use Google Gemini if available
             if hasattr(self, 'gemini_model'):
                 prompt = self._create_regional_prompt(subject, topic, language, difficulty)
-                response = self.gemini_model.generate_content(prompt)
+                response = await gemini_runner.generate(self.gemini_model, prompt, priority="batch")
                 
                 return {
                     "provider": "Google Gemini",
@@ -287,7 +288,7 @@ class RegionalAITeachingEngine:
                 Provide a clear, educational answer in {language}. Use simple language and include examples if helpful.
                 """
                 
-                response = self.gemini_model.generate_content(prompt)
+                response = await gemini_runner.generate(self.gemini_model, prompt)
                 
                 return {
                     "success": True,
@@ -0,0 +1,228 @@
+import asyncio
+import hashlib
+import json
+import os
+import tempfile
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+
+class ResponseCache:
+    """
+    LRU cache for generated responses with TTL, a memory cap and an
+    optional on-disk tier.
+
+    Entries are evicted least-recently-used first when either the entry
+    count or the total size of cached text exceeds its limit. When a disk
+    directory is configured, entries are also written there as JSON files.
+    A memory miss falls back to disk, and a valid disk entry is moved back
+    into memory. Disk files are read and written in worker threads; an
+    in-memory index of their sizes, in least-recently-used order, drives
+    disk eviction.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        ttl_seconds: float,
+        max_entries: int,
+        max_bytes: int,
+        disk_dir: Optional[str] = None,
+        disk_max_bytes: int = 0,
+    ):
+        self.name = name
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.disk_max_bytes = disk_max_bytes
+        self._entries: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self._bytes = 0
+
+        self.disk_dir = Path(disk_dir) if disk_dir else None
+        # key -> file size, least recently used first
+        self._disk_index: "OrderedDict[str, int]" = OrderedDict()
+        self._disk_bytes = 0
+        if self.disk_dir:
+            self.disk_dir.mkdir(parents=True, exist_ok=True)
+            files = [(path.stem, path.stat()) for path in self.disk_dir.glob("*.json")]
+            for key, stat in sorted(files, key=lambda item: item[1].st_mtime):
+                self._disk_index[key] = stat.st_size
+            self._disk_bytes = sum(self._disk_index.values())
+
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    @staticmethod
+    def make_key(*parts: Any) -> str:
+        """Build a stable cache key from JSON-serializable parts."""
+        payload = json.dumps(parts, sort_keys=True, ensure_ascii=False, default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    async def get(self, key: str) -> Optional[str]:
+        """Get a cached value, or None on a miss or expired entry."""
+        entry = self._entries.get(key)
+        if entry:
+            expires_at, value = entry
+            if expires_at > time.time():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return value
+            self._remove(key)
+            self.expirations += 1
+
+        if self.disk_dir and key in self._disk_index:
+            self._disk_index.move_to_end(key)
+            value, expires_at, expired = await asyncio.to_thread(self._read_disk, key)
+            if value is not None:
+                self._store(key, value, expires_at)
+                self.disk_hits += 1
+                return value
+            # Expired or unreadable; _read_disk deleted the file
+            self._disk_bytes -= self._disk_index.pop(key, 0)
+            if expired:
+                self.expirations += 1
+
+        self.misses += 1
+        return None
+
+    async def set(self, key: str, value: str):
+        """Cache a value under the given key."""
+        expires_at = time.time() + self.ttl_seconds
+        self._store(key, value, expires_at)
+        if not self.disk_dir:
+            return
+
+        size = await asyncio.to_thread(self._write_disk, key, value, expires_at)
+        if size is None:
+            return
+        self._disk_bytes += size - self._disk_index.pop(key, 0)
+        self._disk_index[key] = size
+
+        evicted: List[str] = []
+        while self.disk_max_bytes and self._disk_bytes > self.disk_max_bytes and self._disk_index:
+            old_key, old_size = self._disk_index.popitem(last=False)
+            self._disk_bytes -= old_size
+            evicted.append(old_key)
+            self.evictions += 1
+        if evicted:
+            await asyncio.to_thread(self._delete_disk, evicted)
+
+    async def clear(self):
+        """Remove every entry from memory and disk."""
+        self._entries.clear()
+        self._bytes = 0
+        if self.disk_dir:
+            self._disk_index.clear()
+            self._disk_bytes = 0
+            await asyncio.to_thread(self._delete_disk, [path.stem for path in self.disk_dir.glob("*.json")])
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get cache statistics."""
+        lookups = self.hits + self.disk_hits + self.misses
+        return {
+            "name": self.name,
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "max_entries": self.max_entries,
+            "max_bytes": self.max_bytes,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": round((self.hits + self.disk_hits) / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "disk_enabled": self.disk_dir is not None,
+            "disk_entries": len(self._disk_index),
+            "disk_bytes": self._disk_bytes,
+        }
+
+    def _store(self, key: str, value: str, expires_at: float):
+        """Insert into the memory tier and evict down to the limits."""
+        if key in self._entries:
+            self._remove(key)
+
+        size = len(value.encode("utf-8"))
+        if size > self.max_bytes:
+            return
+
+        self._entries[key] = (expires_at, value)
+        self._bytes += size
+
+        while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+            oldest_key = next(iter(self._entries))
+            self._remove(oldest_key)
+            self.evictions += 1
+
+    def _remove(self, key: str):
+        """Remove a key from the memory tier."""
+        _, value = self._entries.pop(key)
+        self._bytes -= len(value.encode("utf-8"))
+
+    def _path(self, key: str) -> Path:
+        return self.disk_dir / f"{key}.json"
+
+    def _read_disk(self, key: str) -> Tuple[Optional[str], float, bool]:
+        """
+        Read a non-expired entry from the disk tier (runs in a worker thread).
+
+        Returns:
+            Tuple of (value or None, expires_at, expired); expired and
+            unreadable files are deleted
+        """
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            expires_at = float(data["expires_at"])
+            value = data["value"]
+        except (OSError, ValueError, KeyError, TypeError):
+            path.unlink(missing_ok=True)
+            return None, 0.0, False
+
+        if expires_at <= time.time():
+            path.unlink(missing_ok=True)
+            return None, 0.0, True
+
+        try:
+            os.utime(path)  # keep LRU order across restarts
+        except OSError:
+            pass
+        return value, expires_at, False
+
+    def _write_disk(self, key: str, value: str, expires_at: float) -> Optional[int]:
+        """
+        Write an entry to the disk tier (runs in a worker thread).
+
+        Returns:
+            The file size, or None if it could not be written
+        """
+        # Write to a temp file and rename, so readers never see a partial entry
+        try:
+            fd, temp_path = tempfile.mkstemp(dir=self.disk_dir, suffix=".tmp")
+        except OSError as e:
+            print(f"Error writing {self.name} cache entry: {e}")
+            return None
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump({"expires_at": expires_at, "value": value}, f, ensure_ascii=False)
+            size = os.path.getsize(temp_path)
+            os.replace(temp_path, self._path(key))
+        except OSError as e:
+            print(f"Error writing {self.name} cache entry: {e}")
+            Path(temp_path).unlink(missing_ok=True)
+            return None
+        return size
+
+    def _delete_disk(self, keys: List[str]):
+        """Delete disk entries (runs in a worker thread)."""
+        for key in keys:
+            try:
+                self._path(key).unlink()
+            except OSError:
+                pass
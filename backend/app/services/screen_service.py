@@ -1,6 +1,14 @@
-import base64
-from ..core.gemini_client import gemini_client
+import asyncio
+import hashlib
+from typing import Any, AsyncIterator, List, Optional, Tuple
+from ..core.gemini_runner import gemini_runner
+from ..core.media import MediaBlob
+from ..core.model_registry import model_registry
+from ..core.single_flight import single_flight
 from ..core.config import settings
+from .frame_dedupe import dhash_image, frame_deduplicator
+from .frame_diff import changed_region, crop_frame, decode_thumbnail, region_area
+from .upload_service import sniff_image_mime_type
 
 
 def get_screen_tutor_prompt(language: str) -> str:
@@ -19,36 +27,179 @@ IMPORTANT RULES:
 Remember: Your entire response must be in {language}."""
 
 
-async def analyze_screen_frame(frame_base64: str, language: str) -> str:
+model_registry.register_persona("screen_tutor", get_screen_tutor_prompt)
+
+
+def decode_screen_frame(frame_base64: str) -> MediaBlob:
+    """
+    Decode a base64 (or data URL) screen frame once, at the API edge.
+    
+    Raises:
+        ValueError: If the frame is not valid base64
+    """
+    try:
+        frame = MediaBlob.from_base64(frame_base64)
+    except ValueError:
+        raise ValueError("Invalid frame data. Must be base64 encoded image.")
+    
+    mime_type = sniff_image_mime_type(frame.data) or "image/jpeg"
+    return frame.with_data(frame.data, mime_type)
+
+
+def _fingerprint_frame(frame_bytes: bytes) -> Tuple[Optional[Any], Optional[int]]:
+    """Decode a frame once into a grayscale thumbnail and its perceptual hash."""
+    thumbnail = decode_thumbnail(frame_bytes, settings.screen_diff_width)
+    if thumbnail is None:
+        return None, None
+    return thumbnail, dhash_image(thumbnail, frame_deduplicator.hash_size)
+
+
+def _crop_changed_region(frame_bytes: bytes, previous: Any, current: Any) -> Optional[bytes]:
+    """Crop the area that changed since the previous frame, unless most of the screen changed."""
+    region = changed_region(previous, current, settings.screen_diff_threshold)
+    if region is None or region_area(region) > settings.screen_crop_max_area:
+        return None
+    return crop_frame(frame_bytes, region, settings.screen_crop_margin)
+
+
+async def analyze_screen_image(
+    frame: MediaBlob,
+    language: str,
+    session_id: Optional[str] = None,
+) -> Tuple[str, bool]:
     """
     Analyze a screen capture frame using Gemini Vision API.
     
+    When a session ID is given and the frame is perceptually identical to
+    the session's last analyzed frame, that analysis is returned without
+    calling the model. When only part of the screen changed, just that
+    region is sent, with the last full-screen analysis as context.
+    
     Args:
-        frame_base64: Base64 encoded image of screen frame
+        frame: Encoded screen frame (JPEG, WebP or PNG)
         language: Target response language
+        session_id: Optional screen-share session ID used for deduplication
         
     Returns:
-        AI-generated analysis in specified language
+        Tuple of (AI-generated analysis in specified language, skipped)
     """
+    thumbnail = frame_hash = None
+    if session_id and frame_deduplicator.enabled:
+        # Decoding is CPU-bound; keep it off the event loop
+        thumbnail, frame_hash = await asyncio.to_thread(_fingerprint_frame, frame.data)
+        if frame_hash is not None:
+            cached = frame_deduplicator.find_duplicate(session_id, language, frame_hash)
+            if cached is not None:
+                return cached, True
+    
     # Create vision request with Gemini
-    model = gemini_client.GenerativeModel(settings.gemini_vision_model)
+    model = model_registry.get_model(settings.gemini_vision_model, language, "screen_tutor")
+    
+    prompt = f"This is a capture of my screen. Please analyze what you see and help me understand it. Explain in {language}."
+    image = frame
+    cropped = False
+    
+    reference = frame_deduplicator.get_reference(session_id, language) if thumbnail is not None else None
+    if settings.screen_crop_enabled and reference is not None and reference.thumbnail is not None:
+        crop = await asyncio.to_thread(_crop_changed_region, frame.data, reference.thumbnail, thumbnail)
+        if crop is not None:
+            frame_deduplicator.record_crop(frame.size, len(crop))
+            previous_analysis = reference.analysis[:settings.screen_crop_context_chars]
+            prompt = (
+                "This is the region of my screen that changed since your last analysis "
+                "(a crop, not the whole screen).\n\n"
+                f"Your previous analysis of my screen:\n{previous_analysis}\n\n"
+                f"Explain what changed and help me understand it. Explain in {language}."
+            )
+            image = MediaBlob(crop, "image/jpeg")
+            cropped = True
     
     # Prepare the content with screen frame
-    content = [
-        get_screen_tutor_prompt(language),
-        f"This is a capture of my screen. Please analyze what you see and help me understand it. Explain in {language}.",
-        {
-            "mime_type": "image/jpeg",
-            "data": frame_base64
-        }
-    ]
-    
-    response = model.generate_content(
+    content = [prompt, image.to_part()]
+    
+    async def generate() -> str:
+        response = await gemini_runner.generate(
+            model,
+            content,
+            generation_config={
+                "max_output_tokens": 2000,
+                "temperature": 0.7,
+            },
+            priority="screen",
+        )
+        return response.text
+    
+    # Identical requests already in flight (e.g. a projected screen) share one call
+    frame_key = hashlib.sha256(f"{language}\n{prompt}\n{image.sha256}".encode("utf-8")).hexdigest()
+    response_text = await single_flight.run("screen", frame_key, generate)
+    
+    if response_text and frame_hash is not None:
+        if cropped:
+            # Duplicates get this answer; crops keep the full-screen analysis as context
+            frame_deduplicator.advance(session_id, frame_hash, response_text, thumbnail)
+        else:
+            frame_deduplicator.remember(session_id, language, frame_hash, response_text, thumbnail)
+    
+    return response_text or "Unable to analyze screen.", False
+
+
+def fingerprint_frame(frame: MediaBlob) -> Tuple[Optional[Any], Optional[int]]:
+    """Thumbnail and perceptual hash of a frame (None, None without Pillow)."""
+    return _fingerprint_frame(frame.data)
+
+
+async def stream_screen_window_summary(
+    frames: List[Tuple[MediaBlob, float]],
+    language: str,
+    window_seconds: float,
+    previous_summary: Optional[str] = None,
+) -> AsyncIterator[str]:
+    """
+    Summarize a window of distinct screen frames in one multi-image request.
+    
+    Args:
+        frames: (frame, seconds since the window opened) in capture order
+        language: Target response language
+        window_seconds: Length of the window the frames were collected in
+        previous_summary: Summary of the previous window, for continuity
+        
+    Yields:
+        Text chunks of the summary in the order they are generated
+    """
+    model = model_registry.get_model(settings.gemini_vision_model, language, "screen_tutor")
+    
+    intro = (
+        f"These are {len(frames)} captures of my screen from the last {window_seconds:g} seconds, "
+        "in order. Only captures where the screen visibly changed are included."
+    )
+    if previous_summary:
+        intro += (
+            "\n\nYour summary of the window before these captures:\n"
+            f"{previous_summary[:settings.screen_window_context_chars]}"
+        )
+    
+    content: List[Any] = [intro]
+    for index, (frame, offset) in enumerate(frames, start=1):
+        content.append(f"Capture {index} (+{offset:.1f}s):")
+        content.append(frame.to_part())
+    content.append(
+        "Summarize what I did across these captures, point out anything that went wrong "
+        f"(errors, failed commands), and suggest next steps. Explain in {language}."
+    )
+    
+    async for chunk in gemini_runner.stream(
+        model,
         content,
         generation_config={
             "max_output_tokens": 2000,
             "temperature": 0.7,
-        }
-    )
-    
-    return response.text or "Unable to analyze screen."
+        },
+        priority="screen",
+    ):
+        try:
+            text = chunk.text
+        except ValueError:
+            # Chunks without text parts (e.g. finish or safety metadata)
+            continue
+        if text:
+            yield text
@@ -0,0 +1,371 @@
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+from ..core.admission import LLMOverloadedError
+from ..core.config import settings
+from ..core.media import MediaBlob
+from .capture_rate import capture_rate_advisor
+from .frame_dedupe import frame_deduplicator, hamming_distance
+from .screen_service import analyze_screen_image, fingerprint_frame, stream_screen_window_summary
+
+
+class ScreenStreamSession:
+    """
+    Latest-frame-wins scheduler for one screen-share WebSocket.
+
+    At most one analysis runs at a time and at most one frame waits behind
+    it. A frame arriving while another is waiting replaces it, so a slow
+    analysis never builds a backlog of stale frames.
+    """
+
+    def __init__(
+        self,
+        session_id: str,
+        language: str,
+        notify: Callable[[Dict[str, Any]], Awaitable[None]],
+    ):
+        self.session_id = session_id
+        self.language = language
+        self.notify = notify
+        self.capture_interval_ms: Optional[int] = None  # client's interval, scaled into next_capture_ms
+        self.pending: Optional[Tuple[int, MediaBlob, float]] = None  # (frame_id, frame, received_at)
+        self.next_frame_id = 0
+        self.frames_received = 0
+        self.frames_dropped = 0
+        self.frames_analyzed = 0
+        self.frames_skipped = 0
+        self.closed = False
+        self._wakeup = asyncio.Event()
+        self._worker: Optional[asyncio.Task] = None
+
+    def start(self):
+        """Start the analysis worker."""
+        self._worker = asyncio.create_task(self._run())
+
+    def submit(self, frame: MediaBlob) -> int:
+        """
+        Queue a frame for analysis, replacing any frame still waiting.
+
+        Returns:
+            The frame's ID, echoed back in its analysis message
+        """
+        if self.pending is not None:
+            self.frames_dropped += 1
+
+        frame_id = self.next_frame_id
+        self.next_frame_id += 1
+        self.frames_received += 1
+        self.pending = (frame_id, frame, time.perf_counter())
+        self._wakeup.set()
+        return frame_id
+
+    async def close(self):
+        """Stop the worker and discard any waiting frame."""
+        self.closed = True
+        self.pending = None
+        if self._worker and not self._worker.done():
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+
+    async def _send(self, message: Dict[str, Any]):
+        """Send a message to the client, ignoring a socket that has gone away."""
+        try:
+            await self.notify(message)
+        except Exception as e:
+            print(f"Error sending screen analysis for {self.session_id}: {e}")
+
+    async def _run(self):
+        while True:
+            await self._wakeup.wait()
+            self._wakeup.clear()
+            if self.pending is None:
+                continue
+
+            frame_id, frame, received_at = self.pending
+            self.pending = None
+            started_at = time.perf_counter()
+
+            try:
+                response_text, skipped = await analyze_screen_image(
+                    frame, self.language, session_id=self.session_id
+                )
+            except asyncio.CancelledError:
+                raise
+            except LLMOverloadedError as e:
+                await self._send({
+                    "type": "error",
+                    "frame_id": frame_id,
+                    "message": f"AI service is busy, please retry shortly: {str(e)}",
+                })
+                continue
+            except Exception as e:
+                await self._send({
+                    "type": "error",
+                    "frame_id": frame_id,
+                    "message": f"Error analyzing screen: {str(e)}",
+                })
+                continue
+
+            if skipped:
+                self.frames_skipped += 1
+            else:
+                self.frames_analyzed += 1
+            if frame_deduplicator.enabled:
+                capture_rate_advisor.record(self.session_id, changed=not skipped)
+
+            await self._send({
+                "type": "analysis",
+                "frame_id": frame_id,
+                "response": response_text,
+                "language": self.language,
+                "skipped": skipped,
+                "queued_ms": round((started_at - received_at) * 1000, 1),
+                "analysis_ms": round((time.perf_counter() - started_at) * 1000, 1),
+                "frames_dropped": self.frames_dropped,
+                "next_capture_ms": self.recommend_interval(),
+            })
+
+    def recommend_interval(self) -> int:
+        """Recommended delay before the client's next frame, counting a frame still waiting."""
+        return capture_rate_advisor.recommend(
+            self.session_id, self.capture_interval_ms, queue_depth=int(self.pending is not None)
+        )
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get per-session frame counters."""
+        return {
+            "frames_received": self.frames_received,
+            "frames_dropped": self.frames_dropped,
+            "frames_analyzed": self.frames_analyzed,
+            "frames_skipped": self.frames_skipped,
+            "model_calls": self.frames_analyzed,
+        }
+
+
+class WindowedScreenSession(ScreenStreamSession):
+    """
+    Windowed scheduler: one summary call per window of screen activity.
+
+    Incoming frames are fingerprinted and kept only if they visibly differ
+    from the last kept frame. The first kept frame opens a window; when it
+    has been open `window_seconds`, its frames are sent as one multi-image
+    request and the summary is streamed back while the next window fills.
+    A static screen opens no window and costs no model calls.
+    """
+
+    def __init__(
+        self,
+        session_id: str,
+        language: str,
+        notify: Callable[[Dict[str, Any]], Awaitable[None]],
+        window_seconds: float,
+        max_frames: int,
+    ):
+        super().__init__(session_id, language, notify)
+        self.window_seconds = window_seconds
+        self.max_frames = max_frames
+        self.window: List[Tuple[MediaBlob, float]] = []  # (frame, seconds since the window opened)
+        self.window_started: Optional[float] = None
+        self.last_hash: Optional[int] = None
+        self.last_summary: Optional[str] = None
+        self.windows_summarized = 0
+        self._window_opened = asyncio.Event()
+        self._flusher: Optional[asyncio.Task] = None
+
+    def start(self):
+        """Start the frame collector and the window flusher."""
+        super().start()
+        self._flusher = asyncio.create_task(self._flush_windows())
+
+    async def close(self):
+        """Stop both tasks and discard the open window."""
+        await super().close()
+        self.window = []
+        if self._flusher and not self._flusher.done():
+            self._flusher.cancel()
+            try:
+                await self._flusher
+            except asyncio.CancelledError:
+                pass
+
+    async def _run(self):
+        while True:
+            await self._wakeup.wait()
+            self._wakeup.clear()
+            if self.pending is None:
+                continue
+
+            _, frame, received_at = self.pending
+            self.pending = None
+
+            # Decoding is CPU-bound; keep it off the event loop
+            _, frame_hash = await asyncio.to_thread(fingerprint_frame, frame)
+            unchanged = (
+                frame_hash is not None
+                and self.last_hash is not None
+                and hamming_distance(frame_hash, self.last_hash) <= frame_deduplicator.max_distance
+            )
+            if frame_hash is not None:
+                capture_rate_advisor.record(self.session_id, changed=not unchanged)
+            if unchanged:
+                self.frames_skipped += 1
+                continue
+            self.last_hash = frame_hash
+
+            if self.window_started is None:
+                self.window_started = received_at
+                self._window_opened.set()
+            entry = (frame, received_at - self.window_started)
+            if len(self.window) < self.max_frames:
+                self.window.append(entry)
+            else:
+                # Keep how the window started and where it ended up
+                self.window[-1] = entry
+                self.frames_dropped += 1
+
+    async def _flush_windows(self):
+        while True:
+            await self._window_opened.wait()
+            remaining = self.window_started + self.window_seconds - time.perf_counter()
+            if remaining > 0:
+                await asyncio.sleep(remaining)
+
+            frames, window_started = self.window, self.window_started
+            self.window, self.window_started = [], None
+            self._window_opened.clear()
+            if frames:
+                await self._summarize(frames, window_started)
+
+    async def _summarize(self, frames: List[Tuple[MediaBlob, float]], window_started: float):
+        """Stream one window's summary to the client; the next window keeps filling meanwhile."""
+        window_id = self.windows_summarized
+        self.windows_summarized += 1
+        self.frames_analyzed += len(frames)
+        started_at = time.perf_counter()
+
+        await self._send({
+            "type": "summary_start",
+            "window_id": window_id,
+            "frames": len(frames),
+            "window_ms": round((started_at - window_started) * 1000, 1),
+        })
+
+        parts = []
+        try:
+            async for text in stream_screen_window_summary(
+                frames, self.language, self.window_seconds, self.last_summary
+            ):
+                parts.append(text)
+                await self._send({"type": "summary_chunk", "window_id": window_id, "text": text})
+        except asyncio.CancelledError:
+            raise
+        except LLMOverloadedError as e:
+            await self._send({
+                "type": "error",
+                "window_id": window_id,
+                "message": f"AI service is busy, please retry shortly: {str(e)}",
+            })
+            return
+        except Exception as e:
+            await self._send({
+                "type": "error",
+                "window_id": window_id,
+                "message": f"Error summarizing screen activity: {str(e)}",
+            })
+            return
+
+        summary = "".join(parts) or "Unable to summarize screen activity."
+        if parts:
+            self.last_summary = summary
+        await self._send({
+            "type": "summary",
+            "window_id": window_id,
+            "response": summary,
+            "language": self.language,
+            "frames": len(frames),
+            "analysis_ms": round((time.perf_counter() - started_at) * 1000, 1),
+            "frames_skipped": self.frames_skipped,
+            "next_capture_ms": self.recommend_interval(),
+        })
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get per-session frame counters; each window is one model call."""
+        return {**super().get_stats(), "model_calls": self.windows_summarized}
+
+
+class ScreenStreamManager:
+    """Tracks active screen-stream sessions and their frame counters."""
+
+    def __init__(self):
+        self._sessions: Dict[str, ScreenStreamSession] = {}
+        self._closed_totals = {
+            "frames_received": 0,
+            "frames_dropped": 0,
+            "frames_analyzed": 0,
+            "frames_skipped": 0,
+            "model_calls": 0,
+        }
+
+    def open(
+        self,
+        session_id: str,
+        language: str,
+        notify: Callable[[Dict[str, Any]], Awaitable[None]],
+        mode: str = "latest",
+        window_seconds: Optional[float] = None,
+    ) -> ScreenStreamSession:
+        """
+        Create and start a scheduler for a newly connected socket.
+
+        Args:
+            session_id: Screen-share session ID
+            language: Response language
+            notify: Sends a message to the client
+            mode: "latest" (analyze the newest frame) or "window" (summarize
+                each window of activity in one call)
+            window_seconds: Window length for "window" mode (clamped to the
+                configured maximum)
+        """
+        if mode == "window":
+            window_seconds = min(
+                max(window_seconds or settings.screen_window_seconds, 1.0),
+                settings.screen_window_max_seconds,
+            )
+            session = WindowedScreenSession(
+                session_id, language, notify, window_seconds, settings.screen_window_max_frames
+            )
+        else:
+            session = ScreenStreamSession(session_id, language, notify)
+        session.start()
+        previous = self._sessions.get(session_id)
+        if previous is not None:
+            # A reconnect replaces the old socket's scheduler
+            asyncio.create_task(self.close(previous))
+        self._sessions[session_id] = session
+        return session
+
+    async def close(self, session: ScreenStreamSession):
+        """Stop a session's scheduler and fold its counters into the totals."""
+        if session.closed:
+            return
+        await session.close()
+        if self._sessions.get(session.session_id) is session:
+            del self._sessions[session.session_id]
+        for name, value in session.get_stats().items():
+            self._closed_totals[name] += value
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get frame counters across all screen-stream sessions."""
+        totals = dict(self._closed_totals)
+        for session in self._sessions.values():
+            for name, value in session.get_stats().items():
+                totals[name] += value
+        windowed = sum(isinstance(session, WindowedScreenSession) for session in self._sessions.values())
+        return {"active_sessions": len(self._sessions), "windowed_sessions": windowed, **totals}
+
+
+# Singleton screen-stream manager
+screen_stream_manager = ScreenStreamManager()
@@ -0,0 +1,130 @@
+import asyncio
+import re
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+from .chat_service import chat_respond_stream
+from .heygen_live_service import heygen_live_service
+
+
+# Sentence terminators for Latin, CJK and Indic scripts, followed by whitespace
+# or end of buffer, plus line breaks (list items and paragraphs).
+SENTENCE_BOUNDARY = re.compile(r"(?<=[.!?。！？।॥])\s+|(?<=[。！？])|\n+")
+
+
+class SentenceSplitter:
+    """Incrementally cuts streamed text into speakable sentences."""
+
+    def __init__(self, min_chars: int = 20):
+        self.min_chars = min_chars
+        self.buffer = ""
+
+    def feed(self, text: str) -> List[str]:
+        """
+        Add streamed text and return any sentences that are now complete.
+
+        Fragments shorter than min_chars (e.g. "1." in a numbered list) are
+        kept and joined with the next sentence so the avatar does not speak
+        in tiny bursts.
+        """
+        self.buffer += text
+        sentences = []
+
+        while True:
+            match = None
+            for candidate in SENTENCE_BOUNDARY.finditer(self.buffer):
+                if len(self.buffer[:candidate.start()].strip()) >= self.min_chars:
+                    match = candidate
+                    break
+
+            if not match:
+                break
+
+            sentence = self.buffer[:match.start()].strip()
+            self.buffer = self.buffer[match.end():]
+            sentences.append(sentence)
+
+        return sentences
+
+    def flush(self) -> Optional[str]:
+        """Return whatever text is left once the stream has ended."""
+        remainder = self.buffer.strip()
+        self.buffer = ""
+        return remainder or None
+
+
+async def speak_chat_response(
+    session_id: str,
+    message: str,
+    language: str,
+    context: Optional[str],
+    notify: Callable[[Dict[str, Any]], Awaitable[None]],
+    conversation_id: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    Stream a tutor answer and send it to the avatar sentence by sentence.
+
+    Sentences are pushed to heygen_live_service.send_text from a separate
+    task, so the avatar starts speaking while the rest of the answer is
+    still being generated.
+
+    Args:
+        session_id: LiveAvatar session ID
+        message: User's message
+        language: Target response language
+        context: Optional previous context
+        notify: Coroutine called with each message for the client WebSocket
+        conversation_id: Optional server-held conversation to continue
+
+    Returns:
+        Summary with the full response and latency measurements
+    """
+    start = time.perf_counter()
+    splitter = SentenceSplitter()
+    queue: asyncio.Queue = asyncio.Queue()
+    timings: Dict[str, Optional[float]] = {"first_sentence_ms": None}
+    sentences: List[str] = []
+
+    async def speaker():
+        index = 0
+        while True:
+            sentence = await queue.get()
+            if sentence is None:
+                break
+
+            if timings["first_sentence_ms"] is None:
+                timings["first_sentence_ms"] = round((time.perf_counter() - start) * 1000, 1)
+
+            success, response_message = await heygen_live_service.send_text(session_id, sentence)
+            await notify({
+                "type": "speak_sentence",
+                "index": index,
+                "text": sentence,
+                "success": success,
+                "message": response_message,
+            })
+            index += 1
+
+    speaker_task = asyncio.create_task(speaker())
+    try:
+        async for text in chat_respond_stream(message, language, context, conversation_id=conversation_id):
+            for sentence in splitter.feed(text):
+                sentences.append(sentence)
+                queue.put_nowait(sentence)
+
+        remainder = splitter.flush()
+        if remainder:
+            sentences.append(remainder)
+            queue.put_nowait(remainder)
+
+        queue.put_nowait(None)
+        await speaker_task
+    except BaseException:
+        speaker_task.cancel()
+        raise
+
+    return {
+        "response": " ".join(sentences),
+        "sentences": len(sentences),
+        "first_sentence_ms": timings["first_sentence_ms"],
+        "total_ms": round((time.perf_counter() - start) * 1000, 1),
+    }
@@ -0,0 +1,652 @@
+import base64
+import binascii
+import hashlib
+import json
+import re
+import tempfile
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+from fastapi import Request
+from multipart.multipart import MultipartParseError, MultipartParser, parse_options_header
+
+
+# Bytes needed to identify every supported image format
+SNIFF_BYTES = 12
+
+# Non-file form fields are small (language, options); cap them
+MAX_FIELD_BYTES = 64 * 1024
+
+# Allowance for multipart boundaries and part headers over the file limit
+MULTIPART_OVERHEAD_BYTES = 64 * 1024
+
+# Longest accepted "data:<mime>;base64," prefix on a base64 payload
+MAX_DATA_URL_HEADER_BYTES = 256
+
+# Characters that end or escape a JSON string
+_JSON_STRING_SPECIAL = re.compile(rb'["\\]')
+
+
+class UploadError(Exception):
+    """Raised when an upload is malformed or not an accepted file type."""
+
+    status_code = 400
+
+
+class UploadTooLargeError(UploadError):
+    """Raised as soon as an upload exceeds its size limit."""
+
+    status_code = 413
+
+
+def sniff_image_mime_type(data: bytes) -> Optional[str]:
+    """Identify an image format from its magic bytes."""
+    if data.startswith(b"\xff\xd8\xff"):
+        return "image/jpeg"
+    if data.startswith(b"\x89PNG\r\n\x1a\n"):
+        return "image/png"
+    if data[:6] in (b"GIF87a", b"GIF89a"):
+        return "image/gif"
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+        return "image/webp"
+    return None
+
+
+class StreamedUpload:
+    """
+    A file received from a streamed body (multipart, or base64 in JSON).
+
+    Content is written to a spooled temp file (in memory up to
+    `spool_max_bytes`, then on disk) and hashed as it arrives.
+    """
+
+    def __init__(self, spool_max_bytes: int):
+        self.file = tempfile.SpooledTemporaryFile(max_size=spool_max_bytes)
+        self.filename: Optional[str] = None
+        self.declared_type: Optional[str] = None
+        self.mime_type: Optional[str] = None  # sniffed from the content (images) or declared
+        self.size = 0
+        self.sha256: Optional[str] = None
+        self.head = b""  # first bytes, for type sniffing
+        self.error: Optional[str] = None  # set when the file was rejected (batch uploads)
+        self._hash = hashlib.sha256()
+
+    def write(self, data: bytes):
+        self.file.write(data)
+        self._hash.update(data)
+        self.size += len(data)
+        if len(self.head) < SNIFF_BYTES:
+            self.head += data[:SNIFF_BYTES - len(self.head)]
+
+    def finish(self):
+        if self.error:
+            return
+        self.sha256 = self._hash.hexdigest()
+        self.file.seek(0)
+
+    def fail(self, message: str):
+        """Reject this file and discard what was received of it."""
+        self.error = message
+        self.sha256 = None
+        self.file.close()
+
+    def read(self) -> bytes:
+        """Read the whole upload (bounded by the size limit)."""
+        self.file.seek(0)
+        return self.file.read()
+
+    def close(self):
+        self.file.close()
+
+
+async def receive_image_upload(
+    request: Request,
+    max_bytes: int,
+    allowed_mime_types: Iterable[str],
+    file_field: str = "file",
+    spool_max_bytes: int = 1024 * 1024,
+) -> Tuple[StreamedUpload, Dict[str, str]]:
+    """
+    Stream a multipart image upload without buffering the whole body.
+
+    The size limit is enforced while bytes arrive, the image type is sniffed
+    from the first bytes of the file, and the content is hashed incrementally.
+
+    Args:
+        request: Incoming multipart/form-data request
+        max_bytes: Maximum file size
+        allowed_mime_types: Accepted (sniffed) image types
+        file_field: Name of the file field
+        spool_max_bytes: File size kept in memory before spilling to disk
+
+    Returns:
+        Tuple of (upload, other form fields)
+
+    Raises:
+        UploadTooLargeError: As soon as the file exceeds max_bytes
+        UploadError: If the body is malformed, the file is missing or not an
+            accepted image type
+    """
+    uploads, fields = await _receive_multipart(
+        request,
+        max_bytes=max_bytes,
+        max_total_bytes=max_bytes,
+        allowed_mime_types=allowed_mime_types,
+        file_field=file_field,
+        max_files=1,
+        per_file_errors=False,
+        spool_max_bytes=spool_max_bytes,
+    )
+    return uploads[0], fields
+
+
+async def receive_image_uploads(
+    request: Request,
+    max_bytes: int,
+    max_total_bytes: int,
+    allowed_mime_types: Iterable[str],
+    max_files: int,
+    file_field: str = "files",
+    spool_max_bytes: int = 1024 * 1024,
+) -> Tuple[List[StreamedUpload], Dict[str, str]]:
+    """
+    Stream a multipart upload of several images.
+
+    A file that is too large or not an accepted image type does not fail
+    the request: its content is discarded and `upload.error` says why.
+
+    Args:
+        request: Incoming multipart/form-data request
+        max_bytes: Maximum size of each file
+        max_total_bytes: Maximum size of all files together
+        allowed_mime_types: Accepted (sniffed) image types
+        max_files: Maximum number of files
+        file_field: Name of the (repeated) file field
+        spool_max_bytes: Size of each file kept in memory before spilling to disk
+
+    Returns:
+        Tuple of (uploads in request order, other form fields)
+
+    Raises:
+        UploadTooLargeError: As soon as all files together exceed max_total_bytes
+        UploadError: If the body is malformed, has no files or too many
+    """
+    return await _receive_multipart(
+        request,
+        max_bytes=max_bytes,
+        max_total_bytes=max_total_bytes,
+        allowed_mime_types=allowed_mime_types,
+        file_field=file_field,
+        max_files=max_files,
+        per_file_errors=True,
+        spool_max_bytes=spool_max_bytes,
+    )
+
+
+async def receive_file_upload(
+    request: Request,
+    max_bytes: int,
+    file_field: str = "file",
+    spool_max_bytes: int = 1024 * 1024,
+) -> Tuple[StreamedUpload, Dict[str, str]]:
+    """
+    Stream a multipart upload of a file of any type (documents, images).
+
+    Like receive_image_upload, but the file's MIME type is the one declared
+    in its part headers ("application/octet-stream" if missing).
+
+    Args:
+        request: Incoming multipart/form-data request
+        max_bytes: Maximum file size
+        file_field: Name of the file field
+        spool_max_bytes: File size kept in memory before spilling to disk
+
+    Returns:
+        Tuple of (upload, other form fields)
+
+    Raises:
+        UploadTooLargeError: As soon as the file exceeds max_bytes
+        UploadError: If the body is malformed or the file is missing
+    """
+    uploads, fields = await _receive_multipart(
+        request,
+        max_bytes=max_bytes,
+        max_total_bytes=max_bytes,
+        allowed_mime_types=None,
+        file_field=file_field,
+        max_files=1,
+        per_file_errors=False,
+        spool_max_bytes=spool_max_bytes,
+    )
+    return uploads[0], fields
+
+
+async def _receive_multipart(
+    request: Request,
+    max_bytes: int,
+    max_total_bytes: int,
+    allowed_mime_types: Optional[Iterable[str]],
+    file_field: str,
+    max_files: int,
+    per_file_errors: bool,
+    spool_max_bytes: int,
+) -> Tuple[List[StreamedUpload], Dict[str, str]]:
+    """
+    Parse a streamed multipart body (see receive_image_upload and receive_image_uploads).
+
+    With allowed_mime_types=None any file is accepted and its MIME type is
+    the declared one; otherwise the type is sniffed as an image.
+    """
+    content_type, params = parse_options_header(request.headers.get("content-type", ""))
+    if content_type != b"multipart/form-data" or b"boundary" not in params:
+        raise UploadError("Expected a multipart/form-data upload")
+
+    sniff = allowed_mime_types is not None
+    allowed = set(allowed_mime_types or ())
+    invalid_type = f"Invalid file type. Allowed: {', '.join(sorted(allowed))}"
+    file_too_large = f"File too large. Maximum size is {max_bytes // (1024 * 1024)}MB."
+    upload_too_large = (
+        file_too_large if max_files == 1
+        else f"Upload too large. Maximum total size is {max_total_bytes // (1024 * 1024)}MB."
+    )
+
+    content_length = request.headers.get("content-length")
+    overhead = MULTIPART_OVERHEAD_BYTES * max_files
+    if content_length and content_length.isdigit() and int(content_length) > max_total_bytes + overhead:
+        raise UploadTooLargeError(upload_too_large)
+    uploads: List[StreamedUpload] = []
+    total_bytes = 0
+    fields: Dict[str, str] = {}
+    events: List[Tuple[str, bytes]] = []
+
+    def reject(upload: StreamedUpload, message: str, error_type=UploadError):
+        """Fail the request, or in batch mode just this file."""
+        if not per_file_errors:
+            raise error_type(message)
+        upload.fail(message)
+
+    def on_header_field(data: bytes, start: int, end: int):
+        events.append(("header_field", data[start:end]))
+
+    def on_header_value(data: bytes, start: int, end: int):
+        events.append(("header_value", data[start:end]))
+
+    def on_part_data(data: bytes, start: int, end: int):
+        events.append(("part_data", data[start:end]))
+
+    callbacks = {
+        "on_part_begin": lambda: events.append(("part_begin", b"")),
+        "on_header_field": on_header_field,
+        "on_header_value": on_header_value,
+        "on_headers_finished": lambda: events.append(("headers_finished", b"")),
+        "on_part_data": on_part_data,
+        "on_part_end": lambda: events.append(("part_end", b"")),
+    }
+    parser = MultipartParser(params[b"boundary"], callbacks)
+
+    header_field = b""
+    headers: Dict[bytes, bytes] = {}
+    part_name: Optional[str] = None
+    part_value = b""
+    current_file: Optional[StreamedUpload] = None
+
+    try:
+        async for chunk in request.stream():
+            parser.write(chunk)
+
+            for event, data in events:
+                if event == "part_begin":
+                    headers = {}
+                    part_name, part_value, current_file = None, b"", None
+                elif event == "header_field":
+                    header_field = data.lower()
+                elif event == "header_value":
+                    headers[header_field] = headers.get(header_field, b"") + data
+                elif event == "headers_finished":
+                    _, options = parse_options_header(headers.get(b"content-disposition", b""))
+                    part_name = options.get(b"name", b"").decode("latin-1")
+                    if part_name == file_field and b"filename" in options:
+                        if len(uploads) >= max_files:
+                            raise UploadError(
+                                "Only one file can be uploaded" if max_files == 1
+                                else f"Too many files. Maximum is {max_files}."
+                            )
+                        current_file = StreamedUpload(spool_max_bytes)
+                        uploads.append(current_file)
+                        current_file.filename = options[b"filename"].decode("utf-8", "replace")
+                        current_file.declared_type = headers.get(b"content-type", b"").decode("latin-1") or None
+                        if not sniff:
+                            current_file.mime_type = current_file.declared_type or "application/octet-stream"
+                elif event == "part_data":
+                    if current_file is not None:
+                        if not current_file.error and current_file.size + len(data) > max_bytes:
+                            reject(current_file, file_too_large, UploadTooLargeError)
+                        # Rejected files still count towards the request limit
+                        total_bytes += len(data)
+                        if total_bytes > max_total_bytes:
+                            raise UploadTooLargeError(upload_too_large)
+                        if current_file.error:
+                            continue
+                        current_file.write(data)
+                        if current_file.mime_type is None and len(current_file.head) >= SNIFF_BYTES:
+                            current_file.mime_type = sniff_image_mime_type(current_file.head)
+                            if current_file.mime_type not in allowed:
+                                reject(current_file, invalid_type)
+                    else:
+                        part_value += data
+                        if len(part_value) > MAX_FIELD_BYTES:
+                            raise UploadError(f"Form field '{part_name}' is too large")
+                elif event == "part_end":
+                    if current_file is not None:
+                        current_file.finish()
+                    elif part_name:
+                        fields[part_name] = part_value.decode("utf-8", "replace")
+            events.clear()
+
+        parser.finalize()
+    except (UploadError, MultipartParseError) as e:
+        for upload in uploads:
+            upload.close()
+        if isinstance(e, MultipartParseError):
+            raise UploadError(f"Malformed multipart upload: {e}")
+        raise
+
+    try:
+        if not uploads:
+            raise UploadError(f"Missing file field '{file_field}'")
+        for upload in uploads:
+            if upload.error:
+                continue
+            if upload.sha256 is None:
+                raise UploadError("Incomplete multipart upload")
+            if upload.size == 0:
+                reject(upload, f"Missing file field '{file_field}'" if max_files == 1 else "Empty file")
+            elif upload.mime_type is None:
+                # Files shorter than the sniff window
+                upload.mime_type = sniff_image_mime_type(upload.head)
+                if upload.mime_type not in allowed:
+                    reject(upload, invalid_type)
+    except UploadError:
+        for upload in uploads:
+            upload.close()
+        raise
+
+    return uploads, fields
+
+
+class Base64StreamDecoder:
+    """
+    Decodes base64 text that arrives in arbitrary chunks.
+
+    Whitespace (line-wrapped base64) is ignored and a leading
+    "data:<mime>;base64," prefix is stripped, with its type kept in
+    `mime_type`. Each feed() decodes every complete 4-character group and
+    carries the rest over, so memory stays at one chunk.
+    """
+
+    def __init__(self):
+        self.mime_type: Optional[str] = None
+        self._header = b""  # start of the payload, until we know if it is a data URL
+        self._started = False
+        self._pending = b""
+        self._padded = False
+
+    def feed(self, text: bytes) -> bytes:
+        """
+        Decode the next piece of base64 text.
+
+        Returns:
+            The bytes decoded so far from complete groups
+
+        Raises:
+            ValueError: If the text is not valid base64
+        """
+        text = text.translate(None, b" \t\r\n")
+        if not self._started:
+            self._header += text
+            if b"data:".startswith(self._header):
+                return b""  # too short to tell yet
+            if self._header.startswith(b"data:"):
+                comma = self._header.find(b",")
+                if comma < 0:
+                    if len(self._header) > MAX_DATA_URL_HEADER_BYTES:
+                        raise ValueError("Invalid base64 data")
+                    return b""
+                media_type = self._header[5:comma]
+                if b";base64" in media_type:
+                    self.mime_type = media_type.split(b";", 1)[0].decode("latin-1") or None
+                text = self._header[comma + 1:]
+            else:
+                text = self._header
+            self._header = b""
+            self._started = True
+        return self._decode(self._pending + text)
+
+    def finish(self) -> bytes:
+        """
+        Decode what is left at the end of the payload.
+
+        Raises:
+            ValueError: If the payload ends mid-group
+        """
+        if not self._started:
+            self._started = True
+            text, self._header = self._header, b""
+            return self._decode(text, final=True)
+        return self._decode(self._pending, final=True)
+
+    def _decode(self, text: bytes, final: bool = False) -> bytes:
+        usable = len(text) if final else len(text) - len(text) % 4
+        self._pending = text[usable:]
+        if not usable:
+            return b""
+        if self._padded or usable % 4:
+            raise ValueError("Invalid base64 data")
+        try:
+            data = base64.b64decode(text[:usable], validate=True)
+        except (binascii.Error, ValueError):
+            raise ValueError("Invalid base64 data")
+        self._padded = text[usable - 1:usable] == b"="
+        return data
+
+
+class _JsonUploadParser:
+    """
+    Incremental parser for a flat JSON object with one large string field.
+
+    The large field's raw text is passed to `on_file_text` as it arrives;
+    every other value is a small string, number, boolean or null and is
+    collected into `fields`.
+    """
+
+    def __init__(self, file_field: str, on_file_text: Callable[[bytes], None]):
+        self.file_field = file_field
+        self.on_file_text = on_file_text
+        self.fields: Dict[str, Any] = {}
+        self.file_seen = False
+        self._state = "start"
+        self._key = ""
+        self._buffer = bytearray()  # raw JSON of the current key or small value
+        self._escape = False
+
+    @property
+    def done(self) -> bool:
+        return self._state == "done"
+
+    def feed(self, data: bytes):
+        """Parse the next chunk of the body."""
+        i, n = 0, len(data)
+        while i < n:
+            state = self._state
+            if state in ("key", "string", "file"):
+                i = self._scan_string(data, i)
+                continue
+
+            char = data[i:i + 1]
+            if state == "scalar":
+                if char not in b" \t\r\n,}":
+                    self._append(char)
+                    i += 1
+                    continue
+                self._store(bytes(self._buffer))
+                self._state = state = "after_value"
+            if char in b" \t\r\n":
+                i += 1
+                continue
+
+            if state == "start" and char == b"{":
+                self._state = "first_key"
+            elif state in ("first_key", "next_key") and char == b'"':
+                self._state = "key"
+                self._buffer.clear()
+            elif state == "first_key" and char == b"}":
+                self._state = "done"
+            elif state == "colon" and char == b":":
+                self._state = "value"
+            elif state == "value" and char == b'"':
+                self._buffer.clear()
+                if self._key == self.file_field:
+                    if self.file_seen:
+                        raise UploadError(f"Duplicate field '{self.file_field}'")
+                    self.file_seen = True
+                    self._state = "file"
+                else:
+                    self._state = "string"
+            elif state == "value" and char not in b"{[":
+                self._buffer[:] = char
+                self._state = "scalar"
+            elif state == "after_value" and char == b",":
+                self._state = "next_key"
+            elif state == "after_value" and char == b"}":
+                self._state = "done"
+            else:
+                raise UploadError("Malformed JSON body" if state != "value" else f"Field '{self._key}' must be a string")
+            i += 1
+
+    def _scan_string(self, data: bytes, i: int) -> int:
+        """Consume string content up to the closing quote or the end of the chunk."""
+        if self._escape:
+            self._escape = False
+            self._escaped(data[i:i + 1])
+            return i + 1
+        match = _JSON_STRING_SPECIAL.search(data, i)
+        end = match.start() if match else len(data)
+        if end > i:
+            if self._state == "file":
+                self.on_file_text(data[i:end])
+            else:
+                self._append(data[i:end])
+        if match is None:
+            return end
+        if data[end] == ord('"'):
+            self._end_string()
+        else:
+            self._escape = True
+        return end + 1
+
+    def _escaped(self, char: bytes):
+        if self._state != "file":
+            self._append(b"\\" + char)
+        elif char == b"/":
+            self.on_file_text(b"/")  # some encoders write "/" as "\/"
+        elif char not in b"nrt":
+            raise UploadError("Invalid file data. Must be base64 encoded.")
+
+    def _end_string(self):
+        state = self._state
+        if state == "key":
+            self._key = self._decode(b'"' + self._buffer + b'"')
+            self._state = "colon"
+        else:
+            if state == "string":
+                self._store(b'"' + self._buffer + b'"')
+            self._state = "after_value"
+
+    def _append(self, data: bytes):
+        self._buffer += data
+        if len(self._buffer) > MAX_FIELD_BYTES:
+            raise UploadError(f"Field '{self._key}' is too large" if self._state != "key" else "Malformed JSON body")
+
+    def _store(self, raw: bytes):
+        value = self._decode(raw)
+        if value is not None:
+            self.fields[self._key] = value
+
+    @staticmethod
+    def _decode(raw: bytes) -> Any:
+        try:
+            return json.loads(raw)
+        except ValueError:
+            raise UploadError("Malformed JSON body")
+
+
+async def receive_base64_json_upload(
+    request: Request,
+    max_bytes: int,
+    file_field: str = "file",
+    spool_max_bytes: int = 1024 * 1024,
+) -> Tuple[StreamedUpload, Dict[str, Any]]:
+    """
+    Stream a JSON body that carries a file as a base64 string field.
+
+    The body is parsed incrementally and the base64 field is decoded chunk
+    by chunk into a spooled temp file, so the full body, the base64 string
+    and the decoded file are never all in memory. The size limit is
+    enforced on decoded bytes as they arrive.
+
+    Args:
+        request: Incoming application/json request
+        max_bytes: Maximum decoded file size
+        file_field: Name of the base64 field (may be a data URL)
+        spool_max_bytes: File size kept in memory before spilling to disk
+
+    Returns:
+        Tuple of (upload, other top-level fields); `upload.declared_type`
+        is the data URL's MIME type, if any
+
+    Raises:
+        UploadTooLargeError: As soon as the decoded file exceeds max_bytes
+        UploadError: If the body is not a flat JSON object, the field is
+            missing or not valid base64
+    """
+    content_type, _ = parse_options_header(request.headers.get("content-type", ""))
+    if content_type != b"application/json":
+        raise UploadError("Expected an application/json body")
+
+    file_too_large = f"File too large. Maximum size is {max_bytes // (1024 * 1024)}MB."
+    # Escaped, line-wrapped base64 stays well under twice the decoded size
+    max_body_bytes = 2 * max_bytes + MULTIPART_OVERHEAD_BYTES
+    content_length = request.headers.get("content-length")
+    if content_length and content_length.isdigit() and int(content_length) > max_body_bytes:
+        raise UploadTooLargeError(file_too_large)
+
+    upload = StreamedUpload(spool_max_bytes)
+    decoder = Base64StreamDecoder()
+
+    def write(data: bytes):
+        if upload.size + len(data) > max_bytes:
+            raise UploadTooLargeError(file_too_large)
+        if data:
+            upload.write(data)
+
+    parser = _JsonUploadParser(file_field, lambda text: write(decoder.feed(text)))
+    received = 0
+    try:
+        async for chunk in request.stream():
+            received += len(chunk)
+            if received > max_body_bytes:
+                raise UploadTooLargeError(file_too_large)
+            parser.feed(chunk)
+        if not parser.done:
+            raise UploadError("Malformed JSON body")
+        if not parser.file_seen:
+            raise UploadError(f"Missing field '{file_field}'")
+        write(decoder.finish())
+    except ValueError:
+        upload.close()
+        raise UploadError("Invalid file data. Must be base64 encoded.")
+    except UploadError:
+        upload.close()
+        raise
+
+    upload.declared_type = decoder.mime_type
+    upload.finish()
+    return upload, parser.fields
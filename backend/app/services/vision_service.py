@@ -1,7 +1,29 @@
-import base64
-from typing import Optional
-from ..core.gemini_client import gemini_client
+import asyncio
+import time
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+from ..core.admission import LLMOverloadedError
+from ..core.gemini_runner import gemini_runner
+from ..core.media import MediaBlob
+from ..core.model_registry import model_registry
+from ..core.single_flight import single_flight
 from ..core.config import settings
+from .image_normalizer import image_normalizer
+from .response_cache import ResponseCache
+from .upload_service import StreamedUpload
+
+
+# Bump when the vision prompt or persona changes so stale analyses are not served
+VISION_PROMPT_VERSION = 1
+
+# Content-addressed cache of image analyses (same diagram uploaded by many students)
+vision_response_cache = ResponseCache(
+    name="vision",
+    ttl_seconds=settings.vision_cache_ttl_seconds,
+    max_entries=settings.vision_cache_max_entries,
+    max_bytes=settings.vision_cache_max_bytes,
+    disk_dir=settings.vision_cache_dir if settings.vision_cache_disk_enabled else None,
+    disk_max_bytes=settings.vision_cache_disk_max_bytes,
+)
 
 
 def get_tutor_system_prompt(language: str) -> str:
@@ -20,51 +42,155 @@ IMPORTANT RULES:
 Remember: Your entire response must be in {language}."""
 
 
-async def analyze_image(image_bytes: bytes, language: str, filename: str) -> str:
+model_registry.register_persona("vision_tutor", get_tutor_system_prompt)
+
+
+async def analyze_image(
+    image: MediaBlob,
+    language: str,
+    filename: str,
+    use_cache: bool = True,
+    priority: str = "interactive",
+) -> Tuple[str, Optional[Dict[str, Any]], bool]:
     """
-    Analyze an image using OpenAI Vision API.
+    Analyze an image using Gemini Vision API.
+    
+    Analyses are cached by the SHA-256 of the image bytes plus language,
+    model, prompt version and normalizer output settings. On a miss the upload is first normalized
+    (downscaled, re-oriented, re-encoded without metadata) so the model
+    receives no more pixels than it uses.
     
     Args:
-        image_bytes: Raw image bytes
+        image: Uploaded image; its type should be sniffed from the content
+            (a non-image type falls back to the filename extension)
         language: Target response language
         filename: Original filename for context
+        use_cache: Whether a cached analysis may be returned
+        priority: Admission priority of the model call
         
     Returns:
-        AI-generated analysis in specified language
+        Tuple of (AI-generated analysis in specified language,
+        preprocessing report or None when cached, cached)
     """
-    # Encode image to base64
-    base64_image = base64.b64encode(image_bytes).decode("utf-8")
+    cache_key = ResponseCache.make_key(
+        image.sha256,
+        language,
+        settings.gemini_vision_model,
+        VISION_PROMPT_VERSION,
+        image_normalizer.output_settings,
+    )
+    if settings.vision_cache_enabled and use_cache:
+        cached = await vision_response_cache.get(cache_key)
+        if cached is not None:
+            return cached, None, True
     
-    # Determine image type from filename
-    extension = filename.lower().split(".")[-1]
-    mime_types = {
-        "png": "image/png",
-        "jpg": "image/jpeg",
-        "jpeg": "image/jpeg",
-        "gif": "image/gif",
-        "webp": "image/webp",
-    }
-    mime_type = mime_types.get(extension, "image/jpeg")
+    if not image.mime_type.startswith("image/"):
+        # Determine image type from filename
+        extension = filename.lower().split(".")[-1]
+        mime_types = {
+            "png": "image/png",
+            "jpg": "image/jpeg",
+            "jpeg": "image/jpeg",
+            "gif": "image/gif",
+            "webp": "image/webp",
+        }
+        image = MediaBlob(image.data, mime_types.get(extension, "image/jpeg"), sha256=image.sha256)
+    
+    normalized, preprocessing = await image_normalizer.normalize(image)
     
     # Create vision request with Gemini
-    model = gemini_client.GenerativeModel(settings.gemini_vision_model)
+    model = model_registry.get_model(settings.gemini_vision_model, language, "vision_tutor")
     
     # Prepare the content with image
     content = [
-        get_tutor_system_prompt(language),
         f"Please analyze this image and explain what you see in detail. Respond in {language}.",
-        {
-            "mime_type": mime_type,
-            "data": base64_image
-        }
+        normalized.to_part(),
     ]
     
-    response = model.generate_content(
-        content,
-        generation_config={
-            "max_output_tokens": 2000,
-            "temperature": 0.7,
+    async def generate() -> str:
+        response = await gemini_runner.generate(
+            model,
+            content,
+            generation_config={
+                "max_output_tokens": 2000,
+                "temperature": 0.7,
+            },
+            priority=priority,
+        )
+        return response.text
+    
+    # Identical images already in flight share one call
+    image_key = f"{normalized.sha256}:{normalized.mime_type}:{language}"
+    response_text = await single_flight.run("vision", image_key, generate)
+    
+    if response_text and settings.vision_cache_enabled:
+        await vision_response_cache.set(cache_key, response_text)
+    
+    return response_text or "Unable to analyze image.", preprocessing, False
+
+
+async def analyze_image_batch(
+    uploads: List[StreamedUpload],
+    language: str,
+    use_cache: bool = True,
+    concurrency: int = 4,
+) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Analyze many uploaded images with bounded concurrency.
+    
+    Each image goes through analyze_image (cache, normalization, single
+    flight) at "batch" admission priority. An upload is read into memory
+    only once its analysis starts, and closed when it ends.
+    
+    Args:
+        uploads: Received images; ones with `error` set are reported as failed
+        language: Target response language
+        use_cache: Whether cached analyses may be returned
+        concurrency: Maximum analyses running at once for this batch
+        
+    Yields:
+        One result per image, in completion order, with its request index
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    
+    async def analyze(index: int, upload: StreamedUpload) -> Dict[str, Any]:
+        result: Dict[str, Any] = {"index": index, "filename": upload.filename}
+        if upload.error:
+            return {**result, "success": False, "error": upload.error}
+        
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                image = MediaBlob(upload.read(), upload.mime_type, sha256=upload.sha256)
+                upload.close()  # the spooled copy is no longer needed
+                response_text, preprocessing, cached = await analyze_image(
+                    image,
+                    language,
+                    upload.filename or f"image-{index}.jpg",
+                    use_cache=use_cache,
+                    priority="batch",
+                )
+            except LLMOverloadedError as e:
+                return {**result, "success": False, "error": f"AI service is busy, please retry shortly: {str(e)}"}
+            except Exception as e:
+                return {**result, "success": False, "error": f"Error analyzing image: {str(e)}"}
+        
+        return {
+            **result,
+            "success": True,
+            "response": response_text,
+            "cached": cached,
+            "preprocessing": preprocessing,
+            "elapsed_ms": round((time.perf_counter() - start) * 1000, 1),
         }
-    )
     
-    return response.text or "Unable to analyze image."
+    tasks = [asyncio.create_task(analyze(index, upload)) for index, upload in enumerate(uploads)]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            yield await next_done
+    finally:
+        # The client went away or the batch finished; stop what is left
+        for task in tasks:
+            task.cancel()
+        for upload in uploads:
+            upload.close()
@@ -0,0 +1,199 @@
+"""
+Benchmark: document text extraction throughput per format.
+
+Generates a sample PDF, DOCX, XLSX, CSV and PPTX file and extracts each
+--jobs times concurrently, comparing:
+
+- inline:  parsing directly inside the async handler (blocks the event loop)
+- pool:    DocumentExtractor worker processes (per-job timeout, memory limit)
+
+For each it reports documents/s, MB/s and the worst event loop stall. A
+final run feeds the pool a decompression bomb (a small .docx that expands
+to gigabytes of XML) to show it is stopped by the memory limit or the
+timeout without affecting the next job.
+
+Requires pypdf, python-docx, openpyxl and python-pptx.
+
+Usage (from the backend directory):
+    python -m benchmarks.document_extraction [--jobs 8] [--workers 2] [--scale 1]
+"""
+import argparse
+import asyncio
+import csv
+import io
+import time
+import zipfile
+
+import docx
+import openpyxl
+import pptx
+
+from app.services.document_extractor import DocumentExtractionError, DocumentExtractor, extract_document
+
+LOREM = (
+    "The mitochondria is the powerhouse of the cell. Photosynthesis converts light energy into "
+    "chemical energy stored in glucose. Newton's second law states that force equals mass times acceleration."
+)
+
+
+def make_pdf(pages: int) -> bytes:
+    """A plain PDF with `pages` pages of Helvetica text."""
+    objects = [b"<< /Type /Catalog /Pages 2 0 R >>", None, b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    page_ids = []
+    for page in range(pages):
+        lines = [f"BT /F1 10 Tf 40 {780 - 14 * row} Td (Page {page + 1} line {row}: {LOREM[:90]}) Tj ET" for row in range(50)]
+        stream = "\n".join(lines).encode("latin-1")
+        objects.append(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream))
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Resources << /Font << /F1 3 0 R >> >> "
+            b"/Contents %d 0 R >>" % len(objects)
+        )
+        page_ids.append(len(objects))
+    kids = b" ".join(b"%d 0 R" % page_id for page_id in page_ids)
+    objects[1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (kids, pages)
+
+    out = io.BytesIO()
+    out.write(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(out.tell())
+        out.write(b"%d 0 obj\n%s\nendobj\n" % (number, body))
+    xref = out.tell()
+    out.write(b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1))
+    for offset in offsets:
+        out.write(b"%010d 00000 n \n" % offset)
+    out.write(b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref))
+    return out.getvalue()
+
+
+def make_docx(paragraphs: int) -> bytes:
+    document = docx.Document()
+    document.add_heading("Biology notes", level=1)
+    for number in range(paragraphs):
+        document.add_paragraph(f"{number}. {LOREM}")
+    table = document.add_table(rows=20, cols=3)
+    for row in table.rows:
+        for cell in row.cells:
+            cell.text = "cell"
+    out = io.BytesIO()
+    document.save(out)
+    return out.getvalue()
+
+
+def make_xlsx(rows: int) -> bytes:
+    workbook = openpyxl.Workbook(write_only=True)
+    sheet = workbook.create_sheet("Grades")
+    for number in range(rows):
+        sheet.append([f"Student {number}", number % 100, number * 1.5, "passed" if number % 3 else "retake"])
+    out = io.BytesIO()
+    workbook.save(out)
+    return out.getvalue()
+
+
+def make_csv(rows: int) -> bytes:
+    out = io.StringIO()
+    writer = csv.writer(out)
+    for number in range(rows):
+        writer.writerow([f"Student {number}", number % 100, number * 1.5, "passed" if number % 3 else "retake"])
+    return out.getvalue().encode("utf-8")
+
+
+def make_pptx(slides: int) -> bytes:
+    presentation = pptx.Presentation()
+    for number in range(slides):
+        slide = presentation.slides.add_slide(presentation.slide_layouts[1])
+        slide.shapes.title.text = f"Lesson {number}"
+        slide.placeholders[1].text = LOREM
+    out = io.BytesIO()
+    presentation.save(out)
+    return out.getvalue()
+
+
+def make_docx_bomb(expanded_mb: int) -> bytes:
+    """A .docx whose document.xml inflates to `expanded_mb` MB of paragraphs."""
+    template = make_docx(1)
+    paragraph = b"<w:p><w:r><w:t>" + b"A" * 1000 + b"</w:t></w:r></w:p>"
+    out = io.BytesIO()
+    with zipfile.ZipFile(io.BytesIO(template)) as source, zipfile.ZipFile(out, "w", zipfile.ZIP_DEFLATED) as bomb:
+        for item in source.infolist():
+            if item.filename != "word/document.xml":
+                bomb.writestr(item, source.read(item))
+        with bomb.open("word/document.xml", "w", force_zip64=True) as f:
+            f.write(b'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                    b'<w:document xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main"><w:body>')
+            for _ in range(expanded_mb * 1024):
+                f.write(paragraph)
+            f.write(b"</w:body></w:document>")
+    return out.getvalue()
+
+
+async def _measure_loop_lag(stop: asyncio.Event, interval: float = 0.01) -> float:
+    """Measure the worst event loop stall while the benchmark runs."""
+    worst = 0.0
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        worst = max(worst, time.perf_counter() - start - interval)
+    return worst
+
+
+async def _run(name: str, fmt: str, data: bytes, jobs: int, extract):
+    stop = asyncio.Event()
+    lag_task = asyncio.create_task(_measure_loop_lag(stop))
+    await asyncio.sleep(0)
+
+    start = time.perf_counter()
+    results = await asyncio.gather(*(extract(data, fmt) for _ in range(jobs)))
+    elapsed = time.perf_counter() - start
+
+    stop.set()
+    worst_lag = await lag_task
+    chars = len(results[0][0])
+    print(
+        f"{fmt:<5} {name:<7} {jobs} x {len(data) / 1024:7.0f} KB in {elapsed:6.2f}s  "
+        f"{jobs / elapsed:6.1f} docs/s  {jobs * len(data) / elapsed / (1024 * 1024):6.2f} MB/s  "
+        f"{chars:>7} chars  max loop stall {worst_lag * 1000:7.1f} ms"
+    )
+
+
+async def main(jobs: int, workers: int, scale: int, max_chars: int):
+    samples = {
+        "pdf": make_pdf(40 * scale),
+        "docx": make_docx(1000 * scale),
+        "xlsx": make_xlsx(5000 * scale),
+        "csv": make_csv(5000 * scale),
+        "pptx": make_pptx(40 * scale),
+    }
+    extractor = DocumentExtractor(max_workers=workers, timeout_seconds=20, memory_limit_mb=1024, max_chars=max_chars)
+
+    async def inline(data: bytes, fmt: str):
+        return extract_document(data, fmt, max_chars)
+
+    print(f"{jobs} concurrent jobs per format, {workers} workers, max {max_chars} chars per document")
+    # Start the workers so process spawn time is not counted
+    await asyncio.gather(*(extractor.extract(samples["csv"], "csv") for _ in range(workers)))
+    for fmt, data in samples.items():
+        await _run("inline", fmt, data, jobs, inline)
+        await _run("pool", fmt, data, jobs, extractor.extract)
+
+    bomb = make_docx_bomb(2048)
+    print(f"\ndocx bomb: {len(bomb) / 1024:.0f} KB file expanding to 2 GB of XML")
+    start = time.perf_counter()
+    try:
+        await extractor.extract(bomb, "docx")
+        print("  extracted (unexpected)")
+    except DocumentExtractionError as e:
+        print(f"  stopped after {time.perf_counter() - start:.1f}s: {e}")
+    start = time.perf_counter()
+    await extractor.extract(samples["pdf"], "pdf")
+    print(f"  next job ok in {time.perf_counter() - start:.2f}s (workers replaced: {extractor.workers_replaced})")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--jobs", type=int, default=8)
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--scale", type=int, default=1, help="Multiplier for the sample document sizes")
+    parser.add_argument("--max-chars", type=int, default=100000)
+    args = parser.parse_args()
+    asyncio.run(main(args.jobs, args.workers, args.scale, args.max_chars))
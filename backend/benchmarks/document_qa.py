@@ -0,0 +1,130 @@
+"""
+Benchmark: follow-up questions on a long document, whole text vs top-k passages.
+
+Builds a synthetic textbook (default 400k characters of pages with
+headings and a Zipf-distributed vocabulary) and plants one fact per
+question on a random page. Each question is answered with the fake model
+of benchmarks.long_document (latency grows with the prompt) in two ways:
+
+- full text:  the document in the prompt, cut at the single-prompt limit
+              (100k characters), as a whole-document analysis does
+- top-k:      answer_file_question: only the BM25-ranked passages
+
+Reports the index build time, search time, prompt size, answer latency
+and how often the planted fact made it into the prompt.
+
+Usage (from the backend directory):
+    python -m benchmarks.document_qa [--chars 400000] [--questions 50] [--top-k 5]
+"""
+import argparse
+import asyncio
+import random
+import time
+
+from app.core.config import settings
+from app.core.gemini_runner import gemini_runner
+from app.core.model_registry import model_registry
+from app.services import file_service
+from app.services.document_index import DocumentIndexStore
+from benchmarks.long_document import FakeModel
+
+
+def make_vocabulary(rng: random.Random, size: int):
+    """Pronounceable pseudo-words."""
+    consonants, vowels = "bcdfghklmnprstvz", "aeiou"
+    words = set()
+    while len(words) < size:
+        words.add("".join(rng.choice(consonants) + rng.choice(vowels) for _ in range(rng.randint(2, 4))))
+    return sorted(words)
+
+
+def make_textbook(rng: random.Random, chars: int, questions: int):
+    """Pages of Zipf-distributed words, with one planted fact per question."""
+    vocabulary = make_vocabulary(rng, 6000)
+    weights = [1 / (rank + 1) for rank in range(len(vocabulary))]
+    pages = []
+    size = 0
+    while size < chars:
+        number = len(pages) + 1
+        heading = f"## Chapter {number // 10 + 1}\n" if number % 10 == 1 else ""
+        lines = [" ".join(rng.choices(vocabulary, weights, k=14)) + "." for _ in range(22)]
+        pages.append([f"--- Page {number} ---\n{heading}", lines])
+        size += sum(len(line) + 1 for line in lines) + 30
+
+    facts = []
+    for i in range(questions):
+        page = rng.randrange(len(pages))
+        term, unit = rng.sample(vocabulary[3000:], 2)
+        value = rng.randint(100, 999)
+        fact = f"The {term} constant equals {value} {unit}."
+        pages[page][1].insert(rng.randrange(len(pages[page][1])), fact)
+        facts.append((f"What is the value of the {term} constant?", fact))
+
+    text = "\n".join(header + "\n".join(lines) for header, lines in pages)
+    return text, facts
+
+
+def _median(values):
+    return sorted(values)[len(values) // 2]
+
+
+async def main(chars: int, questions: int, top_k: int, prefill_ms: float, token_ms: float):
+    rng = random.Random(7)
+    text, facts = make_textbook(rng, chars, questions)
+    model = FakeModel(prefill_ms, token_ms, output_tokens=200)
+    model_registry.get_model = lambda model_name, language, persona: model
+
+    store = DocumentIndexStore(
+        passage_chars=settings.document_index_passage_chars,
+        max_documents=10,
+        max_chars=100_000_000,
+    )
+    file_service.document_index = store
+    start = time.perf_counter()
+    index = await store.build("book", text, "book.pdf")
+    build_ms = (time.perf_counter() - start) * 1000
+
+    print(
+        f"{len(text)} chars, {len(index.passages)} passages of <= {store.passage_chars} chars, "
+        f"{len(index.postings)} terms, index built in {build_ms:.0f} ms"
+    )
+    print(f"prefill {prefill_ms:g} ms per 1k chars, {token_ms:g} ms per output token, {questions} questions")
+
+    limit = settings.document_single_prompt_chars
+    full_prompt = f"This is the content of book.pdf. Answer the question using it:\n\n{text[:limit]}"
+    full_hits = 0
+    full_times = []
+    for question, fact in facts:
+        full_hits += fact in full_prompt
+        start = time.perf_counter()
+        await gemini_runner.generate(model, [full_prompt + f"\n\nQuestion: {question}"])
+        full_times.append(time.perf_counter() - start)
+
+    topk_hits = 0
+    topk_times, topk_chars = [], []
+    for question, fact in facts:
+        start = time.perf_counter()
+        await file_service.answer_file_question("book", question, "English", top_k)
+        topk_times.append(time.perf_counter() - start)
+        excerpts = "\n".join(passage.text for passage, _ in index.search(question, top_k))
+        topk_hits += fact in excerpts
+        topk_chars.append(len(excerpts))
+
+    print(f"{'mode':<10} {'prompt chars':>12} {'fact in prompt':>14} {'median latency':>15}")
+    print(f"{'full text':<10} {len(full_prompt):12d} {full_hits / questions:14.0%} {_median(full_times) * 1000:12.0f} ms")
+    print(
+        f"{'top-' + str(top_k):<10} {int(_median(topk_chars)):12d} {topk_hits / questions:14.0%} "
+        f"{_median(topk_times) * 1000:12.0f} ms"
+    )
+    print(f"search: {store.get_stats()['avg_search_ms']} ms per question")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chars", type=int, default=400000)
+    parser.add_argument("--questions", type=int, default=50)
+    parser.add_argument("--top-k", type=int, default=settings.document_index_top_k)
+    parser.add_argument("--prefill-ms", type=float, default=10.0, help="Prompt processing time per 1000 characters")
+    parser.add_argument("--token-ms", type=float, default=5.0, help="Generation time per output token")
+    args = parser.parse_args()
+    asyncio.run(main(args.chars, args.questions, args.top_k, args.prefill_ms, args.token_ms))
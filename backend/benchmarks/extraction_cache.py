@@ -0,0 +1,82 @@
+"""
+Benchmark: extracting a re-uploaded document vs reading the extraction cache.
+
+Generates the sample documents of benchmarks.document_extraction and, per
+format, compares:
+
+- extract:  parsing in a DocumentExtractor worker (what every upload did)
+- cached:   ExtractionCache hit: open the memory-mapped file and decode
+            the text
+- section:  reading one page/section by its stored offsets
+
+Usage (from the backend directory):
+    python -m benchmarks.extraction_cache [--scale 1] [--repeat 5]
+"""
+import argparse
+import asyncio
+import hashlib
+import tempfile
+import time
+
+from app.services.document_extractor import DocumentExtractor
+from app.services.extraction_cache import ExtractionCache
+from benchmarks.document_extraction import make_csv, make_docx, make_pdf, make_pptx, make_xlsx
+
+
+async def main(scale: int, repeat: int, max_chars: int):
+    samples = {
+        "pdf": make_pdf(40 * scale),
+        "docx": make_docx(1000 * scale),
+        "xlsx": make_xlsx(5000 * scale),
+        "csv": make_csv(5000 * scale),
+        "pptx": make_pptx(40 * scale),
+    }
+    extractor = DocumentExtractor(max_workers=1, timeout_seconds=60, memory_limit_mb=1024, max_chars=max_chars)
+    await extractor.extract(samples["csv"], "csv")  # start the worker outside the timings
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        cache = ExtractionCache(cache_dir, max_bytes=1024 * 1024 * 1024, max_chars=max_chars)
+        print(f"{repeat} runs per format, median times")
+        for fmt, data in samples.items():
+            content_hash = hashlib.sha256(data).hexdigest()
+
+            extract_times = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                text, truncated = await extractor.extract(data, fmt)
+                extract_times.append(time.perf_counter() - start)
+            cache.set(content_hash, fmt, text, truncated)
+
+            cached_times, section_times = [], []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                with cache.get(content_hash, fmt) as cached:
+                    cached_text = cached.text()
+                cached_times.append(time.perf_counter() - start)
+
+                start = time.perf_counter()
+                with cache.get(content_hash, fmt) as cached:
+                    sections = len(cached.sections)
+                    if sections:
+                        cached.section_text(sections // 2)
+                section_times.append(time.perf_counter() - start)
+            assert cached_text == text
+
+            extract_ms = sorted(extract_times)[repeat // 2] * 1000
+            cached_ms = sorted(cached_times)[repeat // 2] * 1000
+            section_ms = sorted(section_times)[repeat // 2] * 1000
+            print(
+                f"{fmt:<5} {len(data) / 1024:6.0f} KB -> {len(text):>7} chars  "
+                f"extract {extract_ms:8.1f} ms  cached {cached_ms:6.2f} ms ({extract_ms / cached_ms:6.0f}x)  "
+                f"one of {sections:>3} sections {section_ms:6.2f} ms"
+            )
+        print(f"cache: {cache.get_stats()}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scale", type=int, default=1, help="Multiplier for the sample document sizes")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--max-chars", type=int, default=2_000_000)
+    args = parser.parse_args()
+    asyncio.run(main(args.scale, args.repeat, args.max_chars))
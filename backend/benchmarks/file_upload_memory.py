@@ -0,0 +1,148 @@
+"""
+Benchmark: peak memory and time of receiving one /api/chat/respond/file upload.
+
+Feeds a request body from disk in 64 KB chunks (like the ASGI server does)
+and compares:
+
+- json-buffered:  the previous endpoint: the whole JSON body is read,
+                  parsed by pydantic into a string, then base64-decoded
+- json-streamed:  receive_base64_json_upload: the base64 field is decoded
+                  chunk by chunk into a spooled temp file
+- multipart:      receive_file_upload on /respond/file/upload: raw bytes,
+                  no base64 at all
+
+Each path runs in a fresh interpreter and reports its peak RSS above the
+baseline of an idle process, measured up to the point where the upload is
+received (before the file is read for the model call).
+
+Usage (from the backend directory):
+    python -m benchmarks.file_upload_memory [--size-mb 10]
+"""
+import argparse
+import asyncio
+import base64
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+from app.core.media import MediaBlob
+from app.models.request_models import FileAnalysisRequest
+from app.services.upload_service import receive_base64_json_upload, receive_file_upload
+
+CHUNK_BYTES = 64 * 1024
+BOUNDARY = "benchmarkboundary"
+
+
+def _peak_rss_mb() -> float:
+    """Peak resident set size of this process (ru_maxrss is KB on Linux, bytes on macOS)."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+class FileRequest:
+    """Just enough of a Starlette Request to stream a body from disk."""
+
+    def __init__(self, path: str, content_type: str):
+        self.path = path
+        self.headers = {"content-type": content_type, "content-length": str(os.path.getsize(path))}
+
+    async def stream(self):
+        with open(self.path, "rb") as f:
+            while chunk := f.read(CHUNK_BYTES):
+                yield chunk
+
+    async def body(self) -> bytes:
+        return b"".join([chunk async for chunk in self.stream()])
+
+
+async def json_buffered(path: str, max_bytes: int):
+    body = await FileRequest(path, "application/json").body()
+    request = FileAnalysisRequest.model_validate_json(body)
+    return request, MediaBlob.from_base64(request.file, request.fileType)
+
+
+async def json_streamed(path: str, max_bytes: int):
+    return await receive_base64_json_upload(FileRequest(path, "application/json"), max_bytes=max_bytes)
+
+
+async def multipart(path: str, max_bytes: int):
+    request = FileRequest(path + ".multipart", f"multipart/form-data; boundary={BOUNDARY}")
+    return await receive_file_upload(request, max_bytes=max_bytes)
+
+
+PATHS = {
+    "json-buffered": json_buffered,
+    "json-streamed": json_streamed,
+    "multipart": multipart,
+}
+
+
+def _write_bodies(path: str, size_mb: float):
+    """Write the JSON and multipart bodies for the same random file, in chunks."""
+    chunk = 3 * 256 * 1024  # multiple of 3 so chunk encodings concatenate
+    remaining = int(size_mb * 1024 * 1024)
+    with open(path, "wb") as body, open(path + ".multipart", "wb") as form:
+        body.write(b'{"fileName": "report.pdf", "fileType": "application/pdf", "language": "English", "file": "')
+        form.write(
+            f'--{BOUNDARY}\r\nContent-Disposition: form-data; name="language"\r\n\r\nEnglish\r\n'
+            f'--{BOUNDARY}\r\nContent-Disposition: form-data; name="file"; filename="report.pdf"\r\n'
+            f"Content-Type: application/pdf\r\n\r\n".encode()
+        )
+        while remaining > 0:
+            data = os.urandom(min(chunk, remaining))
+            body.write(base64.b64encode(data))
+            form.write(data)
+            remaining -= chunk
+        body.write(b'"}')
+        form.write(f"\r\n--{BOUNDARY}--\r\n".encode())
+
+
+def _run_path(name: str, body_path: str, max_bytes: int):
+    """Child process: receive the upload once, print baseline, peak RSS and seconds."""
+    baseline = _peak_rss_mb()
+    start = time.perf_counter()
+    result = asyncio.run(PATHS[name](body_path, max_bytes))
+    elapsed = time.perf_counter() - start
+    print(f"{baseline:.1f} {_peak_rss_mb():.1f} {elapsed:.3f}")
+    del result
+
+
+def main(size_mb: float):
+    fd, body_path = tempfile.mkstemp(suffix=".json")
+    os.close(fd)
+    max_bytes = int(size_mb * 1024 * 1024) + 1024
+    try:
+        _write_bodies(body_path, size_mb)
+        print(f"{size_mb:g} MB file, {os.path.getsize(body_path) / (1024 * 1024):.1f} MB JSON body")
+        for name in PATHS:
+            output = subprocess.run(
+                [sys.executable, "-m", "benchmarks.file_upload_memory", "--run", name, "--body", body_path,
+                 "--max-bytes", str(max_bytes)],
+                check=True,
+                capture_output=True,
+                text=True,
+            ).stdout
+            baseline, peak, elapsed = (float(value) for value in output.split())
+            print(
+                f"{name:<14} peak RSS {peak:7.1f} MB  (+{peak - baseline:6.1f} MB)  "
+                f"received in {elapsed * 1000:6.0f} ms ({size_mb / elapsed:6.1f} MB/s)"
+            )
+    finally:
+        os.unlink(body_path)
+        os.unlink(body_path + ".multipart")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size-mb", type=float, default=10)
+    parser.add_argument("--run", choices=sorted(PATHS), help=argparse.SUPPRESS)
+    parser.add_argument("--body", help=argparse.SUPPRESS)
+    parser.add_argument("--max-bytes", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.run:
+        _run_path(args.run, args.body, args.max_bytes)
+    else:
+        main(args.size_mb)
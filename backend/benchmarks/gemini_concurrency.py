@@ -0,0 +1,102 @@
+"""
+Benchmark: aggregate throughput of Gemini calls under concurrent load.
+
+Runs 50 concurrent "requests" against a local fake model that sleeps for a
+fixed latency, and compares:
+
+- blocking:  calling generate_content() directly inside an async handler
+             (the old behaviour, which serializes on the event loop)
+- thread:    GeminiRunner with the bounded thread pool
+- async:     GeminiRunner with the SDK-style async API
+
+Usage (from the backend directory):
+    python -m benchmarks.gemini_concurrency [--requests 50] [--latency 0.2]
+"""
+import argparse
+import asyncio
+import time
+
+from app.core.gemini_runner import GeminiRunner
+
+
+class FakeResponse:
+    def __init__(self, text: str):
+        self.text = text
+
+
+class FakeModel:
+    """Stand-in for GenerativeModel with a fixed per-call latency."""
+
+    def __init__(self, latency: float):
+        self.latency = latency
+
+    def generate_content(self, contents, generation_config=None, **kwargs):
+        time.sleep(self.latency)
+        return FakeResponse("ok")
+
+    async def generate_content_async(self, contents, generation_config=None, **kwargs):
+        await asyncio.sleep(self.latency)
+        return FakeResponse("ok")
+
+
+class SyncOnlyModel(FakeModel):
+    """Fake model without an async API, forcing the thread pool path."""
+
+    generate_content_async = None
+
+
+async def _measure_loop_lag(stop: asyncio.Event, interval: float = 0.01) -> float:
+    """Measure the worst event loop stall while the benchmark runs."""
+    worst = 0.0
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        worst = max(worst, time.perf_counter() - start - interval)
+    return worst
+
+
+async def _run(name: str, call, requests: int):
+    stop = asyncio.Event()
+    lag_task = asyncio.create_task(_measure_loop_lag(stop))
+
+    start = time.perf_counter()
+    await asyncio.gather(*(call() for _ in range(requests)))
+    elapsed = time.perf_counter() - start
+
+    stop.set()
+    worst_lag = await lag_task
+    print(
+        f"{name:<10} {requests} requests in {elapsed:6.2f}s  "
+        f"throughput {requests / elapsed:7.1f} req/s  "
+        f"max loop stall {worst_lag * 1000:7.1f} ms"
+    )
+
+
+async def main(requests: int, latency: float, concurrency: int):
+    model = FakeModel(latency)
+    sync_model = SyncOnlyModel(latency)
+    thread_runner = GeminiRunner(max_concurrency=concurrency, use_async_api=False)
+    async_runner = GeminiRunner(max_concurrency=concurrency, use_async_api=True)
+
+    async def blocking():
+        return model.generate_content("hi")
+
+    async def threaded():
+        return await thread_runner.generate(sync_model, "hi")
+
+    async def native_async():
+        return await async_runner.generate(model, "hi")
+
+    print(f"Fake model latency {latency * 1000:.0f} ms, runner concurrency {concurrency}")
+    await _run("blocking", blocking, requests)
+    await _run("thread", threaded, requests)
+    await _run("async", native_async, requests)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=50)
+    parser.add_argument("--latency", type=float, default=0.2)
+    parser.add_argument("--concurrency", type=int, default=16)
+    args = parser.parse_args()
+    asyncio.run(main(args.requests, args.latency, args.concurrency))
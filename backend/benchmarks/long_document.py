@@ -0,0 +1,132 @@
+"""
+Benchmark: analyzing a long document in one prompt vs map-reduce.
+
+Uses a local fake model whose latency grows with the prompt (prefill) and
+the generated tokens, and a synthetic textbook (default 400k characters
+of pages with headings). Compares:
+
+- single:      the previous behaviour: text cut at 100k characters,
+               one prompt, the answer streamed
+- map-reduce:  DocumentSummarizer: parts summarized a few at a time,
+               then one streamed final answer from the summaries
+
+For each it reports how much of the document the model saw, the time to
+the first progress event, the time to the first answer text and the total
+time. The latency model is a rough stand-in; pass real-world numbers with
+--prefill-ms and --token-ms.
+
+Usage (from the backend directory):
+    python -m benchmarks.long_document [--chars 400000] [--concurrency 4]
+"""
+import argparse
+import asyncio
+import time
+
+from app.core.config import settings
+from app.core.gemini_runner import gemini_runner
+from app.core.model_registry import model_registry
+from app.services.document_summarizer import DocumentSummarizer
+
+
+class FakeChunk:
+    def __init__(self, text: str):
+        self.text = text
+
+
+class FakeModel:
+    """Stand-in for GenerativeModel: latency = prefill per 1k prompt chars + time per output token."""
+
+    def __init__(self, prefill_ms: float, token_ms: float, output_tokens: int):
+        self.prefill_ms = prefill_ms
+        self.token_ms = token_ms
+        self.output_tokens = output_tokens
+
+    async def generate_content_async(self, contents, generation_config=None, stream=False, **kwargs):
+        prompt_chars = sum(len(part) for part in contents if isinstance(part, str))
+        await asyncio.sleep(prompt_chars / 1000 * self.prefill_ms / 1000)
+        if stream:
+            return self._stream()
+        await asyncio.sleep(self.output_tokens * self.token_ms / 1000)
+        return FakeChunk("- key point " * (self.output_tokens // 3))
+
+    async def _stream(self):
+        for _ in range(self.output_tokens // 20):
+            await asyncio.sleep(20 * self.token_ms / 1000)
+            yield FakeChunk("answer " * 20)
+
+
+def make_textbook(chars: int) -> str:
+    """Pages of text with a chapter heading every ten pages, like extracted PDF text."""
+    pages = []
+    number = 0
+    while sum(len(page) for page in pages) < chars:
+        number += 1
+        heading = f"## Chapter {number // 10 + 1}\n" if number % 10 == 1 else ""
+        body = "\n".join(f"Paragraph {line} of page {number}: " + "content " * 12 for line in range(30))
+        pages.append(f"--- Page {number} ---\n{heading}{body}")
+    return "\n".join(pages)
+
+
+async def run_single(text: str, model: FakeModel, single_prompt_chars: int):
+    start = time.perf_counter()
+    first_text = None
+    prompt = f"This is the content of book.pdf (application/pdf). Please analyze it:\n\n{text[:single_prompt_chars]}"
+    async for chunk in gemini_runner.stream(model, [prompt], priority="batch"):
+        if first_text is None and chunk.text:
+            first_text = time.perf_counter() - start
+    return min(1.0, single_prompt_chars / len(text)), None, first_text, time.perf_counter() - start, 1
+
+
+async def run_map_reduce(text: str, summarizer: DocumentSummarizer):
+    start = time.perf_counter()
+    first_progress = first_text = None
+    async for event in summarizer.summarize(text, "book.pdf", "application/pdf", "English"):
+        elapsed = time.perf_counter() - start
+        if event["type"] == "progress" and event["completed"] and first_progress is None:
+            first_progress = elapsed
+        elif event["type"] == "delta" and first_text is None:
+            first_text = elapsed
+    calls = summarizer.map_calls + summarizer.combine_calls + 1
+    return 1.0, first_progress, first_text, time.perf_counter() - start, calls
+
+
+def _ms(value) -> str:
+    return f"{value * 1000:8.0f} ms" if value is not None else "        -  "
+
+
+async def main(chars: int, concurrency: int, prefill_ms: float, token_ms: float):
+    text = make_textbook(chars)
+    map_model = FakeModel(prefill_ms, token_ms, output_tokens=300)
+    answer_model = FakeModel(prefill_ms, token_ms, output_tokens=1500)
+    # Serve the fake models from the registry (chunk_summarizer for map/combine, file_tutor for the answer)
+    model_registry.get_model = lambda model_name, language, persona: (
+        map_model if persona == "chunk_summarizer" else answer_model
+    )
+
+    print(
+        f"{len(text)} chars, prefill {prefill_ms:g} ms per 1k chars, {token_ms:g} ms per output token, "
+        f"single prompt limit {settings.document_single_prompt_chars} chars"
+    )
+    print(f"{'mode':<18} {'coverage':>8} {'first progress':>14} {'first answer':>13} {'total':>11} {'calls':>6}")
+
+    rows = [("single", await run_single(text, answer_model, settings.document_single_prompt_chars))]
+    for workers in sorted({1, concurrency}):
+        summarizer = DocumentSummarizer(
+            chunk_chars=settings.document_summary_chunk_chars,
+            concurrency=workers,
+            reduce_chars=settings.document_single_prompt_chars,
+        )
+        rows.append((f"map-reduce x{workers}", await run_map_reduce(text, summarizer)))
+
+    for name, (coverage, first_progress, first_text, total, calls) in rows:
+        print(f"{name:<18} {coverage:8.0%} {_ms(first_progress):>14} {_ms(first_text):>13} {_ms(total):>11} {calls:6d}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chars", type=int, default=400000)
+    parser.add_argument("--concurrency", type=int, default=settings.document_summary_concurrency)
+    parser.add_argument("--prefill-ms", type=float, default=10.0, help="Prompt processing time per 1000 characters")
+    parser.add_argument("--token-ms", type=float, default=5.0, help="Generation time per output token")
+    args = parser.parse_args()
+    asyncio.run(main(args.chars, args.concurrency, args.prefill_ms, args.token_ms))
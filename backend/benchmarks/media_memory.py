@@ -0,0 +1,168 @@
+"""
+Benchmark: peak memory of handling one large base64 upload.
+
+Replays the request path of a JSON upload (default 10 MB) up to the point
+where the Gemini SDK builds its request, and compares:
+
+- file-old:    /api/chat/respond/file before MediaBlob: the base64 text is
+               decoded into bytes that are never used, hashed as a UTF-8
+               copy of the text, and sent to the SDK as a string, which
+               decodes it a second time
+- file-new:    decoded once into a MediaBlob; the same bytes are hashed and
+               handed to the SDK
+- screen-old:  /api/screen/frame before MediaBlob: the single-flight key
+               hashes prompt + frame, copying the frame into a new buffer
+- screen-new:  decoded once, hashed in place
+
+Each path runs in a fresh interpreter and reports its peak RSS above the
+baseline of holding the raw request body. Vision uploads are not included:
+they were already binary end to end.
+
+Usage (from the backend directory):
+    python -m benchmarks.media_memory [--size-mb 10]
+"""
+import argparse
+import base64
+import hashlib
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+
+from app.core.media import MediaBlob
+
+try:
+    from google.generativeai.types import content_types
+except ImportError:  # Without the SDK only the application-side copies are measured
+    content_types = None
+
+MIME_TYPE = "image/png"
+PROMPT = "This is an image file named 'diagram.png'. Please analyze what you see and provide insights in English."
+
+
+def _peak_rss_mb() -> float:
+    """Peak resident set size of this process (ru_maxrss is KB on Linux, bytes on macOS)."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+USE_SDK = content_types is not None
+
+
+def _current_rss_mb() -> float:
+    """Current resident set size (Linux only; 0 elsewhere)."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except OSError:
+        return 0.0
+
+
+def _to_model(content):
+    """Build the SDK request the way GenerativeModel.generate_content does."""
+    if USE_SDK:
+        return content_types.to_contents(content)
+    return content
+
+
+def file_old(request):
+    file_base64 = request["file"]
+    file_key = hashlib.sha256(f"diagram.png\n{MIME_TYPE}\nEnglish\n{file_base64}".encode("utf-8")).hexdigest()
+    file_content = base64.b64decode(file_base64)
+    contents = _to_model([PROMPT, {"mime_type": MIME_TYPE, "data": file_base64}])
+    return file_key, file_content, contents
+
+
+def file_new(request):
+    file = MediaBlob.from_base64(request["file"], MIME_TYPE)
+    file_key = hashlib.sha256(f"diagram.png\n{file.mime_type}\nEnglish\n{file.sha256}".encode("utf-8")).hexdigest()
+    contents = _to_model([PROMPT, file.to_part()])
+    return file_key, file, contents
+
+
+def screen_old(request):
+    frame_bytes = base64.b64decode(request["file"])
+    image = {"mime_type": MIME_TYPE, "data": frame_bytes}
+    frame_key = hashlib.sha256(f"English\n{PROMPT}\n".encode("utf-8") + image["data"]).hexdigest()
+    contents = _to_model([PROMPT, image])
+    return frame_key, contents
+
+
+def screen_new(request):
+    frame = MediaBlob.from_base64(request["file"], MIME_TYPE)
+    frame_key = hashlib.sha256(f"English\n{PROMPT}\n{frame.sha256}".encode("utf-8")).hexdigest()
+    contents = _to_model([PROMPT, frame.to_part()])
+    return frame_key, contents
+
+
+PATHS = {
+    "file-old": file_old,
+    "file-new": file_new,
+    "screen-old": screen_old,
+    "screen-new": screen_new,
+}
+
+
+def _write_body(path: str, size_mb: float):
+    """Write a JSON request body with a base64 payload, in chunks to keep this process small."""
+    chunk = 3 * 256 * 1024  # multiple of 3 so chunk encodings concatenate
+    remaining = int(size_mb * 1024 * 1024)
+    with open(path, "wb") as f:
+        f.write(b'{"fileName": "diagram.png", "fileType": "image/png", "language": "English", "file": "')
+        while remaining > 0:
+            f.write(base64.b64encode(os.urandom(min(chunk, remaining))))
+            remaining -= chunk
+        f.write(b'"}')
+
+
+def _run_path(name: str, body_path: str):
+    """Child process: load the body, run one path, print baseline and peak RSS."""
+    with open(body_path, "rb") as f:
+        body = f.read()
+    baseline = _peak_rss_mb()
+    request = json.loads(body)  # kept alive, like the route's request model
+    result = PATHS[name](request)
+    # The result stands in for what the service holds while the model call is awaited
+    print(f"{baseline:.1f} {_peak_rss_mb():.1f} {_current_rss_mb() - baseline:.1f}")
+    del request, result
+
+
+def main(size_mb: float, use_sdk: bool):
+    fd, body_path = tempfile.mkstemp(suffix=".json")
+    os.close(fd)
+    try:
+        _write_body(body_path, size_mb)
+        use_sdk = use_sdk and content_types is not None
+        sdk = "with SDK request building" if use_sdk else "application side only"
+        print(f"{size_mb:g} MB upload, {os.path.getsize(body_path) / (1024 * 1024):.1f} MB JSON body ({sdk})")
+        for name in PATHS:
+            output = subprocess.run(
+                [sys.executable, "-m", "benchmarks.media_memory", "--run", name, "--body", body_path]
+                + ([] if use_sdk else ["--no-sdk"]),
+                check=True,
+                capture_output=True,
+                text=True,
+            ).stdout
+            baseline, peak, held = (float(value) for value in output.split())
+            print(
+                f"{name:<11} peak RSS {peak:7.1f} MB  (+{peak - baseline:6.1f} MB over the request body)  "
+                f"held during model call +{held:6.1f} MB"
+            )
+    finally:
+        os.unlink(body_path)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size-mb", type=float, default=10)
+    parser.add_argument("--no-sdk", action="store_true", help="Skip the SDK's own request building")
+    parser.add_argument("--run", choices=sorted(PATHS), help=argparse.SUPPRESS)
+    parser.add_argument("--body", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    USE_SDK = USE_SDK and not args.no_sdk
+    if args.run:
+        _run_path(args.run, args.body)
+    else:
+        main(args.size_mb, USE_SDK)
@@ -25,6 +25,8 @@ export function ScreenShareCapture() {
   const videoRef = useRef<HTMLVideoElement>(null);
   const canvasRef = useRef<HTMLCanvasElement>(null);
   const intervalRef = useRef<NodeJS.Timeout | null>(null);
+  // Identifies this share so the backend can skip frames that have not changed
+  const sessionIdRef = useRef<string>(crypto.randomUUID());
 
   const startScreenShare = async () => {
     try {
@@ -37,6 +39,7 @@ export function ScreenShareCapture() {
 
       setStream(mediaStream);
       setIsSharing(true);
+      sessionIdRef.current = crypto.randomUUID();
 
       if (videoRef.current) {
         videoRef.current.srcObject = mediaStream;
@@ -75,7 +78,9 @@ export function ScreenShareCapture() {
     }
   }, [stream]);
 
-  const captureFrame = async () => {
+  // Returns the backend's recommended delay before the next capture, if any.
+  // Manual captures always get an answer in the chat, even for an unchanged screen.
+  const captureFrame = async (manual = false): Promise<number | undefined> => {
     if (!videoRef.current || !canvasRef.current) return;
 
     const video = videoRef.current;
@@ -124,14 +129,9 @@ export function ScreenShareCapture() {
     setLastAnalysisTime(new Date());
 
     // Send to API
+    const capturedAt = new Date().toLocaleTimeString();
     setIsAnalyzing(true);
     try {
-      addMessage({
-        role: 'user',
-        content: `[Screen capture frame - ${new Date().toLocaleTimeString()}]`,
-        type: 'screen',
-      });
-
       // Remove data URL prefix for API and validate
       const base64Data = frameBase64.replace(/^data:image\/[a-z]+;base64,/, '');
       
@@ -153,15 +153,31 @@ export function ScreenShareCapture() {
         language
       });
 
-      const response = await apiService.analyzeScreenFrame(base64Data, language);
+      const response = await apiService.analyzeScreenFrame(
+        base64Data,
+        language,
+        sessionIdRef.current,
+        analysisInterval
+      );
 
-      if (response.success) {
-        setCurrentResponse(response.response);
+      // An unchanged screen returns the previous analysis: continuous mode leaves
+      // it out of the chat, a manual capture shows it with a note
+      if (response.success && (!response.skipped || manual)) {
+        const content = response.skipped
+          ? `Your screen hasn't changed since the last analysis.\n\n${response.response}`
+          : response.response;
+        addMessage({
+          role: 'user',
+          content: `[Screen capture frame - ${capturedAt}]`,
+          type: 'screen',
+        });
+        setCurrentResponse(content);
         addMessage({
           role: 'assistant',
-          content: response.response,
+          content,
         });
       }
+      return response.next_capture_ms;
     } catch (error) {
       console.error('Error analyzing screen:', error);
       
@@ -194,32 +210,30 @@ export function ScreenShareCapture() {
     
     toast({
       title: 'Continuous Analysis Started',
-      description: `Analyzing screen every ${analysisInterval / 1000} seconds`,
+      description: `Analyzing screen about every ${analysisInterval / 1000} seconds, adjusted to screen activity`,
     });
   };
 
   const startAutoCapture = () => {
     if (intervalRef.current) {
-      clearInterval(intervalRef.current);
+      clearTimeout(intervalRef.current);
     }
 
+    // Capture, then wait for the backend's recommended interval: longer when
+    // the screen is static or the server is busy, shorter when it is changing
+    const captureAndSchedule = async () => {
+      const nextCaptureMs = await captureFrame();
+      if (intervalRef.current === null) return; // stopped while analyzing
+      intervalRef.current = setTimeout(captureAndSchedule, nextCaptureMs ?? analysisInterval);
+    };
+
     // Wait 2 seconds before starting auto-capture to ensure video is ready
-    setTimeout(() => {
-      // Capture first frame immediately
-      captureFrame();
-      
-      // Then start interval
-      const interval = setInterval(() => {
-        captureFrame();
-      }, analysisInterval);
-      
-      intervalRef.current = interval;
-    }, 2000);
+    intervalRef.current = setTimeout(captureAndSchedule, 2000);
   };
 
   const stopContinuousAnalysis = () => {
     if (intervalRef.current) {
-      clearInterval(intervalRef.current);
+      clearTimeout(intervalRef.current);
       intervalRef.current = null;
     }
     setIsContinuousAnalysis(false);
@@ -236,7 +250,8 @@ export function ScreenShareCapture() {
         stream.getTracks().forEach((track) => track.stop());
       }
       if (intervalRef.current) {
-        clearInterval(intervalRef.current);
+        clearTimeout(intervalRef.current);
+        intervalRef.current = null;
       }
     };
   }, [stream]);
@@ -283,7 +298,7 @@ export function ScreenShareCapture() {
 
           <div className="flex gap-2">
             <Button
-              onClick={captureFrame}
+              onClick={() => captureFrame(true)}
               disabled={isAnalyzing}
               className="flex-1 gradient-primary text-primary-foreground font-medium glow-primary"
             >
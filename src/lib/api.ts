@@ -13,6 +13,11 @@ export interface ChatResponse {
   language: string;
 }
 
+export interface ChatStreamStats {
+  ttft_ms: number | null;
+  total_ms: number;
+}
+
 export interface AvatarResponse {
   success: boolean;
   video_url?: string;
@@ -24,6 +29,8 @@ export interface ScreenFrameResponse {
   success: boolean;
   response: string;
   language: string;
+  skipped?: boolean;
+  next_capture_ms?: number;
 }
 
 export interface FileAnalysisResponse {
@@ -109,6 +116,65 @@ class ApiService {
     return result;
   }
 
+  async chatStream(
+    message: string,
+    language: string,
+    onChunk: (text: string) => void,
+    context?: string,
+  ): Promise<ChatStreamStats> {
+    const response = await fetch(API_ENDPOINTS.chat.stream, {
+      method: 'POST',
+      headers: {
+        'Content-Type': 'application/json',
+      },
+      body: JSON.stringify({
+        message,
+        language,
+        context,
+      }),
+    });
+
+    if (!response.ok || !response.body) {
+      const errorData = await response.json().catch(() => ({}));
+      throw new Error(errorData.detail || `API Error: ${response.status}`);
+    }
+
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+
+    while (true) {
+      const { done, value } = await reader.read();
+      if (done) break;
+      buffer += decoder.decode(value, { stream: true });
+
+      // Server-Sent Events are separated by a blank line
+      let boundary = buffer.indexOf('\n\n');
+      while (boundary !== -1) {
+        const rawEvent = buffer.slice(0, boundary);
+        buffer = buffer.slice(boundary + 2);
+        boundary = buffer.indexOf('\n\n');
+
+        const eventLine = rawEvent.split('\n').find(line => line.startsWith('event: '));
+        const dataLine = rawEvent.split('\n').find(line => line.startsWith('data: '));
+        if (!eventLine || !dataLine) continue;
+
+        const event = eventLine.slice('event: '.length);
+        const data = JSON.parse(dataLine.slice('data: '.length));
+
+        if (event === 'chunk') {
+          onChunk(data.text);
+        } else if (event === 'done') {
+          return { ttft_ms: data.ttft_ms, total_ms: data.total_ms };
+        } else if (event === 'error') {
+          throw new Error(data.detail);
+        }
+      }
+    }
+
+    throw new Error('Chat stream ended unexpectedly');
+  }
+
   async generateAvatar(text: string, language: string): Promise<AvatarResponse> {
     const response = await fetch(API_ENDPOINTS.heygen.avatar, {
       method: 'POST',
@@ -124,7 +190,12 @@ class ApiService {
     return this.handleResponse<AvatarResponse>(response);
   }
 
-  async analyzeScreenFrame(frameBase64: string, language: string): Promise<ScreenFrameResponse> {
+  async analyzeScreenFrame(
+    frameBase64: string,
+    language: string,
+    sessionId?: string,
+    captureIntervalMs?: number
+  ): Promise<ScreenFrameResponse> {
     const response = await fetch(API_ENDPOINTS.screen.frame, {
       method: 'POST',
       headers: {
@@ -133,6 +204,8 @@ class ApiService {
       body: JSON.stringify({
         frame: frameBase64,
         language,
+        session_id: sessionId,
+        capture_interval_ms: captureIntervalMs,
       }),
     });
 
@@ -8,6 +8,7 @@ export const API_ENDPOINTS = {
   },
   chat: {
     respond: `${API_BASE_URL}/api/chat/respond`,
+    stream: `${API_BASE_URL}/api/chat/stream`,
   },
   heygen: {
     avatar: `${API_BASE_URL}/api/heygen/avatar`,